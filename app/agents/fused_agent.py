@@ -0,0 +1,100 @@
+from typing import Literal, Optional
+from pydantic import BaseModel, Field
+from app.llm.response_cache import invoke_structured
+from app.config import CHAT_MODEL
+from app.state import AppState
+
+# Bump when the prompt or the schema changes so cached assessments are not reused
+PROMPT_VERSION = "1"
+
+class FusedAssessment(BaseModel):
+    """Router decision, gap finding and risk entry for one clause, produced in a single call."""
+    # --- Triage (RouterDecision) ---
+    route: Literal["KEEP_GAP", "DROP_GAP", "NO_GAP_HIGH_RISK"]
+    confidence: float = Field(..., ge=0.0, le=1.0)
+    reason: str
+
+    # --- Audit (GapFinding); only meaningful for KEEP_GAP ---
+    gap_summary: str = Field(description="'Not Applicable' unless route is KEEP_GAP")
+    gap_status: str = Field(description="Fully Meets | Partially Meets | Does Not Meet; 'Not Applicable' for DROP_GAP")
+    recommendation: str = Field(description="'Not Applicable' unless route is KEEP_GAP")
+    source_ref: str = Field(
+        description="The specific clause or section number from the standard, e.g., 'ISO 27001 Annex A.8.10'"
+    )
+
+    # --- Risk (RiskEntry); empty for DROP_GAP ---
+    risk_statement: Optional[str] = None
+    impact: Optional[Literal["Low", "Medium", "High"]] = None
+    likelihood: Optional[Literal["Low", "Medium", "High"]] = None
+    rating: Optional[Literal["Low", "Medium", "High", "Critical"]] = None
+    recommended_control: Optional[str] = None
+
+def fused_agent(state: AppState):
+    """
+    Fast mode: Inspector, Auditor and Risk Expert in one LLM round-trip.
+    The requirement and evidence are sent once instead of up to three times.
+    """
+
+    prompt = f"""
+    You are a Senior Big-4 Compliance Auditor and Technical Risk Assessor.
+
+    You MUST base all conclusions ONLY on the RETRIEVED DOCUMENT EVIDENCE.
+    Do NOT infer beyond the text.
+    Write in short, clinical statements only.
+
+    ### INTERNAL POLICY REQUIREMENT:
+    "{state.requirement}"
+
+    ### RETRIEVED DOCUMENT EVIDENCE (Source of Truth):
+    "{state.evidence}"
+
+    ### STEP 1 - TRIAGE (route, confidence, reason):
+    - DROP_GAP: the text is Administrative (Purpose, Scope, Applicability, Definitions, Version Control,
+      Policy Owner, Introduction), a Header or Footer, contains no actionable instructions or controls,
+      or is completely unrelated to the evidence.
+    - KEEP_GAP: a functional requirement/control that has a Medium/High gap OR a clear promise made that
+      MUST be verified against the evidence.
+    - NO_GAP_HIGH_RISK: a functional requirement that looks compliant but involves inherently risky
+      operations (e.g., manual deletion, root access, unmonitored transfers).
+
+    ### STEP 2 - AUDIT (only for KEEP_GAP; otherwise write "Not Applicable"):
+    1. source_ref: the exact Clause ID or Section Number explicitly mentioned in the evidence,
+       or "Not Explicitly Stated".
+    2. gap_status: Fully Meets | Partially Meets | Does Not Meet.
+    3. gap_summary: maximum 2 bullet-style sentences of objective comparison findings. No filler.
+    4. recommendation: maximum 2 short imperative action steps. No explanation.
+
+    ### STEP 3 - RISK (for KEEP_GAP and NO_GAP_HIGH_RISK; leave empty for DROP_GAP):
+    1. risk_statement: one sentence, strictly "If <event>, then <consequence>.", maximum 20 words.
+    2. impact: Low | Medium | High, based ONLY on operational, financial, or regulatory damage.
+    3. likelihood: Low | Medium | High, based ONLY on evidence strength and control weakness.
+    4. rating: High + High = Critical, High + Medium = High, Medium + Medium = Medium,
+       anything Low-dominant = Low.
+    5. recommended_control: maximum 2 short imperative technical actions. No justification.
+
+    Return STRICT JSON matching the FusedAssessment schema.
+    """
+
+    # Temperature 0: the triage and audit steps dominate the quality of the result
+    result = invoke_structured("fused", FusedAssessment, prompt, f"{state.requirement}\n{state.evidence}",
+                               PROMPT_VERSION, CHAT_MODEL, temperature=0)
+
+    # Record the same fields the three-agent path would have set
+    state.gap_route = result.route
+    state.gap_reason = result.reason
+
+    # Like the three-agent graph, only KEEP_GAP is audited; NO_GAP_HIGH_RISK gets a risk entry only
+    if result.route == "KEEP_GAP":
+        state.gap_summary = result.gap_summary
+        state.gap_status = result.gap_status
+        state.gap_recommendation = result.recommendation
+        state.source_ref = result.source_ref
+
+    if result.route != "DROP_GAP":
+        state.risk_statement = result.risk_statement
+        state.impact = result.impact
+        state.likelihood = result.likelihood
+        state.rating = result.rating
+        state.recommended_control = result.recommended_control
+
+    return state
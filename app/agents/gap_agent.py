@@ -1,9 +1,12 @@
 from typing import Literal
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
+from app.llm.response_cache import invoke_structured
 from app.config import CHAT_MODEL
 from app.state import AppState
 
+# Bump when the prompt or the schema changes so cached findings are not reused
+PROMPT_VERSION = "1"
+
 class GapFinding(BaseModel):
     """Structured response for the Auditor's findings."""
     gap_summary: str
@@ -20,9 +23,6 @@ def gap_agent(state: AppState):
     Purpose: Compares the internal policy against the specific section of the standard retrieved from the documents.
     """
     
-    # Using temperature 0 is vital here for "Grounding" (sticking to the facts)
-    llm = ChatOpenAI(model=CHAT_MODEL, temperature=0) 
-    
     prompt = f"""
     You are a Senior ISO Compliance Lead Auditor.
 
@@ -65,7 +65,9 @@ def gap_agent(state: AppState):
 
 
     # Structured output forces the LLM to follow the Pydantic model
-    analysis = llm.with_structured_output(GapFinding).invoke(prompt)
+    # Using temperature 0 is vital here for "Grounding" (sticking to the facts)
+    analysis = invoke_structured("gap", GapFinding, prompt, f"{state.requirement}\n{state.evidence}",
+                                 PROMPT_VERSION, CHAT_MODEL, temperature=0)
 
     # Save findings to the State for the next agent (Risk Agent)
     state.gap_summary = analysis.gap_summary
@@ -1,9 +1,35 @@
+'''
+Policy interpreter: extracts metadata and clauses from an uploaded policy.
+
+Long policies are interpreted map-reduce style: the text is cut at section
+headings (and oversized sections at paragraphs or sentences) into parts of
+at most INTERPRET_PART_CHARS characters, the parts are
+interpreted concurrently (each retried on its own if the call or its JSON
+fails), and a reduce step merges the metadata and clause lists in document
+order. Short policies still go through a single call.
+'''
+
 import json
+import logging
 import re
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.config import INTERPRET_PART_CHARS, INTERPRET_CONCURRENCY, INTERPRET_MAX_RETRIES
+from app.rag.pdf_stream import split_sections
+from app.telemetry.metrics import RETRIES
+from app.telemetry.tracing import in_context, span
+
+logger = logging.getLogger(__name__)
 
-def interpret_new_document(llm, text: str) -> Dict:
-    prompt = f"""
+# Bump when the prompt, the parsing or the merge changes so stored interpretations are not reused
+PROMPT_VERSION = "1"
+
+_EMPTY_METADATA_VALUES = {"", "...", "N/A", "n/a", None}
+
+
+def _build_prompt(text: str, part_note: str = "") -> str:
+    return f"""
     You are a Policy Analysis Assistant. 
     IMPORTANT: The text contains markers like , , etc. 
     IGNORE these markers for section numbering. Use the ACTUAL headings (e.g., "1. Purpose", "2. Scope").
@@ -47,23 +73,147 @@ def interpret_new_document(llm, text: str) -> Dict:
       ]
     }}
 
+    {part_note}
     POLICY DOCUMENT:
     {text}
     """
 
-    response = llm.invoke(prompt)
-    content = response.content
 
+def _parse_response(content: str) -> Dict:
     # CLEANER: Removes ```json or ``` blocks if the LLM includes them
     clean_content = re.sub(r'^```json\s*|```\s*$', '', content.strip(), flags=re.MULTILINE)
+    parsed = json.loads(clean_content)
+    if not isinstance(parsed, dict):
+        raise ValueError("interpreter response is not a JSON object")
+    return parsed
+
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?;])\s+")
+
+
+def _pack(pieces: List[str], separator: str, max_chars: int) -> List[str]:
+    """Join consecutive pieces (each at most `max_chars`) into as few chunks of at most `max_chars` as possible."""
+    chunks: List[str] = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(separator) + len(piece) > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}{separator}{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _split_oversized(text: str, max_chars: int) -> List[str]:
+    """Cut text longer than `max_chars` at paragraph breaks, then sentence ends, then hard at `max_chars`."""
+    if len(text) <= max_chars:
+        return [text]
+    for boundary, separator in ((_PARAGRAPH_BREAK, "\n\n"), (_SENTENCE_END, " ")):
+        pieces = [piece for piece in boundary.split(text) if piece.strip()]
+        if len(pieces) > 1:
+            return _pack([chunk for piece in pieces for chunk in _split_oversized(piece, max_chars)],
+                         separator, max_chars)
+    return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+
+
+def split_into_parts(text: str, max_chars: int = INTERPRET_PART_CHARS) -> List[str]:
+    """
+    Group consecutive sections into parts of at most `max_chars`. A section
+    longer than that (or a policy without detectable headings) is cut further,
+    so no part exceeds `max_chars`.
+    """
+    pieces = [piece for _, section in split_sections(text) for piece in _split_oversized(section, max_chars)]
+    return _pack(pieces, "\n", max_chars)
+
+
+def _interpret_part(llm, part: str, index: int, total: int) -> Dict:
+    """Map step: interpret one part, retrying just this part on API or JSON errors."""
+    part_note = "" if total == 1 else (
+        f"NOTE: This is part {index + 1} of {total} of the policy. List only the clauses in this part; "
+        f"{'extract the metadata from it' if index == 0 else 'leave metadata fields empty unless stated here'}."
+    )
+    prompt = _build_prompt(part, part_note)
+
+    last_error: Optional[Exception] = None
+    with span("interpret_part", part=index + 1, parts=total) as current:
+        for attempt in range(INTERPRET_MAX_RETRIES + 1):
+            try:
+                return _parse_response(llm.invoke(prompt).content)
+            except Exception as e:
+                last_error = e
+                logger.warning("Interpreter part %d/%d failed (attempt %d): %s", index + 1, total, attempt + 1, e)
+                if attempt < INTERPRET_MAX_RETRIES:
+                    RETRIES.inc(operation="interpret_part")
+                    if current is not None:
+                        current.attrs["retries"] = attempt + 1
+        raise last_error
+
+
+def iter_interpreted_parts(llm, parts: List[str]) -> Iterator[Tuple[int, Optional[Dict]]]:
+    """
+    Yield (part index, parsed part) for the parts from split_into_parts() as
+    each one finishes, so the first clauses are available after one part's
+    latency. A part that failed every retry yields None.
+    """
+    workers = max(1, min(INTERPRET_CONCURRENCY, len(parts)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="interpret") as pool:
+        futures = {pool.submit(in_context(_interpret_part), llm, part, i, len(parts)): i for i, part in enumerate(parts)}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception:
+                yield futures[future], None
+
+
+def merge_parts(parsed_parts: List[Optional[Dict]]) -> Dict:
+    """
+    Reduce step: first non-empty value per metadata field, clauses in document
+    order without duplicates, and the indices of the parts that could not be
+    interpreted (`failed_parts`) so the review page can say what is missing.
+    """
+    metadata = {"title": "N/A", "owner": "N/A", "effective_date": "N/A", "applies_to": "N/A"}
+    analysis: List[Dict] = []
+    failed_parts: List[int] = []
+    seen_clauses = set()
+
+    for index, parsed in enumerate(parsed_parts):
+        if not isinstance(parsed, dict):
+            failed_parts.append(index)
+            continue
+        part_metadata = parsed.get("metadata")
+        for key, value in (part_metadata if isinstance(part_metadata, dict) else {}).items():
+            if metadata.get(key) in _EMPTY_METADATA_VALUES and value not in _EMPTY_METADATA_VALUES:
+                metadata[key] = value
+        for item in parsed.get("analysis") or []:
+            if not isinstance(item, dict):
+                continue
+            clause = item.get("exact_clause")
+            if clause and clause not in seen_clauses:
+                seen_clauses.add(clause)
+                analysis.append(item)
+
+    return {"metadata": metadata, "analysis": analysis, "failed_parts": failed_parts}
+
+
+def interpret_new_document(llm, text: str, progress: Optional[Callable[[int, int], None]] = None) -> Dict:
+    # `progress(parts done, total parts)` is called as each part finishes (used by background jobs)
+    parts = split_into_parts(text) or [text]
+    total = len(parts)
+    results: Dict[int, Optional[Dict]] = {}
+    with span("interpret", parts=total, chars=len(text)):
+        for index, parsed in iter_interpreted_parts(llm, parts):
+            results[index] = parsed
+            if progress:
+                progress(len(results), total)
+    ordered = [results[i] for i in sorted(results)]
 
-    try:
-        parsed = json.loads(clean_content)
-        return parsed
-    except Exception as e:
-        print(f"JSON Parsing Error: {e}")
+    if not any(ordered):
         # Return a structure that matches your template so it doesn't crash
         return {
             "metadata": {"title": "Error Parsing", "owner": "N/A", "effective_date": "N/A", "applies_to": "N/A"},
-            "analysis": []
-        }
\ No newline at end of file
+            "analysis": [],
+            "failed_parts": list(range(total)),
+        }
+    return merge_parts(ordered)
@@ -1,9 +1,12 @@
 from typing import Literal
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
+from app.llm.response_cache import invoke_structured
 from app.config import CHAT_MODEL
 from app.state import AppState
 
+# Bump when the prompt or the schema changes so cached risk entries are not reused
+PROMPT_VERSION = "1"
+
 # --- SCHEMAS ---
 
 class RiskEntry(BaseModel):
@@ -80,9 +83,9 @@ def risk_assessment_agent(state: AppState):
     """
 
 
-    llm = ChatOpenAI(model=CHAT_MODEL, temperature=0.2)
     # We use the full RiskEntry schema so all state variables get filled
-    risk = llm.with_structured_output(RiskEntry).invoke(prompt)
+    risk = invoke_structured("risk", RiskEntry, prompt, f"{state.requirement}\n{state.evidence}\n{gap_context}",
+                             PROMPT_VERSION, CHAT_MODEL, temperature=0.2)
 
     # Syncing data back to the AppState
     state.risk_statement = risk.risk_statement
@@ -1,9 +1,12 @@
 from typing import Literal
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
+from app.llm.response_cache import invoke_structured
 from app.config import CHAT_MODEL
 from app.state import AppState
 
+# Bump when the prompt or the schema changes so cached decisions are not reused
+PROMPT_VERSION = "1"
+
 class RouterDecision(BaseModel):
     """Structured output for the Triage decision."""
     route: Literal["KEEP_GAP", "DROP_GAP", "NO_GAP_HIGH_RISK"]
@@ -17,10 +20,6 @@ def router_agent(state: AppState):
     based on the specific document evidence provided.
     """
     
-    # We use a very low temperature (0) for the Router to ensure 
-    # consistent, non-creative categorization.
-    llm = ChatOpenAI(model=CHAT_MODEL, temperature=0)
-    
     prompt = f"""
     You are a Senior Big-4 Compliance Auditor. 
     Your job is to TRIAGE a policy clause against a specific regulatory scope.
@@ -60,8 +59,13 @@ def router_agent(state: AppState):
     """
 
     # Using structured output ensures the AI doesn't return conversational text
-    structured_llm = llm.with_structured_output(RouterDecision)
-    decision = structured_llm.invoke(prompt)
+    # We use a very low temperature (0) for the Router to ensure
+    # consistent, non-creative categorization.
+    # Identical requirement/evidence pairs are answered from the response cache
+    cache_key = "\n".join([state.requirement, state.evidence,
+                           str(getattr(state, 'gap_severity', 'N/A')), str(getattr(state, 'rating', 'N/A'))])
+    decision = invoke_structured("router", RouterDecision, prompt, cache_key, PROMPT_VERSION,
+                                 CHAT_MODEL, temperature=0)
 
     # Record the findings back to the 'Smart Clipboard' (AppState)
     state.gap_route = decision.route
@@ -0,0 +1,293 @@
+'''
+Headless batch audit of whole directories of policies.
+
+    python -m app.cli data/policies --out results.jsonl
+    python -m app.cli "data/policies/**/*.pdf" --out results.jsonl --out results.csv --min-confidence 0.7
+
+Documents flow through three stages joined by bounded queues, so parsing
+(CPU) overlaps interpretation and auditing (network) of other documents:
+
+    parse      content hash and text extraction       --parse-workers threads
+    interpret  policy interpreter (or the stored      --docs-in-flight threads
+               interpretation of a known file)
+    audit      auto-approval of clauses scoring at     --docs-in-flight threads
+               least --min-confidence, then retrieval,
+               reranking and the graph
+A single writer appends each finished document's rows to every --out file
+(.jsonl or .csv) and flushes, one document at a time; a document without
+approved clauses gets a single "No approved clauses" row.
+
+Resumable: documents whose hash is already in the first output file are
+skipped, and clauses audited before an interruption are served from the
+result store (RESULTS_MEMO_ENABLED) instead of the API. Every OpenAI call goes
+through the rate limiter at bulk priority; set LLM_RPM_LIMIT / LLM_TPM_LIMIT
+to the share of the account quota an overnight run may use.
+'''
+
+import argparse
+import csv
+import glob
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from app.config import BATCH_DOCS_IN_FLIGHT, BATCH_MIN_CONFIDENCE, GRAPH_MODE
+from app.graph.pretriage import parse_confidence
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_SUFFIXES = (".pdf", ".txt")
+CSV_FIELDS = [
+    "document", "doc_hash", "section_reference", "confidence_score", "theme", "clause", "source_ref",
+    "status", "gap_summary", "risk_rating", "risk_statement", "risk_recommendation",
+]
+
+_END = object()
+
+
+def discover(inputs: Iterable[str]) -> List[str]:
+    """PDF/TXT files under each directory or matching each glob, in a stable order without duplicates."""
+    files: List[str] = []
+    for ref in inputs:
+        if os.path.isdir(ref):
+            matches = [str(p) for p in Path(ref).rglob("*") if p.is_file()]
+        else:
+            matches = [p for p in glob.glob(ref, recursive=True) if os.path.isfile(p)]
+        files.extend(sorted(p for p in matches if p.lower().endswith(SUPPORTED_SUFFIXES)))
+    return list(dict.fromkeys(files))
+
+
+# --- Output files ---
+
+def _trim_partial_line(path: str) -> None:
+    # A run killed mid-write can leave half a line; drop it so the file stays parseable
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, "rb+") as f:
+        data = f.read()
+        if not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+class _Output:
+    def __init__(self, path: str):
+        self.path = path
+        self.csv = path.lower().endswith(".csv")
+        _trim_partial_line(path)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "a", encoding="utf-8", newline="")
+        self._writer = csv.DictWriter(self._file, CSV_FIELDS, extrasaction="ignore") if self.csv else None
+        if self.csv and new_file:
+            self._writer.writeheader()
+
+    def done_hashes(self) -> Set[str]:
+        """Documents already written by an earlier run."""
+        done: Set[str] = set()
+        with open(self.path, encoding="utf-8", newline="") as f:
+            if self.csv:
+                done.update(row.get("doc_hash") or "" for row in csv.DictReader(f))
+            else:
+                for line in f:
+                    try:
+                        done.add(json.loads(line).get("doc_hash") or "")
+                    except ValueError:
+                        continue
+        done.discard("")
+        return done
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            if self.csv:
+                self._writer.writerow(row)
+            else:
+                self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self._file.close()
+
+
+# --- Pipeline stages ---
+
+def _stage(name: str, fn: Callable[[Dict[str, Any]], None], inbox: "queue.Queue", outbox: "queue.Queue",
+           workers: int) -> List[threading.Thread]:
+    """
+    `workers` daemon threads applying `fn` to each document from `inbox` and
+    passing it on; a document that failed an earlier stage is passed on
+    untouched. The last thread to see the end marker forwards it. On Ctrl+C
+    the threads die with the process; finished documents are already on disk.
+    """
+    from app.llm.rate_limiter import BULK, llm_priority
+
+    remaining = [workers]
+    lock = threading.Lock()
+
+    def _loop() -> None:
+        with llm_priority(BULK):
+            while True:
+                doc = inbox.get()
+                if doc is _END:
+                    inbox.put(_END)   # for the sibling threads
+                    break
+                if "error" not in doc and not doc.get("skipped"):
+                    try:
+                        fn(doc)
+                    except Exception as e:
+                        logger.exception("%s failed for %s", name, doc["path"])
+                        doc["error"] = f"{name}: {type(e).__name__}: {e}"
+                outbox.put(doc)
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                outbox.put(_END)
+
+    threads = [threading.Thread(target=_loop, name=f"batch-{name}-{i}", daemon=True) for i in range(workers)]
+    for t in threads:
+        t.start()
+    return threads
+
+
+def _parse(done: Set[str]) -> Callable[[Dict[str, Any]], None]:
+    from app.rag.pdf_stream import extract_text
+    from app.storage.results import file_hash
+
+    def parse(doc: Dict[str, Any]) -> None:
+        doc["doc_hash"] = file_hash(doc["path"])
+        if doc["doc_hash"] in done:
+            doc["skipped"] = True
+            return
+        doc["text"] = extract_text(doc["path"])
+
+    return parse
+
+
+def _interpret(doc: Dict[str, Any]) -> None:
+    from app.jobs.handlers import analyze_upload
+
+    text = doc.pop("text")
+    doc["interpretation"] = analyze_upload({"path": doc["path"], "filename": os.path.basename(doc["path"]),
+                                           "text": text})
+    if not doc["interpretation"].get("analysis"):
+        raise ValueError("the interpreter found no clauses")
+
+
+def _audit(min_confidence: float, mode: str) -> Callable[[Dict[str, Any]], None]:
+    from app.jobs.handlers import audit_review
+
+    def audit(doc: Dict[str, Any]) -> None:
+        interpretation = doc.pop("interpretation")
+        analysis = interpretation.get("analysis", [])
+        approved = [item for item in analysis if (parse_confidence(item) or 0.0) >= min_confidence]
+        doc["clauses"], doc["approved"] = len(analysis), len(approved)
+        if not approved:
+            # Marker row, so the document counts as done when resuming
+            doc["rows"] = [{"document": doc["path"], "doc_hash": doc["doc_hash"], "status": "No approved clauses",
+                            "gap_summary": f"None of the {len(analysis)} clauses scored at least {min_confidence}"}]
+            return
+
+        audited = audit_review({"items": approved, "metadata": interpretation.get("metadata", {}),
+                                "doc_hash": doc["doc_hash"], "mode": mode})
+        doc["rows"] = [
+            {"document": doc["path"], "doc_hash": doc["doc_hash"],
+             "section_reference": item.get("section_reference"), "confidence_score": item.get("confidence_score"),
+             **row}
+            for item, row in zip(approved, audited["results"])
+        ]
+
+    return audit
+
+
+def run_batch(files: List[str], outputs: List[str], min_confidence: float = BATCH_MIN_CONFIDENCE,
+              docs_in_flight: int = BATCH_DOCS_IN_FLIGHT, parse_workers: int = 2,
+              mode: str = GRAPH_MODE, resume: bool = True) -> Dict[str, Any]:
+    """Audit `files` into `outputs`; returns counts and throughput for the run."""
+    sinks = [_Output(path) for path in outputs]
+    done = sinks[0].done_hashes() if resume else set()
+    summary = {"documents": len(files), "audited": 0, "skipped": 0, "failed": 0, "rows": 0, "failures": []}
+
+    # 1. parse -> interpret -> audit, each hand-off bounded so memory stays flat over hundreds of files
+    inbox: "queue.Queue" = queue.Queue()
+    parsed: "queue.Queue" = queue.Queue(maxsize=docs_in_flight)
+    interpreted: "queue.Queue" = queue.Queue(maxsize=docs_in_flight)
+    finished: "queue.Queue" = queue.Queue(maxsize=docs_in_flight)
+    for path in files:
+        inbox.put({"path": path})
+    inbox.put(_END)
+
+    started = time.perf_counter()
+    _stage("parse", _parse(done), inbox, parsed, parse_workers)
+    _stage("interpret", _interpret, parsed, interpreted, docs_in_flight)
+    _stage("audit", _audit(min_confidence, mode), interpreted, finished, docs_in_flight)
+
+    # 2. Single writer: a document's rows land together, so a resumed run never duplicates half a document
+    handled = 0
+    try:
+        while True:
+            doc = finished.get()
+            if doc is _END:
+                break
+            handled += 1
+            label = f"[{handled}/{len(files)}] {doc['path']}"
+            if doc.get("skipped"):
+                summary["skipped"] += 1
+                logger.info("%s: already in %s, skipped", label, outputs[0])
+            elif "error" in doc:
+                summary["failed"] += 1
+                summary["failures"].append({"document": doc["path"], "error": doc["error"]})
+                logger.error("%s: failed (%s); it will be retried on the next run", label, doc["error"])
+            else:
+                for sink in sinks:
+                    sink.write(doc["rows"])
+                summary["audited"] += 1
+                summary["rows"] += len(doc["rows"])
+                logger.info("%s: %d/%d clauses approved and audited", label, doc["approved"], doc["clauses"])
+    except KeyboardInterrupt:
+        logger.warning("Interrupted; rerun the same command to resume")
+        raise
+    finally:
+        for sink in sinks:
+            sink.close()
+
+    elapsed = time.perf_counter() - started
+    summary["elapsed_s"] = round(elapsed, 1)
+    summary["documents_per_hour"] = round(summary["audited"] * 3600 / elapsed, 1) if elapsed else None
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Audit directories or globs of policies without the web UI")
+    parser.add_argument("inputs", nargs="+", help="directories (searched recursively) or globs of PDF/TXT files")
+    parser.add_argument("--out", action="append", required=True,
+                        help="results file, .jsonl or .csv; repeat for both (the first is used to resume)")
+    parser.add_argument("--min-confidence", type=float, default=BATCH_MIN_CONFIDENCE,
+                        help="auto-approve clauses with an interpreter confidence at or above this")
+    parser.add_argument("--docs-in-flight", type=int, default=BATCH_DOCS_IN_FLIGHT,
+                        help="documents interpreted / audited concurrently")
+    parser.add_argument("--parse-workers", type=int, default=2, help="text extraction threads")
+    parser.add_argument("--graph-mode", default=GRAPH_MODE, choices=("full", "fast"))
+    parser.add_argument("--no-resume", action="store_true", help="audit every file even if already in --out")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    files = discover(args.inputs)
+    if not files:
+        parser.error(f"no PDF/TXT files found in {args.inputs}")
+
+    summary = run_batch(files, args.out, args.min_confidence, max(1, args.docs_in_flight),
+                        max(1, args.parse_workers), args.graph_mode, resume=not args.no_resume)
+    print(f"{summary['audited']} audited, {summary['skipped']} skipped, {summary['failed']} failed "
+          f"of {summary['documents']} documents; {summary['rows']} rows in {summary['elapsed_s']}s "
+          f"({summary['documents_per_hour']} documents/hour)")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,11 +4,129 @@ from dotenv import load_dotenv
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "").strip()
-if not OPENAI_API_KEY:
-    raise RuntimeError("OPENAI_API_KEY missing")
+
+
+def require_openai_api_key() -> str:
+    """Checked when an OpenAI client is first built, not at import time."""
+    if not OPENAI_API_KEY:
+        raise RuntimeError("OPENAI_API_KEY missing")
+    return OPENAI_API_KEY
+
 
 CHAT_MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1-mini").strip()
+# Any OpenAI-compatible endpoint, e.g. the local stub used by benchmarks/pipeline_benchmark.py
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "").strip() or None
 EMBED_MODEL = os.getenv("EMBED_MODEL", "text-embedding-3-small").strip()
 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-FAISS_INDEX_PATH = os.path.join(BASE_DIR, "data", "faiss_index")
+FAISS_INDEX_PATH = os.getenv("FAISS_INDEX_PATH", os.path.join(BASE_DIR, "data", "faiss_index"))
+
+# Number of approved clauses processed concurrently in /review/submit
+MAX_CONCURRENT_CLAUSES = int(os.getenv("MAX_CONCURRENT_CLAUSES", "4"))
+
+# Audit graph: "full" = router, gap and risk agents (up to 3 LLM calls per clause);
+# "fast" = one fused call per clause, for bulk audits
+GRAPH_MODE = os.getenv("GRAPH_MODE", "full").strip().lower()
+
+# Rule-based pre-triage: obvious non-controls skip retrieval and the LLM agents entirely
+PRETRIAGE_ENABLED = os.getenv("PRETRIAGE_ENABLED", "1").strip() == "1"
+PRETRIAGE_MIN_CONFIDENCE = float(os.getenv("PRETRIAGE_MIN_CONFIDENCE", "0.4"))   # interpreter rubric: < 0.4 = non-actionable
+PRETRIAGE_REQUIRE_MODAL = os.getenv("PRETRIAGE_REQUIRE_MODAL", "0").strip() == "1"  # also drop clauses with no "must/shall/..."
+
+# Persistent embedding cache keyed by (EMBED_MODEL, sha256(text))
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "1").strip() == "1"
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", os.path.join(BASE_DIR, "data", "cache", "embeddings.sqlite"))
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "200000"))
+
+# Persistent cache of the router/gap/risk agents' structured responses
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1").strip() == "1"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(BASE_DIR, "data", "cache", "llm_responses.sqlite"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 86400)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+LLM_CACHE_SEMANTIC = os.getenv("LLM_CACHE_SEMANTIC", "0").strip() == "1"            # near-duplicate matching (one embedding per lookup)
+LLM_CACHE_SEMANTIC_THRESHOLD = float(os.getenv("LLM_CACHE_SEMANTIC_THRESHOLD", "0.97"))  # min cosine similarity
+
+# Embedding requests are split into token-budgeted batches sent concurrently
+EMBED_BATCH_MAX_TOKENS = int(os.getenv("EMBED_BATCH_MAX_TOKENS", "50000"))
+EMBED_BATCH_MAX_INPUTS = int(os.getenv("EMBED_BATCH_MAX_INPUTS", "512"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "5"))
+
+# FAISS index backend: flat (exact), ivf_flat, hnsw or ivf_pq
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat").strip().lower()
+FAISS_IVF_NLIST = int(os.getenv("FAISS_IVF_NLIST", "0"))         # 0 = derive from corpus size
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "8"))               # IVF lists scanned per query
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))        # HNSW candidate list size per query
+FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", "16"))                  # PQ sub-quantizers (must divide the dimension)
+FAISS_TRAIN_SIZE = int(os.getenv("FAISS_TRAIN_SIZE", "100000"))  # max vectors used to train IVF/PQ
+
+# "mmap": memory-map index.faiss read-only and read chunks from docstore.sqlite
+# (shared page cache across workers); "pickle": LangChain's FAISS.load_local
+FAISS_LOAD_MODE = os.getenv("FAISS_LOAD_MODE", "mmap").strip().lower()
+
+# Evidence retrieval: "vector" (FAISS), "lexical" (BM25, no embedding call) or "hybrid" (both, fused with RRF)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid").strip().lower()
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "20"))   # per retriever, before fusion
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# Cross-encoder reranking of retrieved evidence
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2").strip()
+RERANK_BACKEND = os.getenv("RERANK_BACKEND", "torch").strip().lower()   # torch | onnx | onnx-int8 | none (keep retrieval order)
+RERANK_ONNX_INT8_FILE = os.getenv("RERANK_ONNX_INT8_FILE", "onnx/model_quint8_avx2.onnx").strip()
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "64"))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "50000"))
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "5"))   # retrieved chunks scored per clause
+
+# Preload the vector DB, the reranker and the graph in the background when the dev server starts
+WARMUP_ON_START = os.getenv("WARMUP_ON_START", "0").strip() == "1"
+
+# Shared keep-alive HTTP pool used by every OpenAI / LangChain client
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "32"))
+LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "16"))
+LLM_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "120"))
+
+# Process-wide OpenAI scheduler: RPM/TPM budgets, AIMD concurrency, interactive before bulk
+LLM_RATE_LIMIT_ENABLED = os.getenv("LLM_RATE_LIMIT_ENABLED", "1").strip() == "1"
+LLM_RPM_LIMIT = int(os.getenv("LLM_RPM_LIMIT", "0"))          # requests/min for this process (0 = learn from x-ratelimit headers)
+LLM_TPM_LIMIT = int(os.getenv("LLM_TPM_LIMIT", "0"))          # tokens/min for this process (0 = learn from x-ratelimit headers)
+LLM_RATE_HEADROOM = float(os.getenv("LLM_RATE_HEADROOM", "0.9"))   # fraction of a learned account limit to use
+LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", os.getenv("LLM_HTTP_MAX_CONNECTIONS", "32")))
+LLM_INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY", "8"))
+LLM_LATENCY_TOLERANCE = float(os.getenv("LLM_LATENCY_TOLERANCE", "2.0"))  # stop growing concurrency past this x baseline latency
+LLM_PRIORITY_AGING_SECONDS = float(os.getenv("LLM_PRIORITY_AGING_SECONDS", "30"))  # head start of interactive over bulk calls
+LLM_EST_COMPLETION_TOKENS = int(os.getenv("LLM_EST_COMPLETION_TOKENS", "400"))     # charged up front when max_tokens is unset
+
+# Ingestion: page-parallel parsing and streaming into the index
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+INGEST_GROUP_SIZE = int(os.getenv("INGEST_GROUP_SIZE", "1000"))   # chunks embedded per streaming step
+
+# Map-reduce interpretation of uploaded policies
+INTERPRET_PART_CHARS = int(os.getenv("INTERPRET_PART_CHARS", "6000"))   # max policy text per LLM call
+INTERPRET_CONCURRENCY = int(os.getenv("INTERPRET_CONCURRENCY", "4"))
+INTERPRET_MAX_RETRIES = int(os.getenv("INTERPRET_MAX_RETRIES", "2"))
+
+# Local store of interpretations and audit rows (per-clause memoization, history, policy diffs)
+RESULTS_DB_PATH = os.getenv("RESULTS_DB_PATH", os.path.join(BASE_DIR, "data", "results", "results.sqlite"))
+RESULTS_MEMO_ENABLED = os.getenv("RESULTS_MEMO_ENABLED", "1").strip() == "1"   # reuse stored interpretations and rows audited under the same versions
+
+# Review sessions: interpretation behind each review form, shared by all web workers
+REVIEW_DB_PATH = os.getenv("REVIEW_DB_PATH", os.path.join(BASE_DIR, "data", "results", "reviews.sqlite"))
+REVIEW_TTL_SECONDS = float(os.getenv("REVIEW_TTL_SECONDS", str(24 * 3600)))
+
+# Background analysis jobs: durable SQLite queue + local worker pool
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", os.path.join(BASE_DIR, "data", "jobs", "jobs.sqlite"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))                     # worker threads per pool
+JOB_WORKERS_IN_WEB = os.getenv("JOB_WORKERS_IN_WEB", "1").strip() == "1"  # run a pool inside the Flask process
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))     # seconds an idle worker waits between polls
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "120"))     # running job with no heartbeat for this long is requeued
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+# Instrumentation: per-stage / per-node timings, API token usage, /metrics (Prometheus text format)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").strip() == "1"
+TRACE_DIR = os.getenv("TRACE_DIR", "").strip()      # write one JSON trace per analysis / review here ("" = off)
+
+# Headless batch audits (python -m app.cli)
+BATCH_MIN_CONFIDENCE = float(os.getenv("BATCH_MIN_CONFIDENCE", "0.8"))   # auto-approve clauses at or above this score
+BATCH_DOCS_IN_FLIGHT = int(os.getenv("BATCH_DOCS_IN_FLIGHT", "4"))       # documents per network stage (and queue depth)
@@ -6,6 +6,9 @@ from app.state import AppState
 from app.agents.router_agent import router_agent
 from app.agents.gap_agent import gap_agent
 from app.agents.risk_agent import risk_assessment_agent
+from app.agents.fused_agent import fused_agent
+from app.config import GRAPH_MODE
+from app.telemetry.tracing import traced
 
 # --- STEP 1: THE RECORDER (Finalizing the State) ---
 def finalize_and_log(state: AppState):
@@ -49,11 +52,11 @@ def finalize_and_log(state: AppState):
 # --- STEP 2: CONSTRUCTING THE GRAPH ---
 builder = StateGraph(AppState)
 
-# Define the Nodes (The "Workstations")
-builder.add_node("router_agent", router_agent)
-builder.add_node("gap_auditor", gap_agent)
-builder.add_node("risk_expert", risk_assessment_agent)
-builder.add_node("logger", finalize_and_log)
+# Define the Nodes (The "Workstations"), each timed under graph.<node> for /metrics and traces
+builder.add_node("router_agent", traced("graph.router_agent")(router_agent))
+builder.add_node("gap_auditor", traced("graph.gap_auditor")(gap_agent))
+builder.add_node("risk_expert", traced("graph.risk_expert")(risk_assessment_agent))
+builder.add_node("logger", traced("graph.logger")(finalize_and_log))
 
 # Graph Entry Point
 builder.set_entry_point("router_agent")
@@ -76,4 +79,23 @@ builder.add_edge("risk_expert", "logger")
 builder.add_edge("logger", END)
 
 # Compile the graph into an executable app
-app = builder.compile()
\ No newline at end of file
+app = builder.compile()
+
+# --- STEP 3: FAST VARIANT (one combined LLM call per clause) ---
+fast_builder = StateGraph(AppState)
+fast_builder.add_node("fused_agent", traced("graph.fused_agent")(fused_agent))
+fast_builder.add_node("logger", traced("graph.logger")(finalize_and_log))
+fast_builder.set_entry_point("fused_agent")
+fast_builder.add_edge("fused_agent", "logger")
+fast_builder.add_edge("logger", END)
+
+fast_app = fast_builder.compile()
+
+GRAPHS = {"full": app, "fast": fast_app}
+
+
+def get_graph(mode: str = GRAPH_MODE):
+    """'full': router -> gap auditor -> risk expert; 'fast': single fused call."""
+    if mode not in GRAPHS:
+        raise ValueError(f"Unknown GRAPH_MODE {mode!r}; expected one of {sorted(GRAPHS)}")
+    return GRAPHS[mode]
\ No newline at end of file
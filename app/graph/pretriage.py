@@ -0,0 +1,100 @@
+'''
+Cheap pre-triage of interpreted clauses before any retrieval or LLM call.
+
+The router agent is told to DROP_GAP administrative text (Purpose, Scope,
+Definitions, headers, ...). Clauses that are obviously of that kind are
+caught here by rules instead:
+    1. An administrative heading as the section reference or as the whole clause
+    2. The interpreter's confidence_score below PRETRIAGE_MIN_CONFIDENCE
+       (its rubric labels < 0.4 as non-actionable)
+    3. Optionally (PRETRIAGE_REQUIRE_MODAL=1), no obligation wording at all
+       ("must", "shall", "required", ...)
+and go straight to the graph's logger node as Out of Scope.
+'''
+
+import re
+import threading
+from typing import Any, Dict, Optional
+
+from app.config import PRETRIAGE_ENABLED, PRETRIAGE_MIN_CONFIDENCE, PRETRIAGE_REQUIRE_MODAL, RERANK_CANDIDATES
+
+ADMIN_HEADINGS = {
+    "purpose", "scope", "applicability", "definitions", "definition", "glossary", "terms",
+    "introduction", "overview", "background", "version control", "version history",
+    "revision history", "document control", "document history", "policy owner", "references",
+    "related documents", "related policies",
+    "table of contents", "contents", "contact", "contacts",
+}
+
+# "3.", "3.1", "A.8.10", "Section 4:" ... in front of a heading
+_NUMBER_PREFIX = re.compile(r"^\s*(?:section\s+)?(?:[A-Z]?\d+(?:\.\d+)*|[IVX]+|[A-Z])[.):\-\s]+", re.IGNORECASE)
+_MODAL = re.compile(
+    r"\b(must|shall|should|will|required?|requires|ensure[sd]?|prohibit(?:ed|s)?|"
+    r"may not|cannot|mandatory|responsible for|at least|no later than|within)\b",
+    re.IGNORECASE,
+)
+
+# Counters since start-up, see triage_stats()
+_stats = {"clauses_seen": 0, "short_circuited": 0, "by_rule": {}}
+_stats_lock = threading.Lock()
+
+
+def _heading(text: Optional[str]) -> str:
+    text = _NUMBER_PREFIX.sub("", str(text or "")).strip().rstrip(":.").lower()
+    return re.sub(r"\s+", " ", text)
+
+
+def parse_confidence(item: Dict[str, Any]) -> Optional[float]:
+    """The interpreter's confidence_score as a float, or None when missing or not a number."""
+    try:
+        return float(item.get("confidence_score"))
+    except (TypeError, ValueError):
+        return None
+
+
+def pre_triage(item: Dict[str, Any]) -> Optional[str]:
+    """Reason the clause is not an auditable control, or None if it needs the full audit."""
+    if not PRETRIAGE_ENABLED:
+        return None
+
+    clause = str(item.get("exact_clause") or "")
+
+    # 1. Administrative headings. Only exact heading matches: terse controls ("All Laptops
+    #    Encrypted With AES-256") and controls the interpreter filed under an admin theme are kept
+    if _heading(item.get("section_reference")) in ADMIN_HEADINGS:
+        return "heading"
+    if _heading(clause) in ADMIN_HEADINGS:
+        return "header_text"
+
+    # 2. Interpreter confidence rubric (< 0.4 = non-actionable)
+    confidence = parse_confidence(item)
+    if confidence is not None and confidence < PRETRIAGE_MIN_CONFIDENCE:
+        return "low_confidence"
+
+    # 3. No obligation wording
+    if PRETRIAGE_REQUIRE_MODAL and not _MODAL.search(clause):
+        return "no_modal_verb"
+
+    return None
+
+
+def record(seen: int, reasons: Dict[str, int]) -> None:
+    with _stats_lock:
+        _stats["clauses_seen"] += seen
+        for reason, n in reasons.items():
+            _stats["short_circuited"] += n
+            _stats["by_rule"][reason] = _stats["by_rule"].get(reason, 0) + n
+
+
+def triage_stats() -> Dict[str, Any]:
+    """Clauses short-circuited since start-up and the work that saved."""
+    with _stats_lock:
+        skipped = _stats["short_circuited"]
+        return {
+            "clauses_seen": _stats["clauses_seen"],
+            "short_circuited": skipped,
+            "by_rule": dict(_stats["by_rule"]),
+            "llm_calls_avoided": skipped,          # at least the router call each
+            "vector_searches_avoided": skipped,
+            "rerank_pairs_avoided": skipped * RERANK_CANDIDATES,
+        }
@@ -0,0 +1,224 @@
+'''
+Runs the approved policy clauses through retrieval, reranking and the LangGraph
+audit flow.
+
+The review is processed in stages: obvious non-controls (see pretriage) are
+reported Out of Scope without retrieval or LLM calls, evidence for every other
+clause is retrieved in one batch (a single embedding request and one
+multi-query index search), all (clause, candidate) pairs are reranked
+together in batched cross-encoder passes, and the clauses then go through the
+graph on a bounded thread pool. Rows can be consumed as each clause finishes
+(iter_audit_clauses) or collected in the original clause order
+(audit_clauses); a failure in one clause only affects that clause's row in
+the report.
+'''
+
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from app.config import GRAPH_MODE, MAX_CONCURRENT_CLAUSES, RERANK_CANDIDATES, RESULTS_MEMO_ENABLED
+from app.graph.flow import finalize_and_log, get_graph
+from app.graph.pretriage import pre_triage, record as record_triage
+from app.rag.hybrid_retriever import retrieve_many
+from app.state import AppState
+from app.rag.pdf_stream import evidence_header
+from app.telemetry.metrics import CACHE_LOOKUPS
+from app.telemetry.tracing import in_context, span
+
+logger = logging.getLogger(__name__)
+
+
+def _error_row(item: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+    """Row shown in the results table when a clause could not be audited."""
+    return {
+        "theme": item.get("theme"),
+        "clause": item.get("exact_clause"),
+        "source_ref": "Not Explicitly Stated",
+        "status": "Error",
+        "gap_summary": f"Audit failed: {error}",
+        "risk_rating": "Not Applicable",
+        "risk_statement": "Not Applicable",
+        "risk_recommendation": "Not Applicable",
+    }
+
+
+def _out_of_scope_row(item: Dict[str, Any], reason: str) -> Dict[str, Any]:
+    """Send a pre-triaged clause straight to the graph's logger node as DROP_GAP."""
+    state = finalize_and_log(AppState(
+        requirement=item.get("exact_clause") or "",
+        gap_route="DROP_GAP",
+        gap_reason=f"Pre-triage: {reason}",
+    ))
+    logged = state.audit_log[-1]
+    return {**logged, "theme": item.get("theme")}
+
+
+def _retrieve_many(items: List[Dict[str, Any]], db) -> List[List[Document]]:
+    # RETRIEVER for a whole review: one batched embedding request and one multi-query index search
+    with span("retrieve", clauses=len(items)):
+        return retrieve_many(db, [item.get("exact_clause") for item in items], k=RERANK_CANDIDATES)
+
+
+def _format_evidence(doc: Document) -> str:
+    # Citation from the chunk's ingest metadata (file, page, section) so the auditor can quote it
+    header = evidence_header(doc)
+    return f"[Source: {header}]\n{doc.page_content}" if header else doc.page_content
+
+
+def format_evidence(docs: List[Document]) -> str:
+    """Evidence block handed to the agents: each chunk under its [Source: ...] citation."""
+    return "\n\n".join(_format_evidence(doc) for doc in docs)
+
+
+def _run_graph(item: Dict[str, Any], evidence_docs: List[Document], mode: str = GRAPH_MODE) -> Dict[str, Any]:
+    current_clause = item.get("exact_clause")
+    dynamic_scope = format_evidence(evidence_docs)
+
+    # Prepare the State for Graph-based Analysis
+    state = {
+        "requirement": current_clause,
+        "evidence": dynamic_scope
+    }
+
+    # Invoke the Graph App (LangChain Graph); each node is timed under graph.<node>
+    with span("audit_clause", section=item.get("section_reference"), mode=mode):
+        out = get_graph(mode).invoke(state)
+
+    # If the auditor could not name a clause, cite the section the top evidence chunk came from
+    source_ref = out.get("source_ref")
+    if (not source_ref or source_ref == "Not Explicitly Stated") and evidence_docs:
+        source_ref = evidence_docs[0].metadata.get("section") or source_ref
+
+    # Collect the audit findings (e.g., "Missing Verification")
+    return {
+        "theme": item.get("theme"),
+        "clause": current_clause,
+        "source_ref": source_ref or "Not Explicitly Stated",                      # Dynamic from Gap Agent
+        "status": out.get("gap_status", "Not Applicable"),                        # Dynamic from Gap Agent
+        "gap_summary": out.get("gap_summary", "Not Applicable"),                  # Dynamic from Gap Agent
+        "risk_rating": out.get("rating", "Not Applicable"),                       # Dynamic from Risk Agent
+        "risk_statement": out.get("risk_statement", "Not Applicable"),            # Dynamic from Risk Agent
+        "risk_recommendation": out.get("recommended_control", "Not Applicable")   # Dynamic from Risk Agent
+    }
+
+
+def _rerank(items: List[Dict[str, Any]], candidates: List[List[Document]], reranker) -> List[List[Document]]:
+    """Batched cross-encoder pass over every clause; falls back to vector order if the model fails."""
+    try:
+        with span("rerank", pairs=sum(len(docs) for docs in candidates)):
+            return reranker.rerank_many([item.get("exact_clause") for item in items], candidates, top_n=2)
+    except Exception:
+        logger.exception("Batched reranking failed; keeping vector search order")
+        return [docs[:2] for docs in candidates]
+
+
+def iter_audit_clauses(items: List[Dict[str, Any]], db, reranker, max_workers: int = MAX_CONCURRENT_CLAUSES,
+                       mode: str = GRAPH_MODE, doc_hash: Optional[str] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Audit several clauses with at most `max_workers` in flight per stage and
+    yield (index into `items`, row) as soon as each clause finishes the graph;
+    closing the generator early cancels the clauses that have not started.
+    Rows are recorded in the result store under `doc_hash` (when given), and
+    clauses already audited under the same model/prompt/evidence versions are
+    served from it.
+    """
+    if not items:
+        return
+
+    # 0. Rule-based pre-triage: non-controls never reach retrieval or the agents
+    reasons: Dict[str, int] = {}
+    pending = []
+    for i, item in enumerate(items):
+        reason = pre_triage(item)
+        if reason is None:
+            pending.append(i)
+            continue
+        reasons[reason] = reasons.get(reason, 0) + 1
+        yield i, _out_of_scope_row(item, reason)
+    record_triage(len(items), reasons)
+    if reasons:
+        logger.info("Pre-triage marked %d/%d clauses Out of Scope (%s); ~%d LLM calls avoided",
+                    len(items) - len(pending), len(items), reasons, len(items) - len(pending))
+    if not pending:
+        return
+
+    # 0b. Clauses already audited under the same versions (in any document)
+    store = versions = None
+    if RESULTS_MEMO_ENABLED:
+        from app.storage.results import audit_versions, clause_hash, get_result_store, versions_key
+
+        store, versions = get_result_store(), audit_versions(mode)
+        try:
+            memo = store.lookup([clause_hash(items[i].get("exact_clause")) for i in pending], versions_key(versions))
+        except Exception:
+            logger.exception("Result store lookup failed; auditing every clause")
+            memo = {}
+        remaining = []
+        for i in pending:
+            row = memo.get(clause_hash(items[i].get("exact_clause")))
+            CACHE_LOOKUPS.inc(cache="results", outcome="miss" if row is None else "hit")
+            if row is None:
+                remaining.append(i)
+                continue
+            if doc_hash:
+                try:
+                    store.record_audit(doc_hash, items[i].get("exact_clause"), versions, row)
+                except Exception:
+                    logger.exception("Could not store the audit row for clause %r", items[i].get("section_reference"))
+            yield i, {**row, "theme": items[i].get("theme")}
+        if len(remaining) < len(pending):
+            logger.info("Served %d/%d clauses from the result store", len(pending) - len(remaining), len(pending))
+        pending = remaining
+        if not pending:
+            return
+
+    # 1. Retrieval for every clause in one batch
+    try:
+        retrieved = _retrieve_many([items[i] for i in pending], db)
+    except Exception as e:
+        logger.exception("Retrieval failed for %d clauses", len(pending))
+        for i in pending:
+            yield i, _error_row(items[i], e)
+        return
+
+    # 2. One batched rerank over all (clause, candidate) pairs
+    evidence = dict(zip(pending, _rerank([items[i] for i in pending], retrieved, reranker)))
+
+    # 3. Graph per clause on a bounded pool, streamed in completion order
+    def _safe_graph(i: int) -> Dict[str, Any]:
+        try:
+            row = _run_graph(items[i], evidence[i], mode)
+        except Exception as e:
+            logger.exception("Audit failed for clause %r", items[i].get("section_reference"))
+            return _error_row(items[i], e)
+        if store is not None and doc_hash:
+            try:
+                store.record_audit(doc_hash, items[i].get("exact_clause"), versions, row)
+            except Exception:
+                logger.exception("Could not store the audit row for clause %r", items[i].get("section_reference"))
+        return row
+
+    workers = max(1, min(max_workers, len(pending)))
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="clause-audit")
+    try:
+        futures = {pool.submit(in_context(_safe_graph), i): i for i in pending}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        # A consumer that stops early (closed SSE stream) cancels the clauses not started yet
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def audit_clauses(items: List[Dict[str, Any]], db, reranker, max_workers: int = MAX_CONCURRENT_CLAUSES,
+                  mode: str = GRAPH_MODE, doc_hash: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Audit several clauses with at most `max_workers` in flight per stage.
+    The returned rows follow the order of `items`.
+    """
+    rows: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    for i, row in iter_audit_clauses(items, db, reranker, max_workers, mode, doc_hash):
+        rows[i] = row
+    return rows
@@ -0,0 +1,81 @@
+'''
+The analysis steps behind the web routes, written so they can run either in
+the request thread or on a background job worker.
+
+Each handler takes the job payload plus a `progress(done, total)` callback and
+returns a JSON-serialisable result.
+'''
+
+import os
+from typing import Any, Callable, Dict, List
+
+from app.config import CHAT_MODEL, GRAPH_MODE, INTERPRET_PART_CHARS, RESULTS_MEMO_ENABLED
+from app.telemetry.tracing import span, trace
+
+Progress = Callable[[int, int], None]
+
+
+def _no_progress(done: int, total: int) -> None:
+    pass
+
+
+def analyze_upload(payload: Dict[str, Any], progress: Progress = _no_progress) -> Dict[str, Any]:
+    """
+    Interpret an uploaded policy; payload = {"path": saved upload, "filename": original name},
+    plus "text" when the caller already extracted it (the batch CLI parses on its own threads).
+    """
+    from app.agents.new_doc_interpreter import PROMPT_VERSION, interpret_new_document
+    from app.llm.registry import get_chat_model
+    from app.rag.pdf_stream import extract_text
+    from app.storage.results import file_hash, get_result_store
+
+    # Every stage below is timed; with TRACE_DIR set the whole analysis is written as one trace
+    with trace("analyze", filename=payload.get("filename")):
+        # 0. The same file interpreted under the same settings is served from the result store
+        store = get_result_store()
+        doc_hash = file_hash(payload["path"])
+        interpreter_version = f"{CHAT_MODEL}|{PROMPT_VERSION}|{INTERPRET_PART_CHARS}"
+        stored = store.get_interpretation(doc_hash, interpreter_version) if RESULTS_MEMO_ENABLED else None
+        if stored is not None:
+            return {**stored, "doc_hash": doc_hash}
+
+        # 1. Extract full text in page order (no chunking or embedding)
+        policy_text = payload.get("text")
+        if policy_text is None:
+            with span("extract"):
+                policy_text = extract_text(payload["path"])
+
+        # 2. Interpret the policy, reporting each finished part
+        llm = get_chat_model(CHAT_MODEL, temperature=0)
+        interpreted = interpret_new_document(llm, policy_text, progress=progress)
+
+        # 3. Keep it (and its clause list, for policy diffs) only if every part was interpreted;
+        #    a partial result is returned but not memoized, so the next upload retries the failed parts
+        if interpreted.get("analysis") and not interpreted.get("failed_parts"):
+            filename = payload.get("filename") or os.path.basename(payload["path"])
+            store.record_document(doc_hash, filename, interpreter_version, interpreted)
+        return {**interpreted, "doc_hash": doc_hash}
+
+
+def audit_review(payload: Dict[str, Any], progress: Progress = _no_progress) -> Dict[str, Any]:
+    """Audit approved clauses; payload = {"items": [...], "metadata": {...}, "doc_hash": ..., "mode": optional}."""
+    from app.graph.runner import iter_audit_clauses
+    from app.rag.reranker import get_reranker
+    from app.rag.vectorstore_indexer import get_vector_db
+
+    items: List[Dict[str, Any]] = payload.get("items", [])
+    rows: List[Any] = [None] * len(items)
+    with trace("review", clauses=len(items)):
+        progress(0, len(items))
+        audited = iter_audit_clauses(items, get_vector_db(), get_reranker(), mode=payload.get("mode", GRAPH_MODE),
+                                     doc_hash=payload.get("doc_hash"))
+        for done, (index, row) in enumerate(audited, start=1):
+            rows[index] = row
+            progress(done, len(items))
+        return {"results": rows, "metadata": payload.get("metadata", {})}
+
+
+HANDLERS: Dict[str, Callable[[Dict[str, Any], Progress], Dict[str, Any]]] = {
+    "analyze": analyze_upload,
+    "review": audit_review,
+}
@@ -0,0 +1,166 @@
+'''
+Durable local job queue for analysis runs.
+
+Jobs live in a SQLite file (WAL mode) so they survive restarts and can be
+shared by the web process and standalone worker processes without an external
+broker. A worker claims the oldest queued job inside an IMMEDIATE transaction,
+so two workers never pick up the same job. Running jobs carry a heartbeat;
+jobs whose worker stopped beating (process killed, host restarted) are put
+back on the queue by whichever pool notices first, and the late worker's
+complete()/fail() no longer matches the job, so it cannot overwrite the
+result of the worker that picked it up again.
+'''
+
+import json
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from app.config import JOBS_DB_PATH, JOB_MAX_ATTEMPTS, JOB_STALE_SECONDS
+from app.storage.sqlite import per_thread_connection
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id             TEXT PRIMARY KEY,
+    kind           TEXT NOT NULL,
+    status         TEXT NOT NULL,
+    payload        TEXT NOT NULL,
+    result         TEXT,
+    error          TEXT,
+    progress_done  INTEGER NOT NULL DEFAULT 0,
+    progress_total INTEGER NOT NULL DEFAULT 0,
+    attempts       INTEGER NOT NULL DEFAULT 0,
+    worker         TEXT,
+    created_at     REAL NOT NULL,
+    started_at     REAL,
+    heartbeat_at   REAL,
+    finished_at    REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at);
+"""
+
+
+class JobQueue:
+    def __init__(self, path: str = JOBS_DB_PATH):
+        self.path = path
+        self._connect = per_thread_connection(path, _SCHEMA)
+
+    def enqueue(self, kind: str, payload: Dict[str, Any]) -> str:
+        job_id = uuid.uuid4().hex
+        self._connect().execute(
+            "INSERT INTO jobs (id, kind, status, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, kind, QUEUED, json.dumps(payload), time.time()),
+        )
+        return job_id
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """Atomically move the oldest queued job to running and return it (None if the queue is empty)."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, started_at = ?, heartbeat_at = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                (RUNNING, worker, now, now, row["id"]),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(row["id"], with_payload=True)
+
+    def set_progress(self, job_id: str, done: int, total: int) -> None:
+        self._connect().execute(
+            "UPDATE jobs SET progress_done = ?, progress_total = ?, heartbeat_at = ? WHERE id = ?",
+            (done, total, time.time(), job_id),
+        )
+
+    def heartbeat(self, job_ids: List[str]) -> None:
+        if job_ids:
+            placeholders = ",".join("?" * len(job_ids))
+            self._connect().execute(
+                f"UPDATE jobs SET heartbeat_at = ? WHERE status = ? AND id IN ({placeholders})",
+                (time.time(), RUNNING, *job_ids),
+            )
+
+    def complete(self, job_id: str, worker: str, result: Any) -> bool:
+        """Store the result; False if `worker` lost the job (requeued as stale), in which case nothing is written."""
+        return self._connect().execute(
+            "UPDATE jobs SET status = ?, result = ?, finished_at = ? WHERE id = ? AND worker = ? AND status = ?",
+            (DONE, json.dumps(result), time.time(), job_id, worker, RUNNING),
+        ).rowcount > 0
+
+    def fail(self, job_id: str, worker: str, error: str) -> bool:
+        """Mark the job failed; False if `worker` no longer holds it."""
+        return self._connect().execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND worker = ? AND status = ?",
+            (FAILED, error, time.time(), job_id, worker, RUNNING),
+        ).rowcount > 0
+
+    def requeue_stale(self, stale_after: float = JOB_STALE_SECONDS, max_attempts: int = JOB_MAX_ATTEMPTS) -> int:
+        """Put running jobs whose heartbeat stopped back on the queue; give up on those that keep dying."""
+        conn = self._connect()
+        cutoff = time.time() - stale_after
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = 'worker stopped responding', finished_at = ? "
+                "WHERE status = ? AND heartbeat_at < ? AND attempts >= ?",
+                (FAILED, time.time(), RUNNING, cutoff, max_attempts),
+            )
+            requeued = conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL WHERE status = ? AND heartbeat_at < ?",
+                (QUEUED, RUNNING, cutoff),
+            ).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return requeued
+
+    def get(self, job_id: str, with_payload: bool = False) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"]) if with_payload else None
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: n for status, n in rows}
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(
+            "SELECT id, kind, status, progress_done, progress_total, error, created_at, started_at, finished_at "
+            "FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue()
+    return _queue
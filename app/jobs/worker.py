@@ -0,0 +1,140 @@
+'''
+Local worker pool for the job queue.
+
+The Flask app starts one pool in-process (JOB_WORKERS_IN_WEB=1); more
+throughput comes from extra worker processes on the same machine, all sharing
+the SQLite queue:
+
+    python -m app.jobs.worker --workers 4
+'''
+
+import argparse
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Dict, List, Optional
+
+from app.config import JOB_POLL_INTERVAL, JOB_STALE_SECONDS, JOB_WORKERS
+from app.jobs.queue import JobQueue, get_job_queue
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPool:
+    def __init__(self, queue: Optional[JobQueue] = None, workers: int = JOB_WORKERS,
+                 poll_interval: float = JOB_POLL_INTERVAL):
+        self.queue = queue or get_job_queue()
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._running: Dict[str, str] = {}   # worker name -> job id
+        self._running_lock = threading.Lock()
+        self._prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+    def start(self) -> "WorkerPool":
+        for i in range(self.workers):
+            t = threading.Thread(target=self._work, args=(f"{self._prefix}:{i}",), name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        t = threading.Thread(target=self._watch, name="job-heartbeat", daemon=True)
+        t.start()
+        self._threads.append(t)
+        logger.info("Started %d job workers on %s", self.workers, self.queue.path)
+        return self
+
+    def notify(self) -> None:
+        """Wake idle workers right away instead of waiting for the next poll."""
+        self._wake.set()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+
+    def _work(self, name: str) -> None:
+        from app.jobs.handlers import HANDLERS
+        from app.llm.rate_limiter import BULK, llm_priority
+
+        while not self._stop.is_set():
+            try:
+                job = self.queue.claim(name)
+            except Exception:
+                logger.exception("Could not claim a job")
+                job = None
+            if job is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+
+            job_id = job["id"]
+            with self._running_lock:
+                self._running[name] = job_id
+            started = time.perf_counter()
+            try:
+                handler = HANDLERS[job["kind"]]
+                # Background jobs yield OpenAI capacity to interactive reviews
+                with llm_priority(BULK):
+                    result = handler(job["payload"], lambda done, total: self.queue.set_progress(job_id, done, total))
+                if self.queue.complete(job_id, name, result):
+                    logger.info("Job %s (%s) done in %.1fs", job_id, job["kind"], time.perf_counter() - started)
+                else:
+                    logger.warning("Job %s (%s) lost its lease (requeued as stale); result discarded",
+                                   job_id, job["kind"])
+            except Exception as e:
+                logger.exception("Job %s (%s) failed", job_id, job["kind"])
+                if not self.queue.fail(job_id, name, f"{type(e).__name__}: {e}"):
+                    logger.warning("Job %s (%s) lost its lease (requeued as stale); failure not recorded",
+                                   job_id, job["kind"])
+            finally:
+                with self._running_lock:
+                    self._running.pop(name, None)
+
+    def _watch(self) -> None:
+        # Keep our running jobs alive and recover jobs orphaned by dead workers elsewhere
+        interval = max(1.0, JOB_STALE_SECONDS / 4)
+        while not self._stop.wait(interval):
+            try:
+                with self._running_lock:
+                    running = list(self._running.values())
+                self.queue.heartbeat(running)
+                if self.queue.requeue_stale():
+                    self.notify()
+            except Exception:
+                logger.exception("Job heartbeat failed")
+
+
+_pool: Optional[WorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def start_worker_pool(workers: int = JOB_WORKERS) -> WorkerPool:
+    """Start the process-wide pool once; later calls return the running pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            get_job_queue().requeue_stale()
+            _pool = WorkerPool(workers=workers).start()
+    return _pool
+
+
+def get_worker_pool() -> Optional[WorkerPool]:
+    return _pool
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run background analysis job workers")
+    parser.add_argument("--workers", type=int, default=JOB_WORKERS, help="worker threads in this process")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    pool = start_worker_pool(args.workers)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pool.stop(timeout=5)
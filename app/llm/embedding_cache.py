@@ -0,0 +1,122 @@
+'''
+Persistent, content-addressed cache for embedding vectors.
+
+Vectors are keyed by (model, sha256(text)) and stored as raw float32 blobs in a
+local SQLite file, so re-uploading a policy only pays for the chunks whose text
+actually changed. The least recently used entries are evicted once the cache
+grows past `max_entries`.
+'''
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# SQLite's default limit on host parameters is 999; stay well below it
+_LOOKUP_BATCH = 500
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, path: str, max_entries: int = 200_000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened lazily so importing the LLM layer never touches the disk
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model     TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    vector    BLOB NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Bulk lookup. Returns one vector per text, or None for a cache miss."""
+        hashes = [text_hash(t) for t in texts]
+        unique = list(dict.fromkeys(hashes))
+        found: Dict[str, List[float]] = {}
+
+        with self._lock:
+            conn = self._connect()
+            for start in range(0, len(unique), _LOOKUP_BATCH):
+                batch = unique[start:start + _LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    (model, *batch),
+                ).fetchall()
+                for h, blob in rows:
+                    found[h] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+            if found:
+                now = time.time()
+                conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, h) for h in found],
+                )
+
+            results = [found.get(h) for h in hashes]
+            hit_count = sum(1 for v in results if v is not None)
+            self.hits += hit_count
+            self.misses += len(results) - hit_count
+
+        return results
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        now = time.time()
+        rows = [
+            (model, text_hash(t), np.asarray(v, dtype=np.float32).tobytes(), now)
+            for t, v in zip(texts, vectors)
+        ]
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._evict(conn, protect_since=now)
+
+    def _evict(self, conn: sqlite3.Connection, protect_since: float) -> None:
+        # Entries written by the current call are never evicted by it
+        (count,) = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                """
+                DELETE FROM embeddings WHERE (model, text_hash) IN (
+                    SELECT model, text_hash FROM embeddings
+                    WHERE last_used < ? ORDER BY last_used LIMIT ?
+                )
+                """,
+                (protect_since, overflow),
+            )
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            (entries,) = self._connect().execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            return {"hits": self.hits, "misses": self.misses, "entries": entries}
@@ -1,13 +1,83 @@
 from __future__ import annotations
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
+from typing import Iterator, Optional
+import httpx
+import openai
 from openai import OpenAI
-from app.config import OPENAI_API_KEY, CHAT_MODEL, EMBED_MODEL
+from langchain_core.embeddings import Embeddings
+from app.config import (
+    require_openai_api_key, CHAT_MODEL, EMBED_MODEL, OPENAI_BASE_URL,
+    EMBED_CACHE_ENABLED, EMBED_CACHE_PATH, EMBED_CACHE_MAX_ENTRIES,
+    EMBED_BATCH_MAX_TOKENS, EMBED_BATCH_MAX_INPUTS, EMBED_CONCURRENCY, EMBED_MAX_RETRIES,
+    LLM_HTTP_MAX_CONNECTIONS, LLM_HTTP_MAX_KEEPALIVE, LLM_HTTP_TIMEOUT, LLM_RATE_LIMIT_ENABLED,
+)
+from app.llm.embedding_cache import EmbeddingCache
+from app.llm.rate_limiter import ThrottledTransport, get_rate_limiter
+from app.telemetry.metrics import RETRIES
+from app.telemetry.tracing import in_context, observe_openai_response, span
 
-_client = OpenAI(api_key=OPENAI_API_KEY)
+logger = logging.getLogger(__name__)
+
+_client: Optional[OpenAI] = None
+_http_client: Optional[httpx.Client] = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> httpx.Client:
+    """One pooled keep-alive HTTP client shared by every OpenAI and LangChain client, behind the rate limiter."""
+    global _http_client
+    if _http_client is None:
+        with _client_lock:
+            if _http_client is None:
+                transport: httpx.BaseTransport = httpx.HTTPTransport(
+                    limits=httpx.Limits(
+                        max_connections=LLM_HTTP_MAX_CONNECTIONS,
+                        max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE,
+                    ),
+                )
+                if LLM_RATE_LIMIT_ENABLED:
+                    # Every request waits for the process-wide RPM/TPM/concurrency scheduler
+                    transport = ThrottledTransport(get_rate_limiter(), transport)
+                _http_client = httpx.Client(
+                    transport=transport,
+                    timeout=httpx.Timeout(LLM_HTTP_TIMEOUT, connect=10.0),
+                    # Request counts, latency and token usage for /metrics, attributed to the current span
+                    event_hooks={"response": [observe_openai_response]},
+                )
+    return _http_client
+
+
+def get_client() -> OpenAI:
+    """Process-wide OpenAI client, built on first use so importing this module stays cheap."""
+    global _client
+    if _client is None:
+        http_client = get_http_client()
+        with _client_lock:
+            if _client is None:
+                _client = OpenAI(api_key=require_openai_api_key(), base_url=OPENAI_BASE_URL, http_client=http_client)
+    return _client
+
+# Errors worth retrying with backoff; anything else is a real failure
+_RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)."""
+    return len(text) // 4 + 1
 
 # ---------- Chat ----------
 def chat(system: str, user: str, temperature: float = 0.2) -> str:
-    resp = _client.chat.completions.create(
+    resp = get_client().chat.completions.create(
         model=CHAT_MODEL,
         temperature=temperature,
         messages=[
@@ -32,21 +102,101 @@ llm = SimpleLLM()
 
 
 # ---------- Embeddings ----------
-class OpenAIEmbeddings:
+def _token_batches(texts: list[str], max_tokens: int, max_inputs: int) -> Iterator[list[int]]:
+    """Group text indices into requests that stay under the token and input budgets."""
+    batch: list[int] = []
+    batch_tokens = 0
+    for i, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if batch and (batch_tokens + tokens > max_tokens or len(batch) >= max_inputs):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(i)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+class OpenAIEmbeddings(Embeddings):
+    def __init__(self, cache: Optional[EmbeddingCache] = None):
+        self.cache = cache
+
+    def _embed_api(self, texts: list[str]) -> list[list[float]]:
+        for attempt in range(EMBED_MAX_RETRIES + 1):
+            try:
+                resp = get_client().embeddings.create(
+                    model=EMBED_MODEL,
+                    input=texts,
+                )
+                return [d.embedding for d in resp.data]
+            except _RETRYABLE_ERRORS as e:
+                if attempt == EMBED_MAX_RETRIES:
+                    raise
+                # Exponential backoff with jitter so parallel batches don't retry in lockstep
+                delay = min(2 ** attempt, 30) + random.uniform(0, 1)
+                RETRIES.inc(operation="embed")
+                logger.warning("Embedding batch of %d failed (%s); retrying in %.1fs", len(texts), e, delay)
+                time.sleep(delay)
+
+    def iter_embeddings(self, texts: list[str]) -> Iterator[tuple[list[int], list[list[float]]]]:
+        """
+        Yield (indices, vectors) as soon as each group of embeddings is available:
+        cache hits first, then API batches in completion order.
+        """
+        texts = list(texts)
+        if self.cache is not None:
+            cached = self.cache.get_many(EMBED_MODEL, texts)
+            hits = [i for i, v in enumerate(cached) if v is not None]
+            if hits:
+                yield hits, [cached[i] for i in hits]
+            missing = [i for i, v in enumerate(cached) if v is None]
+        else:
+            missing = list(range(len(texts)))
+
+        if not missing:
+            return
+
+        # Deduplicate the misses so repeated chunks (headers, footers) are embedded once
+        positions: dict[str, list[int]] = {}
+        for i in missing:
+            positions.setdefault(texts[i], []).append(i)
+        unique = list(positions)
+
+        batches = list(_token_batches(unique, EMBED_BATCH_MAX_TOKENS, EMBED_BATCH_MAX_INPUTS))
+        workers = max(1, min(EMBED_CONCURRENCY, len(batches)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embed") as pool:
+            futures = {
+                pool.submit(in_context(self._embed_api), [unique[j] for j in batch]): batch
+                for batch in batches
+            }
+            for future in as_completed(futures):
+                batch_texts = [unique[j] for j in futures[future]]
+                vectors = future.result()
+                if self.cache is not None:
+                    self.cache.put_many(EMBED_MODEL, batch_texts, vectors)
+
+                indices: list[int] = []
+                out: list[list[float]] = []
+                for text, vector in zip(batch_texts, vectors):
+                    for i in positions[text]:
+                        indices.append(i)
+                        out.append(vector)
+                yield indices, out
+
     def embed_documents(self, texts: list[str]) -> list[list[float]]:
-        resp = _client.embeddings.create(
-            model=EMBED_MODEL,
-            input=texts,
-        )
-        return [d.embedding for d in resp.data]
+        texts = list(texts)
+        vectors: list[Optional[list[float]]] = [None] * len(texts)
+        with span("embed", texts=len(texts)):
+            for indices, batch_vectors in self.iter_embeddings(texts):
+                for i, vector in zip(indices, batch_vectors):
+                    vectors[i] = vector
+        return vectors
 
     def embed_query(self, text: str) -> list[float]:
-        resp = _client.embeddings.create(
-            model=EMBED_MODEL,
-            input=text,
-        )
-        return resp.data[0].embedding
+        return self.embed_documents([text])[0]
 
 
 # ✅ what RAG code imports
-embeddings = OpenAIEmbeddings()
+embeddings = OpenAIEmbeddings(
+    cache=EmbeddingCache(EMBED_CACHE_PATH, EMBED_CACHE_MAX_ENTRIES) if EMBED_CACHE_ENABLED else None
+)
@@ -0,0 +1,328 @@
+'''
+Process-wide scheduler for OpenAI API calls.
+
+Every request on the shared HTTP client (chat, structured agents, the
+interpreter and embeddings alike) goes through ThrottledTransport, which
+waits for a permit from the RateLimiter before sending it:
+
+    budgets      requests-per-minute and tokens-per-minute token buckets; the
+                 cost of a request is estimated from its body up front (prompt
+                 characters / 4, plus max_tokens or LLM_EST_COMPLETION_TOKENS).
+                 With LLM_RPM_LIMIT / LLM_TPM_LIMIT at 0 the limits are learned
+                 from OpenAI's x-ratelimit-limit-* headers (times
+                 LLM_RATE_HEADROOM).
+    concurrency  AIMD: +1/limit per fast success, halved on a 429 (at most once
+                 per second, so one burst of 429s is one decrease), and held
+                 while latency is above LLM_LATENCY_TOLERANCE x the baseline.
+                 A 429's Retry-After pauses all dispatch until it passes.
+    priority     waiters are served by enqueue time plus a handicap of
+                 LLM_PRIORITY_AGING_SECONDS for bulk calls, so interactive
+                 reviews go first without starving batch jobs.
+
+Priority is taken from the caller's context: llm_priority(BULK) around a
+background job marks every call made below it, including worker threads
+started with app.telemetry.tracing.in_context(). Budgets are per process; with
+several gunicorn workers set explicit limits of account limit / workers.
+'''
+
+import contextvars
+import heapq
+import itertools
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+import httpx
+
+from app.config import (
+    LLM_EST_COMPLETION_TOKENS,
+    LLM_INITIAL_CONCURRENCY,
+    LLM_LATENCY_TOLERANCE,
+    LLM_MAX_CONCURRENCY,
+    LLM_MIN_CONCURRENCY,
+    LLM_PRIORITY_AGING_SECONDS,
+    LLM_RATE_HEADROOM,
+    LLM_RPM_LIMIT,
+    LLM_TPM_LIMIT,
+)
+from app.telemetry.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar("llm_priority", default=INTERACTIVE)
+
+WAIT_SECONDS = REGISTRY.histogram(
+    "policy_gap_openai_queue_wait_seconds",
+    "Time OpenAI requests waited for a rate-limit permit, by priority.",
+    ["priority"],
+)
+THROTTLED = REGISTRY.counter(
+    "policy_gap_openai_throttled_total",
+    "429 responses that shrank the concurrency limit or paused dispatch.",
+)
+
+
+@contextmanager
+def llm_priority(level: str) -> Iterator[None]:
+    """Run the block's OpenAI calls at `level` (INTERACTIVE or BULK)."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+class _Bucket:
+    """Token bucket refilled continuously at `limit` per minute; 0 means unlimited."""
+
+    def __init__(self, limit: float):
+        self.limit = float(limit)
+        self.level = float(limit)
+        self.updated = time.monotonic()
+
+    def set_limit(self, limit: float) -> None:
+        self.level = min(self.level, limit) if self.limit else float(limit)
+        self.limit = float(limit)
+
+    def refill(self, now: float) -> None:
+        if self.limit:
+            self.level = min(self.limit, self.level + (now - self.updated) * self.limit / 60.0)
+        self.updated = now
+
+    def wait_for(self, amount: float) -> float:
+        """Seconds until `amount` is available (0 if it is now); a cost above the limit waits for a full bucket."""
+        if not self.limit:
+            return 0.0
+        needed = min(amount, self.limit) - self.level
+        return max(0.0, needed * 60.0 / self.limit)
+
+    def take(self, amount: float) -> None:
+        if self.limit:
+            self.level -= min(amount, self.limit)
+
+
+class _Waiter:
+    __slots__ = ("key", "seq", "tokens", "priority", "enqueued")
+
+    def __init__(self, key: float, seq: int, tokens: int, priority: str, enqueued: float):
+        self.key, self.seq, self.tokens, self.priority, self.enqueued = key, seq, tokens, priority, enqueued
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.key, self.seq) < (other.key, other.seq)
+
+
+class RateLimiter:
+    def __init__(self, rpm: int = LLM_RPM_LIMIT, tpm: int = LLM_TPM_LIMIT,
+                 min_concurrency: int = LLM_MIN_CONCURRENCY, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 initial_concurrency: int = LLM_INITIAL_CONCURRENCY):
+        self.requests = _Bucket(rpm)
+        self.tokens = _Bucket(tpm)
+        self._learn_rpm = not rpm
+        self._learn_tpm = not tpm
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.limit = float(min(max(initial_concurrency, self.min_concurrency), self.max_concurrency))
+        self.in_flight = 0
+        self.baseline_latency: Dict[str, float] = {}   # per endpoint: embeddings are far faster than chat
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._queue: list = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._counts = {"dispatched": 0, "throttled": 0}
+
+    # --- Dispatch ---
+
+    def acquire(self, tokens: int, priority: str = INTERACTIVE) -> float:
+        """Block until this request may be sent; returns the time it was dispatched."""
+        now = time.monotonic()
+        handicap = LLM_PRIORITY_AGING_SECONDS if priority == BULK else 0.0
+        waiter = _Waiter(now + handicap, next(self._seq), tokens, priority, now)
+        with self._cond:
+            heapq.heappush(self._queue, waiter)
+            try:
+                while True:
+                    now = time.monotonic()
+                    delay = self._delay(waiter, now)
+                    if delay == 0.0:
+                        break
+                    self._cond.wait(timeout=delay if delay != float("inf") else None)
+            except BaseException:
+                # Interrupted while queued: leave the queue so the waiters behind can move up
+                self._queue.remove(waiter)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+                raise
+
+            heapq.heappop(self._queue)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self.in_flight += 1
+            self._counts["dispatched"] += 1
+            # The next waiter may be dispatchable right away
+            self._cond.notify_all()
+        WAIT_SECONDS.observe(now - waiter.enqueued, priority=priority)
+        return now
+
+    def _delay(self, waiter: _Waiter, now: float) -> float:
+        """0 when `waiter` may go now; otherwise how long to sleep before checking again (inf = until notified)."""
+        if self._queue[0] is not waiter:
+            return float("inf")
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self.in_flight >= int(self.limit):
+            return float("inf")
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        return max(self.requests.wait_for(1), self.tokens.wait_for(waiter.tokens))
+
+    # --- Feedback ---
+
+    def release(self, dispatched_at: float, status: Optional[int], headers: Optional[httpx.Headers] = None,
+                endpoint: str = "") -> None:
+        now = time.monotonic()
+        latency = now - dispatched_at
+        with self._cond:
+            self.in_flight -= 1
+            if headers is not None:
+                self._learn_limits(headers)
+
+            if status == 429:
+                self._counts["throttled"] += 1
+                THROTTLED.inc()
+                retry_after = _retry_after(headers)
+                if retry_after:
+                    self._paused_until = max(self._paused_until, now + retry_after)
+                if now - self._last_decrease >= 1.0:
+                    self.limit = max(float(self.min_concurrency), self.limit / 2)
+                    self._last_decrease = now
+                    logger.warning("OpenAI rate limit hit; concurrency limit now %d%s", int(self.limit),
+                                   f", paused {retry_after:.1f}s" if retry_after else "")
+            elif status is not None and status < 400:
+                # Baseline = fastest recent latency, drifting up slowly so it tracks a changed model/prompt size
+                baseline = self.baseline_latency.get(endpoint)
+                if baseline is None or latency < baseline:
+                    baseline = latency
+                else:
+                    baseline += (latency - baseline) * 0.01
+                self.baseline_latency[endpoint] = baseline
+                if latency <= baseline * LLM_LATENCY_TOLERANCE:
+                    self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+    def _learn_limits(self, headers: httpx.Headers) -> None:
+        for learn, bucket, kind in ((self._learn_rpm, self.requests, "requests"),
+                                    (self._learn_tpm, self.tokens, "tokens")):
+            account_limit = _int_header(headers, f"x-ratelimit-limit-{kind}")
+            if learn and account_limit:
+                limit = account_limit * LLM_RATE_HEADROOM
+                if limit != bucket.limit:
+                    bucket.set_limit(limit)
+                    logger.info("Learned OpenAI %s limit %d/min; budgeting %d/min", kind, account_limit, limit)
+
+            # The account's remaining budget also covers calls from other processes; never plan past it
+            remaining = _int_header(headers, f"x-ratelimit-remaining-{kind}")
+            if bucket.limit and remaining is not None and account_limit:
+                reserve = account_limit * (1 - LLM_RATE_HEADROOM)
+                in_flight = self.in_flight if kind == "requests" else 0
+                bucket.level = min(bucket.level, remaining - reserve - in_flight)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            queued = {INTERACTIVE: 0, BULK: 0}
+            for waiter in self._queue:
+                queued[waiter.priority] = queued.get(waiter.priority, 0) + 1
+            return {
+                "concurrency_limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "queued": queued,
+                "rpm_limit": self.requests.limit,
+                "tpm_limit": self.tokens.limit,
+                "baseline_latency_s": {k: round(v, 4) for k, v in self.baseline_latency.items()},
+                **self._counts,
+            }
+
+
+def _int_header(headers: httpx.Headers, name: str) -> Optional[int]:
+    try:
+        return int(headers[name]) if name in headers else None
+    except ValueError:
+        return None
+
+
+def _retry_after(headers: Optional[httpx.Headers]) -> float:
+    if headers is None:
+        return 0.0
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value:
+            try:
+                return min(float(value) * scale, 60.0)
+            except ValueError:
+                pass
+    return 0.0
+
+
+def estimate_request_tokens(request: httpx.Request) -> int:
+    """Up-front token cost of an OpenAI request: prompt characters / 4 plus the expected completion."""
+    try:
+        body = json.loads(request.content or b"{}")
+    except (ValueError, httpx.RequestNotRead):
+        return 1
+    if not isinstance(body, dict):
+        return 1
+    if "input" in body:
+        inputs = body["input"]
+        inputs = [inputs] if isinstance(inputs, str) else inputs
+        return sum(len(str(text)) // 4 + 1 for text in inputs)
+
+    chars = sum(len(str(m.get("content") or "")) for m in body.get("messages", []) if isinstance(m, dict))
+    chars += len(json.dumps(body["tools"])) if body.get("tools") else 0
+    completion = body.get("max_completion_tokens") or body.get("max_tokens") or LLM_EST_COMPLETION_TOKENS
+    return chars // 4 + 1 + int(completion)
+
+
+class ThrottledTransport(httpx.BaseTransport):
+    """httpx transport that holds each request until the RateLimiter lets it go."""
+
+    def __init__(self, limiter: RateLimiter, inner: httpx.BaseTransport):
+        self.limiter = limiter
+        self.inner = inner
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        dispatched_at = self.limiter.acquire(estimate_request_tokens(request), current_priority())
+        try:
+            response = self.inner.handle_request(request)
+        except Exception:
+            # Connection errors and timeouts carry no rate-limit signal; free the slot
+            self.limiter.release(dispatched_at, None, endpoint=request.url.path.rsplit("/", 1)[-1])
+            raise
+        self.limiter.release(dispatched_at, response.status_code, response.headers,
+                             request.url.path.rsplit("/", 1)[-1])
+        return response
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
@@ -0,0 +1,54 @@
+'''
+Shared LangChain chat clients and structured-output runnables.
+
+Agents used to build a new ChatOpenAI and a new with_structured_output()
+wrapper for every clause, throwing away the HTTP connection pool and the
+schema-to-tool conversion each time. Here both are built once per
+(model, temperature[, schema]) and reused across clauses, requests and
+threads; all of them share the keep-alive pool from get_http_client().
+'''
+
+import threading
+from typing import Dict, Tuple, Type
+
+from langchain_core.runnables import Runnable
+from langchain_openai import ChatOpenAI
+from pydantic import BaseModel
+
+from app.config import CHAT_MODEL, OPENAI_BASE_URL, require_openai_api_key
+from app.llm.openai_client import get_http_client
+
+_lock = threading.RLock()
+_chat_models: Dict[Tuple[str, float], ChatOpenAI] = {}
+_structured: Dict[Tuple[str, float, Type[BaseModel]], Runnable] = {}
+
+
+def get_chat_model(model: str = CHAT_MODEL, temperature: float = 0.0) -> ChatOpenAI:
+    key = (model, float(temperature))
+    llm = _chat_models.get(key)
+    if llm is None:
+        with _lock:
+            llm = _chat_models.get(key)
+            if llm is None:
+                llm = ChatOpenAI(
+                    model=model,
+                    temperature=temperature,
+                    api_key=require_openai_api_key(),
+                    base_url=OPENAI_BASE_URL,
+                    http_client=get_http_client(),
+                )
+                _chat_models[key] = llm
+    return llm
+
+
+def get_structured_llm(schema: Type[BaseModel], model: str = CHAT_MODEL, temperature: float = 0.0) -> Runnable:
+    """Prebuilt `with_structured_output(schema)` runnable for the given model settings."""
+    key = (model, float(temperature), schema)
+    runnable = _structured.get(key)
+    if runnable is None:
+        with _lock:
+            runnable = _structured.get(key)
+            if runnable is None:
+                runnable = get_chat_model(model, temperature).with_structured_output(schema)
+                _structured[key] = runnable
+    return runnable
@@ -0,0 +1,253 @@
+'''
+Persistent cache for the agents' structured LLM responses.
+
+Entries are keyed by (agent, model@temperature, prompt version, sha256 of the
+agent's variable inputs) and stored as JSON in a local SQLite file, so
+re-auditing an unchanged policy, or boilerplate clauses shared across
+policies, costs no LLM calls. Entries expire after LLM_CACHE_TTL_SECONDS and
+the least recently used ones are evicted past LLM_CACHE_MAX_ENTRIES.
+
+With LLM_CACHE_SEMANTIC=1 a miss on the exact key falls back to the most
+similar cached input for the same agent/model/prompt version, accepted only
+above LLM_CACHE_SEMANTIC_THRESHOLD cosine similarity. Bump an agent's
+PROMPT_VERSION whenever its prompt or schema changes.
+'''
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+import numpy as np
+from pydantic import BaseModel, ValidationError
+
+from app.config import (
+    CHAT_MODEL,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_PATH,
+    LLM_CACHE_SEMANTIC,
+    LLM_CACHE_SEMANTIC_THRESHOLD,
+    LLM_CACHE_TTL_SECONDS,
+)
+from app.telemetry.tracing import annotate
+
+logger = logging.getLogger(__name__)
+
+Namespace = Tuple[str, str, str]   # (agent, model@temperature, prompt version)
+
+
+def key_hash(key_text: str) -> str:
+    return hashlib.sha256(key_text.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path: str, max_entries: int = 50_000, ttl_seconds: float = 30 * 86400,
+                 semantic_threshold: Optional[float] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.semantic_threshold = semantic_threshold
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        # Per-namespace (key hashes, normalised embedding matrix) for near-duplicate lookups
+        self._vectors: Dict[Namespace, Tuple[List[str], np.ndarray]] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened lazily so importing the agents never touches the disk
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    agent          TEXT NOT NULL,
+                    model          TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    key_hash       TEXT NOT NULL,
+                    response       TEXT NOT NULL,
+                    embedding      BLOB,
+                    created_at     REAL NOT NULL,
+                    last_used      REAL NOT NULL,
+                    PRIMARY KEY (agent, model, prompt_version, key_hash)
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_created_at ON responses(created_at)")
+            self._conn = conn
+        return self._conn
+
+    def _count(self, agent: str, outcome: str) -> None:
+        counters = self._counters.setdefault(agent, {"exact_hits": 0, "semantic_hits": 0, "misses": 0})
+        counters[outcome] += 1
+
+    def _load_vectors(self, conn: sqlite3.Connection, ns: Namespace) -> Tuple[List[str], np.ndarray]:
+        if ns not in self._vectors:
+            rows = conn.execute(
+                "SELECT key_hash, embedding FROM responses "
+                "WHERE agent = ? AND model = ? AND prompt_version = ? AND embedding IS NOT NULL",
+                ns,
+            ).fetchall()
+            hashes = [h for h, _ in rows]
+            matrix = (np.vstack([np.frombuffer(b, dtype=np.float32) for _, b in rows])
+                      if rows else np.zeros((0, 0), dtype=np.float32))
+            self._vectors[ns] = (hashes, matrix)
+        return self._vectors[ns]
+
+    def get(self, ns: Namespace, key_text: str,
+            vector: Optional[np.ndarray] = None) -> Optional[Dict[str, Any]]:
+        """Cached response for `key_text`, trying the exact key first and then (if a vector is given) the nearest one."""
+        agent = ns[0]
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            h = key_hash(key_text)
+            row = conn.execute(
+                "SELECT response FROM responses WHERE agent = ? AND model = ? AND prompt_version = ? "
+                "AND key_hash = ? AND created_at >= ?",
+                (*ns, h, now - self.ttl_seconds),
+            ).fetchone()
+            outcome = "exact_hits"
+
+            if row is None and vector is not None and self.semantic_threshold is not None:
+                hashes, matrix = self._load_vectors(conn, ns)
+                if hashes and matrix.shape[1] == vector.shape[0]:
+                    sims = matrix @ vector
+                    best = int(np.argmax(sims))
+                    if sims[best] >= self.semantic_threshold:
+                        h = hashes[best]
+                        row = conn.execute(
+                            "SELECT response FROM responses WHERE agent = ? AND model = ? AND prompt_version = ? "
+                            "AND key_hash = ? AND created_at >= ?",
+                            (*ns, h, now - self.ttl_seconds),
+                        ).fetchone()
+                        outcome = "semantic_hits"
+
+            if row is None:
+                self._count(agent, "misses")
+                return None
+            conn.execute(
+                "UPDATE responses SET last_used = ? WHERE agent = ? AND model = ? AND prompt_version = ? AND key_hash = ?",
+                (now, *ns, h),
+            )
+            self._count(agent, outcome)
+            return json.loads(row[0])
+
+    def put(self, ns: Namespace, key_text: str, response: Dict[str, Any],
+            vector: Optional[np.ndarray] = None) -> None:
+        now = time.time()
+        h = key_hash(key_text)
+        blob = vector.astype(np.float32).tobytes() if vector is not None else None
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(agent, model, prompt_version, key_hash, response, embedding, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (*ns, h, json.dumps(response), blob, now, now),
+            )
+            if vector is not None and ns in self._vectors:
+                hashes, matrix = self._vectors[ns]
+                if h not in hashes:
+                    row = vector.astype(np.float32)[None, :]
+                    self._vectors[ns] = (hashes + [h], np.vstack([matrix, row]) if hashes else row)
+            self._evict(conn, protect_since=now)
+
+    def _evict(self, conn: sqlite3.Connection, protect_since: float) -> None:
+        # Expired entries first, then least recently used past max_entries
+        expired = conn.execute(
+            "DELETE FROM responses WHERE created_at < ?", (protect_since - self.ttl_seconds,)
+        ).rowcount
+        (count,) = conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                """
+                DELETE FROM responses WHERE (agent, model, prompt_version, key_hash) IN (
+                    SELECT agent, model, prompt_version, key_hash FROM responses
+                    WHERE last_used < ? ORDER BY last_used LIMIT ?
+                )
+                """,
+                (protect_since, overflow),
+            )
+        if expired or overflow > 0:
+            # Rebuilt from disk on the next semantic lookup
+            self._vectors.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (entries,) = self._connect().execute("SELECT COUNT(*) FROM responses").fetchone()
+            agents = {agent: dict(c) for agent, c in self._counters.items()}
+        for c in agents.values():
+            lookups = c["exact_hits"] + c["semantic_hits"] + c["misses"]
+            c["hit_rate"] = round((c["exact_hits"] + c["semantic_hits"]) / lookups, 4) if lookups else 0.0
+        return {"entries": entries, "agents": agents}
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Process-wide cache, or None when LLM_CACHE_ENABLED=0."""
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(
+                    LLM_CACHE_PATH,
+                    max_entries=LLM_CACHE_MAX_ENTRIES,
+                    ttl_seconds=LLM_CACHE_TTL_SECONDS,
+                    semantic_threshold=LLM_CACHE_SEMANTIC_THRESHOLD if LLM_CACHE_SEMANTIC else None,
+                )
+    return _cache
+
+
+def _embed_key(key_text: str) -> Optional[np.ndarray]:
+    from app.llm.openai_client import embeddings
+
+    try:
+        vector = np.asarray(embeddings.embed_query(key_text), dtype=np.float32)
+    except Exception:
+        logger.exception("Could not embed the cache key; semantic lookup skipped")
+        return None
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else None
+
+
+def invoke_structured(agent: str, schema: Type[BaseModel], prompt: str, key_text: str, prompt_version: str,
+                      model: str = CHAT_MODEL, temperature: float = 0.0) -> BaseModel:
+    """
+    `get_structured_llm(schema, model, temperature).invoke(prompt)` behind the
+    response cache. `key_text` must contain every input that varies the prompt.
+    """
+    from app.llm.registry import get_structured_llm
+
+    cache = get_response_cache()
+    if cache is None:
+        return get_structured_llm(schema, model, temperature).invoke(prompt)
+
+    ns: Namespace = (agent, f"{model}@{float(temperature)}", prompt_version)
+    vector = _embed_key(key_text) if cache.semantic_threshold is not None else None
+
+    cached = cache.get(ns, key_text, vector)
+    annotate(cache="miss" if cached is None else "hit")
+    if cached is not None:
+        try:
+            return schema.model_validate(cached)
+        except ValidationError:
+            logger.warning("Cached %s response no longer matches %s; calling the model", agent, schema.__name__)
+
+    result = get_structured_llm(schema, model, temperature).invoke(prompt)
+    cache.put(ns, key_text, result.model_dump(), vector)
+    return result
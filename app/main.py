@@ -1,45 +1,46 @@
 from app.state import AppState
-from app.graph.flow import app
-from app.rag.retriever import load_faiss_retriever, retrieve_evidence
-from app.config import SCOPE
+from app.graph.flow import get_graph
+from app.graph.runner import format_evidence
+from app.rag.hybrid_retriever import retrieve_many
+from app.rag.vectorstore_indexer import get_vector_db
 
 def run(requirement: str):
     """
     Main RAG flow:
-    1. Load FAISS retriever
+    1. Load the internal-policy vector DB
     2. Retrieve relevant evidence for the user requirement
     3. Create AppState and invoke the LLM workflow
     """
-    # Step 1: Load FAISS retriever
-    retriever = load_faiss_retriever()
+    # Step 1: Load the FAISS vector DB (memory-mapped when docstore.sqlite exists)
+    db = get_vector_db()
 
-    # Step 2: Retrieve top evidence chunks from FAISS
-    evidence = retrieve_evidence(retriever, requirement)
+    # Step 2: Retrieve top evidence chunks (RETRIEVAL_MODE: vector / lexical / hybrid)
+    docs = retrieve_many(db, [requirement], k=5)[0]
+    evidence = format_evidence(docs)
 
     # Step 3: Package everything into AppState
     state = AppState(
         requirement=requirement,
         evidence=evidence,
-        scope=SCOPE
     )
 
-    # Step 4: Pass AppState to the workflow / LLM
-    out = app.invoke(state)
+    # Step 4: Pass AppState to the workflow / LLM (GRAPH_MODE: full / fast)
+    out = get_graph().invoke(state)
     return out
 
 
 if __name__ == "__main__":
     # Example user query
     req = "Incident response plan must define roles, SLAs, and testing cadence."
-    
+
     # Run the RAG pipeline
     result = run(req)
 
     # Print final structured state
     print("\n--- Final state ---")
-    print(result.model_dump())
+    print({key: value for key, value in result.items() if key != "audit_log"})
 
     # Print audit log of steps taken
     print("\n--- Audit log ---")
-    for item in result.audit_log:
+    for item in result["audit_log"]:
         print(item)
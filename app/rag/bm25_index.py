@@ -0,0 +1,136 @@
+'''
+Persisted BM25 inverted index over the same chunks as the FAISS index.
+
+Built at ingest time and saved as bm25.npz next to index.faiss; loading is a
+handful of numpy arrays and searching needs no embedding call. The tokenizer
+keeps clause references whole ("A.8.10", "PRIV-RET-01", "ISO27001-A5.15") and
+also indexes their parts, so "PRIV_RET_01" or "A5.15" still match.
+'''
+
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+BM25_NAME = "bm25.npz"
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[.\-_/][a-z0-9]+)*")
+_SEPARATORS = re.compile(r"[.\-_/]")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of", "on",
+    "or", "that", "the", "this", "to", "with",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    tokens: List[str] = []
+    for token in _TOKEN.findall(text.lower()):
+        if not _SEPARATORS.search(token):
+            if token not in _STOPWORDS:
+                tokens.append(token)
+            continue
+        # Compound reference: keep it whole (with '-' and '_' unified) plus its meaningful parts
+        tokens.append(re.sub(r"[-_/]", "-", token))
+        tokens.extend(p for p in _SEPARATORS.split(token) if p not in _STOPWORDS and (len(p) > 1 or p.isdigit()))
+    return tokens
+
+
+class BM25Index:
+    def __init__(self, vocab: Dict[str, int], offsets: np.ndarray, postings: np.ndarray, tfs: np.ndarray,
+                 doc_len: np.ndarray, doc_ids: List[str], k1: float = 1.5, b: float = 0.75):
+        self.vocab = vocab
+        self.offsets = offsets        # postings of term t are postings[offsets[t]:offsets[t + 1]]
+        self.postings = postings      # document numbers
+        self.tfs = tfs                # term frequency per posting
+        self.doc_len = doc_len
+        self.doc_ids = doc_ids        # document number -> docstore id
+        self.k1 = k1
+        self.b = b
+        self.avg_len = float(doc_len.mean()) if len(doc_len) else 0.0
+
+    @classmethod
+    def build(cls, docs: Iterable[Tuple[str, str]]) -> "BM25Index":
+        """Index (docstore id, text) pairs."""
+        term_postings: Dict[str, List[Tuple[int, int]]] = {}
+        doc_ids: List[str] = []
+        lengths: List[int] = []
+        for n, (doc_id, text) in enumerate(docs):
+            counts = Counter(tokenize(text))
+            doc_ids.append(doc_id)
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                term_postings.setdefault(term, []).append((n, tf))
+
+        vocab: Dict[str, int] = {}
+        offsets = [0]
+        postings: List[int] = []
+        tfs: List[int] = []
+        for t, term in enumerate(sorted(term_postings)):
+            vocab[term] = t
+            for n, tf in term_postings[term]:
+                postings.append(n)
+                tfs.append(tf)
+            offsets.append(len(postings))
+
+        return cls(vocab, np.asarray(offsets, dtype=np.int64), np.asarray(postings, dtype=np.int32),
+                   np.asarray(tfs, dtype=np.float32), np.asarray(lengths, dtype=np.float32), doc_ids)
+
+    @classmethod
+    def from_vector_db(cls, db) -> "BM25Index":
+        """Index the chunks of a LangChain FAISS store in FAISS position order."""
+        def _docs():
+            for _, doc_id in sorted(db.index_to_docstore_id.items()):
+                doc = db.docstore.search(doc_id)
+                meta = doc.metadata or {}
+                # The source file name and section heading often carry the control ID
+                yield doc_id, " ".join([str(meta.get("source", "")), str(meta.get("section", "")), doc.page_content])
+        return cls.build(_docs())
+
+    def save(self, path: str) -> None:
+        terms = sorted(self.vocab, key=self.vocab.get)
+        # np.savez appends ".npz" to names without it; write next to the target and swap in atomically
+        tmp = f"{path}.tmp.npz"
+        np.savez(
+            tmp,
+            terms=np.asarray(terms, dtype=str),
+            offsets=self.offsets,
+            postings=self.postings,
+            tfs=self.tfs,
+            doc_len=self.doc_len,
+            doc_ids=np.asarray(self.doc_ids, dtype=str),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with np.load(path, allow_pickle=False) as data:
+            vocab = {str(term): t for t, term in enumerate(data["terms"])}
+            return cls(vocab, data["offsets"], data["postings"], data["tfs"], data["doc_len"],
+                       [str(d) for d in data["doc_ids"]])
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[str, float]]:
+        """Top-k (docstore id, BM25 score) for `query`; documents without any query term are not returned."""
+        n_docs = len(self.doc_ids)
+        if not n_docs:
+            return []
+        scores = np.zeros(n_docs, dtype=np.float32)
+        for term in set(tokenize(query)):
+            t = self.vocab.get(term)
+            if t is None:
+                continue
+            start, end = self.offsets[t], self.offsets[t + 1]
+            docs = self.postings[start:end]
+            tf = self.tfs[start:end]
+            df = end - start
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.doc_len[docs] / (self.avg_len or 1.0))
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        hits = np.flatnonzero(scores)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(self.doc_ids[i], float(scores[i])) for i in hits]
@@ -0,0 +1,154 @@
+'''
+Evidence retrieval for the audit: vector, lexical (BM25) or hybrid.
+
+Hybrid mode runs the FAISS similarity search and the BM25 lookup in parallel
+and merges the two rankings with reciprocal rank fusion, so exact control IDs
+("A.8.10", "PRIV-RET-01") surface even when the embedding misses them.
+Lexical mode needs no embedding call at all, and hybrid degrades to lexical
+when the embedding API is unreachable. retrieve_many() serves a whole review:
+all clauses are embedded in one batched request and searched with a single
+multi-query FAISS call. Without bm25.npz (index built before it existed: run
+'python -m app.rag.ingest_rag --bm25-only') every mode falls back to vector
+search.
+'''
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+from app.config import FAISS_INDEX_PATH, RETRIEVAL_CANDIDATES, RETRIEVAL_MODE, RRF_K
+from app.rag.bm25_index import BM25_NAME, BM25Index
+from app.rag.reranker import chunk_key
+from app.telemetry.tracing import in_context, span
+
+logger = logging.getLogger(__name__)
+
+_BM25: Optional[BM25Index] = None
+_BM25_LOADED = False
+_BM25_LOCK = threading.Lock()
+_vector_pool: Optional[ThreadPoolExecutor] = None
+
+
+def get_bm25_index(path: str = FAISS_INDEX_PATH) -> Optional[BM25Index]:
+    global _BM25, _BM25_LOADED
+    if not _BM25_LOADED:
+        with _BM25_LOCK:
+            if not _BM25_LOADED:
+                index_file = os.path.join(path, BM25_NAME)
+                if os.path.exists(index_file):
+                    _BM25 = BM25Index.load(index_file)
+                else:
+                    logger.warning("No %s in %s; lexical retrieval disabled", BM25_NAME, path)
+                _BM25_LOADED = True
+    return _BM25
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _vector_pool
+    if _vector_pool is None:
+        with _BM25_LOCK:
+            if _vector_pool is None:
+                _vector_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="vector-search")
+    return _vector_pool
+
+
+def _usable_bm25(db, mode: str) -> Optional[BM25Index]:
+    bm25 = get_bm25_index() if mode in ("hybrid", "lexical") else None
+    if bm25 is not None and len(bm25.doc_ids) != db.index.ntotal:
+        logger.warning("%s is out of date with the FAISS index; using vector search", BM25_NAME)
+        return None
+    return bm25
+
+
+def lexical_search(db, bm25: BM25Index, query: str, k: int) -> List[Document]:
+    docs = []
+    with span("bm25_search"):
+        hits = bm25.search(query, k)
+    for doc_id, _ in hits:
+        doc = db.docstore.search(doc_id)
+        if isinstance(doc, Document):
+            docs.append(doc)
+    return docs
+
+
+def vector_search_many(db, queries: List[str], k: int) -> List[List[Document]]:
+    """Embed every query in batched requests, then run one index.search over the stacked matrix."""
+    from app.llm.openai_client import embeddings
+
+    matrix = np.asarray(embeddings.embed_documents(queries), dtype=np.float32)
+    if getattr(db, "_normalize_L2", False):
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    with span("faiss_search", queries=len(queries)):
+        _, positions = db.index.search(matrix, k)
+
+    results = []
+    for row in positions:
+        docs = []
+        for pos in row:
+            if pos == -1:
+                continue
+            doc = db.docstore.search(db.index_to_docstore_id[int(pos)])
+            if isinstance(doc, Document):
+                docs.append(doc)
+        results.append(docs)
+    return results
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int, rrf_k: int = RRF_K) -> List[Document]:
+    """Merge ranked lists: score(doc) = sum over lists of 1 / (rrf_k + rank)."""
+    scores = {}
+    docs = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = chunk_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            docs.setdefault(key, doc)
+    best = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [docs[key] for key in best]
+
+
+def retrieve(db, query: str, k: int = 5, mode: str = RETRIEVAL_MODE) -> List[Document]:
+    """Top-k evidence chunks for `query` ('vector', 'lexical' or 'hybrid')."""
+    bm25 = _usable_bm25(db, mode)
+    if bm25 is None:
+        return db.similarity_search(query, k=k)
+
+    if mode == "lexical":
+        return lexical_search(db, bm25, query, k)
+
+    # Hybrid: embedding + FAISS search in the background while BM25 runs here
+    future = _pool().submit(in_context(db.similarity_search), query, k=RETRIEVAL_CANDIDATES)
+    lexical = lexical_search(db, bm25, query, RETRIEVAL_CANDIDATES)
+    try:
+        vector = future.result()
+    except Exception:
+        logger.exception("Vector search failed; using lexical results only")
+        vector = []
+    return reciprocal_rank_fusion([vector, lexical], k)
+
+
+def retrieve_many(db, queries: List[str], k: int = 5, mode: str = RETRIEVAL_MODE) -> List[List[Document]]:
+    """Top-k evidence chunks for each query, with one embedding round-trip for the whole batch."""
+    if not queries:
+        return []
+    bm25 = _usable_bm25(db, mode)
+    if bm25 is None:
+        return vector_search_many(db, queries, k)
+
+    if mode == "lexical":
+        return [lexical_search(db, bm25, q, k) for q in queries]
+
+    # Hybrid: the batched embedding + FAISS search in the background while BM25 runs here
+    future = _pool().submit(in_context(vector_search_many), db, queries, RETRIEVAL_CANDIDATES)
+    lexical = [lexical_search(db, bm25, q, RETRIEVAL_CANDIDATES) for q in queries]
+    try:
+        vector = future.result()
+    except Exception:
+        logger.exception("Vector search failed; using lexical results only")
+        vector = [[] for _ in queries]
+    return [reciprocal_rank_fusion([v, lex], k) for v, lex in zip(vector, lexical)]
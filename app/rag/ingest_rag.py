@@ -1,15 +1,40 @@
 '''
-This script ingests internal policy documents from a specified directory, 
-constructs a FAISS index/embeddings for efficient retrieval during policy gap analysis, 
+This script ingests internal policy documents from a specified directory,
+constructs a FAISS index/embeddings for efficient retrieval during policy gap analysis,
 and saves the index to a designated path
 
-Ran manually from terminal 'python -m app.rag.ingest_rag.py' to create faiss_index files
+Ran manually from terminal 'python -m app.rag.ingest_rag' to create faiss_index files.
+Pass '--incremental' to only embed new/changed files and drop vectors of removed ones
+(tracked in faiss_index/manifest.json).
+Pass '--docstore-only' to write docstore.sqlite for an existing index (needed for
+FAISS_LOAD_MODE=mmap) without re-embedding anything.
+Pass '--bm25-only' to write the BM25 index (bm25.npz, used by RETRIEVAL_MODE=hybrid/lexical)
+for an existing index without re-embedding anything.
 '''
 
-from app.rag.vectorstore_indexer import build_faiss_from_folder
+import argparse
 
+from app.rag.vectorstore_indexer import (
+    build_faiss_from_folder, export_bm25_index, export_sqlite_docstore, update_faiss_from_folder,
+)
 
-build_faiss_from_folder(
-folder="data/internal_policies",
-save_path="data/faiss_index"
-)
\ No newline at end of file
+
+parser = argparse.ArgumentParser(description="Build the internal-policy FAISS index")
+parser.add_argument("--incremental", action="store_true",
+                    help="update the existing index instead of rebuilding it from scratch")
+parser.add_argument("--docstore-only", action="store_true",
+                    help="only export docstore.sqlite for the existing index")
+parser.add_argument("--bm25-only", action="store_true",
+                    help="only build bm25.npz for the existing index")
+args = parser.parse_args()
+
+if args.docstore_only:
+    export_sqlite_docstore("data/faiss_index")
+elif args.bm25_only:
+    export_bm25_index("data/faiss_index")
+else:
+    ingest = update_faiss_from_folder if args.incremental else build_faiss_from_folder
+    ingest(
+    folder="data/internal_policies",
+    save_path="data/faiss_index"
+    )
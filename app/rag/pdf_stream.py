@@ -0,0 +1,168 @@
+'''
+Streaming, page-parallel parsing of policy documents for ingestion.
+
+Pages are parsed and split in a process pool and chunks are yielded as a
+generator in document order, with only a bounded window of pages in flight,
+so memory stays flat no matter how large the library is. Every chunk keeps
+its source file, page number and the section heading it falls under
+(e.g. "Annex A.8.10" or "3. Data Retention"), which retrieval later uses to
+cite where evidence came from.
+
+extract_text() is the light path for uploads: the plain page-ordered text,
+with no chunking and no embedding.
+'''
+
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from app.config import INGEST_WORKERS
+
+# "Clause: Annex A.8.10" / "Control ID: PRIV-RET-01" (control requirement sheets)
+_LABELLED_HEADING = re.compile(r"^(?:Clause|Control ID)\s*:\s*(?P<title>\S.{0,80})$")
+# "3. Data Retention", "4.2 Retention Periods", "A.8.10 Information deletion", "Annex A.5.15 Access control"
+_NUMBERED_HEADING = re.compile(
+    r"^(?P<title>(?:Annex\s+)?(?:[A-Z]\.)?\d+(?:\.\d+)*\.?\s+[A-Z][^.:;]{0,80})$"
+)
+
+# (path, page index, relative source name)
+PageTask = Tuple[str, int, str]
+# (section heading or None if the page starts mid-section, chunk text)
+PageChunks = List[Tuple[Optional[str], str]]
+
+
+@lru_cache(maxsize=4)
+def _cached_reader(path: str, mtime_ns: int, size: int):
+    # Each process (pool worker, or the parent counting pages) parses a file once, not once per page;
+    # mtime/size in the key re-read an edited file. Tasks go out in file order, so a few entries suffice
+    from pypdf import PdfReader
+    return PdfReader(path)
+
+
+def _pdf_reader(path: str):
+    stat = os.stat(path)
+    return _cached_reader(path, stat.st_mtime_ns, stat.st_size)
+
+
+def _page_text(path: str, page_index: int) -> str:
+    if path.lower().endswith(".pdf"):
+        return _pdf_reader(path).pages[page_index].extract_text() or ""
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def split_sections(text: str) -> List[Tuple[Optional[str], str]]:
+    """
+    Cut text into (heading, section text) pieces. Numbered headings start a new
+    section; "Clause:"/"Control ID:" lines only name the section they sit in
+    (the last label wins, so "Clause: Annex A.8.10" beats the control ID).
+    Text before the first heading comes back with a None heading.
+    """
+    sections: List[List] = [[None, []]]
+    for line in text.splitlines():
+        numbered = _NUMBERED_HEADING.match(line.strip())
+        labelled = _LABELLED_HEADING.match(line.strip())
+        if numbered:
+            sections.append([numbered.group("title").strip(), []])
+        elif labelled and not (sections[-1][0] and _NUMBERED_HEADING.match(sections[-1][0])):
+            sections[-1][0] = labelled.group("title").strip()
+        sections[-1][1].append(line)
+
+    return [(title, "\n".join(lines).strip()) for title, lines in sections if "\n".join(lines).strip()]
+
+
+def _parse_page(task: PageTask) -> PageChunks:
+    """Worker: extract one page, cut it at section headings and split each section into chunks."""
+    path, page_index, _ = task
+    splitter = RecursiveCharacterTextSplitter(chunk_size=600, chunk_overlap=100)
+
+    chunks: PageChunks = []
+    for title, text in split_sections(_page_text(path, page_index)):
+        chunks.extend((title, chunk) for chunk in splitter.split_text(text))
+    return chunks
+
+
+def page_count(path: Path) -> int:
+    if path.suffix.lower() == ".pdf":
+        return len(_pdf_reader(str(path)).pages)
+    return 1
+
+
+def extract_text(path: str) -> str:
+    """Full text of one document in page order, without chunking or overlap (used for interpretation)."""
+    if path.lower().endswith(".pdf"):
+        from pypdf import PdfReader
+        return "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def _ordered_window_map(fn: Callable, tasks: Iterable, workers: int) -> Iterator:
+    """Like executor.map, but only keeps a small window of tasks in flight."""
+    if workers <= 1:
+        yield from map(fn, tasks)
+        return
+
+    window = workers * 4
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        for task in tasks:
+            in_flight.append(pool.submit(fn, task))
+            if len(in_flight) >= window:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def iter_chunks(files: Iterable[Tuple[Path, str]], workers: int = INGEST_WORKERS) -> Iterator[Document]:
+    """
+    Yield chunk Documents for (path, relative source name) pairs, in file and
+    page order. Metadata: source, page (1-based), section, chunk_index.
+    """
+    def _tasks() -> Iterator[PageTask]:
+        for path, rel_path in files:
+            for page_index in range(page_count(path)):
+                yield str(path), page_index, rel_path
+
+    tasks = _tasks()
+    current_source: Optional[str] = None
+    section: Optional[str] = None
+    chunk_index = 0
+
+    try:
+        for task, page_chunks in _ordered_window_map(_parse_task_with_meta, tasks, workers):
+            _, page_index, rel_path = task
+            if rel_path != current_source:
+                current_source, section, chunk_index = rel_path, None, 0
+            for title, text in page_chunks:
+                # A page that starts mid-section inherits the heading from the previous page
+                section = title or section
+                yield Document(
+                    page_content=text,
+                    metadata={"source": rel_path, "page": page_index + 1,
+                              "section": section, "chunk_index": chunk_index},
+                )
+                chunk_index += 1
+    finally:
+        _cached_reader.cache_clear()   # don't keep parsed PDFs alive in the parent after ingestion
+
+
+def _parse_task_with_meta(task: PageTask) -> Tuple[PageTask, PageChunks]:
+    # Module-level so it can be pickled into worker processes
+    return task, _parse_page(task)
+
+
+def evidence_header(doc: Document) -> str:
+    """Human-readable citation for a retrieved chunk, e.g. 'Document_3.pdf, p.1, Annex A.8.10'."""
+    parts = [doc.metadata.get("source")]
+    if doc.metadata.get("page"):
+        parts.append(f"p.{doc.metadata['page']}")
+    parts.append(doc.metadata.get("section"))
+    return ", ".join(str(p) for p in parts if p)
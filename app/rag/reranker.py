@@ -0,0 +1,120 @@
+'''
+Cross-encoder reranking of retrieved evidence.
+
+All (clause, candidate) pairs of a review are scored together in large
+batches instead of one tiny predict() call per clause. Scores are cached by
+(clause hash, chunk id), so re-reviewing a policy does not re-run the model
+for pairs it has already seen. The model can run on the default torch
+backend or as ONNX / int8-quantized ONNX on CPU.
+'''
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from app.config import (
+    RERANK_MODEL, RERANK_BACKEND, RERANK_ONNX_INT8_FILE,
+    RERANK_BATCH_SIZE, RERANK_CACHE_SIZE,
+)
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_key(doc: Document) -> str:
+    """Stable identity of a retrieved chunk: its chunk_id, else a hash of its text."""
+    return doc.metadata.get("chunk_id") or _sha256(doc.page_content)
+
+
+class Reranker:
+    def __init__(self, model_name: str = RERANK_MODEL, backend: str = RERANK_BACKEND,
+                 batch_size: int = RERANK_BATCH_SIZE, cache_size: int = RERANK_CACHE_SIZE):
+        self.model_name = model_name
+        self.backend = backend
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._model = None
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._model_lock = threading.Lock()
+
+    @property
+    def model(self):
+        # torch + model weights are only loaded when the first pair is scored
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = self._load_model()
+        return self._model
+
+    def _load_model(self):
+        from sentence_transformers import CrossEncoder
+
+        if self.backend == "torch":
+            return CrossEncoder(self.model_name)
+        if self.backend == "onnx":
+            return CrossEncoder(self.model_name, backend="onnx")
+        if self.backend == "onnx-int8":
+            return CrossEncoder(self.model_name, backend="onnx",
+                                model_kwargs={"file_name": RERANK_ONNX_INT8_FILE})
+        raise ValueError(f"Unknown RERANK_BACKEND: {self.backend!r}")
+
+    def score(self, pairs: Sequence[Tuple[str, Document]]) -> List[float]:
+        """Score (clause, chunk) pairs; only uncached pairs reach the model, in one batched call."""
+        keys = [(_sha256(clause), chunk_key(doc)) for clause, doc in pairs]
+        scores: List[float] = [0.0] * len(pairs)
+        missing: List[int] = []
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    scores[i] = self._cache[key]
+                else:
+                    missing.append(i)
+
+        if missing:
+            predicted = self.model.predict(
+                [[pairs[i][0], pairs[i][1].page_content] for i in missing],
+                batch_size=self.batch_size,
+            )
+            with self._lock:
+                for i, value in zip(missing, predicted):
+                    scores[i] = float(value)
+                    self._cache[keys[i]] = float(value)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return scores
+
+    def rerank_many(self, clauses: Sequence[str], candidates: Sequence[Sequence[Document]],
+                    top_n: int = 2) -> List[List[Document]]:
+        """Rerank the candidates of every clause together and keep the best `top_n` per clause."""
+        if self.backend == "none":
+            # Reranking disabled (offline benchmarks, no model weights): keep the retrieval order
+            return [list(docs[:top_n]) for docs in candidates]
+        pairs = [(clause, doc) for clause, docs in zip(clauses, candidates) for doc in docs]
+        scores = iter(self.score(pairs))
+
+        reranked: List[List[Document]] = []
+        for docs in candidates:
+            scored_docs = sorted(((next(scores), doc) for doc in docs), key=lambda x: x[0], reverse=True)
+            reranked.append([doc for _, doc in scored_docs[:top_n]])
+        return reranked
+
+
+_RERANKER: Optional[Reranker] = None
+_RERANKER_LOCK = threading.Lock()
+
+
+def get_reranker() -> Reranker:
+    global _RERANKER
+    if _RERANKER is None:
+        with _RERANKER_LOCK:
+            if _RERANKER is None:
+                _RERANKER = Reranker()
+    return _RERANKER
@@ -0,0 +1,98 @@
+'''
+Read-only, zero-copy replacement for the pickled FAISS docstore.
+
+The chunks behind each FAISS vector ID are written to a small SQLite file next
+to index.faiss. Loading it costs nothing up front: rows are fetched on demand,
+and several worker processes reading the same file share the OS page cache
+instead of each unpickling its own copy of the corpus.
+'''
+
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import Mapping
+from typing import Iterator, Union
+
+from langchain_community.docstore.base import Docstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+DOCSTORE_NAME = "docstore.sqlite"
+
+
+def write_sqlite_docstore(db: FAISS, path: str) -> None:
+    """Dump the docstore and vector ID mapping of `db` into a fresh SQLite file."""
+    tmp = f"{path}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+
+    conn = sqlite3.connect(tmp)
+    conn.execute(
+        """
+        CREATE TABLE chunks (
+            pos          INTEGER PRIMARY KEY,
+            doc_id       TEXT NOT NULL UNIQUE,
+            page_content TEXT NOT NULL,
+            metadata     TEXT NOT NULL
+        )
+        """
+    )
+    rows = []
+    for pos, doc_id in sorted(db.index_to_docstore_id.items()):
+        doc = db.docstore.search(doc_id)
+        rows.append((int(pos), doc_id, doc.page_content, json.dumps(doc.metadata)))
+    conn.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+    # Atomic swap: readers that already opened the old file keep using it
+    os.replace(tmp, path)
+
+
+class _ReadOnlyConnection:
+    """One read-only SQLite connection per thread."""
+
+    def __init__(self, path: str):
+        self.uri = f"file:{path}?mode=ro"
+        self._local = threading.local()
+
+    def get(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+            self._local.conn = conn
+        return conn
+
+
+class SQLiteDocstore(Docstore):
+    def __init__(self, path: str):
+        self._db = _ReadOnlyConnection(path)
+
+    def search(self, search: str) -> Union[str, Document]:
+        row = self._db.get().execute(
+            "SELECT page_content, metadata FROM chunks WHERE doc_id = ?", (search,)
+        ).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(page_content=row[0], metadata=json.loads(row[1]))
+
+
+class SQLiteIndexMap(Mapping):
+    """FAISS vector ID -> docstore ID, looked up lazily instead of held in a dict."""
+
+    def __init__(self, path: str):
+        self._db = _ReadOnlyConnection(path)
+
+    def __getitem__(self, pos) -> str:
+        row = self._db.get().execute("SELECT doc_id FROM chunks WHERE pos = ?", (int(pos),)).fetchone()
+        if row is None:
+            raise KeyError(pos)
+        return row[0]
+
+    def __iter__(self) -> Iterator[int]:
+        for (pos,) in self._db.get().execute("SELECT pos FROM chunks ORDER BY pos"):
+            yield pos
+
+    def __len__(self) -> int:
+        return self._db.get().execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
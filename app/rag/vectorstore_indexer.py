@@ -1,68 +1,370 @@
+import hashlib
+import json
+import logging
+import math
 import os
+import shutil
+import tempfile
+import threading
+import uuid
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader, TextLoader
+from langchain_core.documents import Document
 
+from app.config import (
+    FAISS_INDEX_PATH, FAISS_LOAD_MODE, FAISS_INDEX_TYPE, FAISS_IVF_NLIST, FAISS_NPROBE, FAISS_HNSW_M,
+    FAISS_EF_SEARCH, FAISS_PQ_M, FAISS_TRAIN_SIZE, INGEST_GROUP_SIZE,
+)
 from app.llm.openai_client import embeddings
+from app.rag.bm25_index import BM25_NAME, BM25Index
+from app.rag.pdf_stream import iter_chunks
+from app.rag.sqlite_docstore import DOCSTORE_NAME, SQLiteDocstore, SQLiteIndexMap, write_sqlite_docstore
+from app.telemetry.tracing import traced
+
+logger = logging.getLogger(__name__)
 
 _VECTOR_DB = None
+_VECTOR_DB_LOCK = threading.Lock()
+
+# Per-file content hashes and chunk IDs, written next to the index
+MANIFEST_NAME = "manifest.json"
+
+_SUPPORTED_SUFFIXES = {".pdf", ".txt"}
+
 
-def _load_docs_from_folder(folder: str) -> List[str]:
-    texts: List[str] = []
+def _iter_source_files(folder: str) -> List[Path]:
     p = Path(folder)
     if not p.exists():
-        return texts
+        return []
+    return sorted(f for f in p.rglob("*") if f.is_file() and f.suffix.lower() in _SUPPORTED_SUFFIXES)
+
+
+def _file_sha256(file: Path) -> str:
+    h = hashlib.sha256()
+    with open(file, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _iter_file_chunks(files: List[Tuple[Path, str, str]], manifest: Dict[str, Dict]) -> Iterator[Document]:
+    """
+    Stream the chunks of (path, relative path, sha256) files. Every chunk gets a
+    stable ID derived from its file's content hash, recorded in `manifest`.
+    """
+    hashes = {rel_path: file_hash for _, rel_path, file_hash in files}
+    for rel_path, file_hash in hashes.items():
+        manifest[rel_path] = {"sha256": file_hash, "chunk_ids": []}
+
+    for doc in iter_chunks((path, rel_path) for path, rel_path, _ in files):
+        rel_path = doc.metadata["source"]
+        doc.metadata["chunk_id"] = f"{rel_path}#{hashes[rel_path][:16]}#{doc.metadata['chunk_index']}"
+        manifest[rel_path]["chunk_ids"].append(doc.metadata["chunk_id"])
+        yield doc
+
+
+def _factory_string(dim: int, n_vectors: int, index_type: str) -> str:
+    # IVF indexes store vector IDs natively; flat and HNSW get an ID map
+    if index_type == "flat":
+        return "IDMap2,Flat"
+    if index_type == "hnsw":
+        return f"IDMap2,HNSW{FAISS_HNSW_M}"
+
+    # k-means wants ~39 training points per centroid, so small corpora get fewer lists
+    n_train = min(n_vectors, FAISS_TRAIN_SIZE)
+    nlist = FAISS_IVF_NLIST or int(4 * math.sqrt(max(n_vectors, 1)))
+    nlist = max(1, min(nlist, n_train // 39))
+
+    if index_type == "ivf_flat":
+        return f"IVF{nlist},Flat"
+    if index_type == "ivf_pq":
+        if dim % FAISS_PQ_M:
+            raise ValueError(f"FAISS_PQ_M={FAISS_PQ_M} must divide the embedding dimension {dim}")
+        if n_train < 256:
+            # 8-bit PQ codebooks need at least 256 training vectors
+            logger.warning("Only %d training vectors; using IVF-Flat instead of IVF-PQ", n_train)
+            return f"IVF{nlist},Flat"
+        return f"IVF{nlist},PQ{FAISS_PQ_M}x8"
+    raise ValueError(f"Unknown FAISS_INDEX_TYPE: {index_type!r}")
+
+
+def make_index(dim: int, n_vectors: int, index_type: str = FAISS_INDEX_TYPE) -> faiss.Index:
+    """
+    Create an empty (untrained) FAISS index of the configured type. Vectors are
+    added with add_with_ids and removed with remove_ids, so deleting chunks
+    never renumbers the others.
+    """
+    return faiss.index_factory(dim, _factory_string(dim, n_vectors, index_type))
+
+
+def _base_index(index: faiss.Index) -> faiss.Index:
+    if isinstance(index, faiss.IndexIDMap2):
+        return faiss.downcast_index(index.index)
+    return index
+
+
+def configure_search(index: faiss.Index, nprobe: int = FAISS_NPROBE, ef_search: int = FAISS_EF_SEARCH) -> None:
+    """Apply the query-time recall/latency knobs for approximate indexes."""
+    index = _base_index(index)
+    if isinstance(index, faiss.IndexIVF):
+        index.nprobe = nprobe
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search
+
+
+_NEEDS_TRAINING = {"ivf_flat", "ivf_pq"}
+
+
+def _batched(items: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _add_embeddings(db: FAISS, text_embeddings: List[tuple], metadatas: List[dict],
+                    ids: Optional[List[str]]) -> None:
+    """
+    FAISS.add_embeddings for ID-mapped indexes: each vector is stored under the
+    label one past the highest in use, and that label maps to its docstore ID.
+    """
+    ids = ids or [str(uuid.uuid4()) for _ in text_embeddings]
+    start = max(db.index_to_docstore_id, default=-1) + 1
+    labels = np.arange(start, start + len(text_embeddings), dtype=np.int64)
+    db.index.add_with_ids(np.array([v for _, v in text_embeddings], dtype=np.float32), labels)
+    db.docstore.add({
+        doc_id: Document(page_content=text, metadata=metadata)
+        for doc_id, (text, _), metadata in zip(ids, text_embeddings, metadatas)
+    })
+    db.index_to_docstore_id.update(zip(labels.tolist(), ids))
+
+
+def _delete_chunks(db: FAISS, doc_ids: List[str]) -> None:
+    """Remove chunks by docstore ID through remove_ids; every other label stays valid."""
+    wanted = set(doc_ids)
+    labels = [label for label, doc_id in db.index_to_docstore_id.items() if doc_id in wanted]
+    db.index.remove_ids(np.array(labels, dtype=np.int64))
+    db.docstore.delete([db.index_to_docstore_id.pop(label) for label in labels])
+
+
+def _updatable(index: faiss.Index, deletes: bool) -> bool:
+    # Indexes saved before labels were explicit map positions, and HNSW graphs cannot drop nodes
+    if not isinstance(index, (faiss.IndexIDMap2, faiss.IndexIVF)):
+        return False
+    return not (deletes and isinstance(_base_index(index), faiss.IndexHNSW))
+
+
+def _flush(db: Optional[FAISS], pending: List[tuple], n_seen: int, index_type: str) -> FAISS:
+    """Create (and train) the index on first use, then add every pending batch."""
+    if db is None:
+        dim = len(pending[0][0][0][1])
+        db = FAISS(
+            embedding_function=embeddings,
+            index=make_index(dim, n_seen, index_type),
+            docstore=InMemoryDocstore(),
+            index_to_docstore_id={},
+        )
+    if not db.index.is_trained:
+        sample = np.array([v for text_embeddings, _, _ in pending for _, v in text_embeddings], dtype=np.float32)
+        db.index.train(sample[:FAISS_TRAIN_SIZE])
+    for text_embeddings, metadatas, ids in pending:
+        _add_embeddings(db, text_embeddings, metadatas, ids)
+    pending.clear()
+    return db
+
+
+@traced("ingest")
+def _index_documents(docs: Iterable[Document], db: Optional[FAISS] = None,
+                     index_type: str = FAISS_INDEX_TYPE) -> Optional[FAISS]:
+    """
+    Embed a stream of documents INGEST_GROUP_SIZE chunks at a time (each group
+    in concurrent, token-budgeted batches) and add every batch to the FAISS
+    index as soon as its vectors arrive. Documents carrying a `chunk_id` are
+    stored under that ID so they can be deleted later.
+
+    A new IVF/PQ index is trained on the first FAISS_TRAIN_SIZE vectors (and
+    sized from that sample unless FAISS_IVF_NLIST is set); batches are held
+    back only until the training sample is complete.
+    """
+    pending: List[tuple] = []
+    seen = 0
+    hold_for_training = db is None and index_type in _NEEDS_TRAINING
+
+    for group in _batched(docs, INGEST_GROUP_SIZE):
+        texts = [d.page_content for d in group]
+        for indices, vectors in embeddings.iter_embeddings(texts):
+            text_embeddings = [(texts[i], vector) for i, vector in zip(indices, vectors)]
+            metadatas = [group[i].metadata for i in indices]
+            ids = [group[i].metadata.get("chunk_id") for i in indices]
+            pending.append((text_embeddings, metadatas, ids if all(ids) else None))
+            seen += len(indices)
+
+            if not hold_for_training or seen >= FAISS_TRAIN_SIZE:
+                db = _flush(db, pending, seen, index_type)
+                hold_for_training = False
+
+    if pending:
+        db = _flush(db, pending, seen, index_type)
+
+    return db
+
+
+def _read_manifest(save_path: str) -> Optional[Dict]:
+    path = Path(save_path) / MANIFEST_NAME
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
 
-    for file in p.rglob("*"):
-        if file.suffix.lower() == ".pdf":
-            loader = PyPDFLoader(str(file))
-            docs = loader.load()
-            texts.extend([d.page_content for d in docs])
-        elif file.suffix.lower() == ".txt":
-            loader = TextLoader(str(file), encoding="utf-8")
-            docs = loader.load()
-            texts.extend([d.page_content for d in docs])
+def _write_manifest(save_path: str, files: Dict[str, Dict]) -> None:
+    path = Path(save_path) / MANIFEST_NAME
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "files": files}, f, indent=2)
+    os.replace(tmp, path)
 
-    return texts
+
+def _save_db(db: FAISS, save_path: str) -> None:
+    """
+    Write index.faiss, index.pkl, docstore.sqlite and bm25.npz next to each other. Files
+    are written to a temp dir and swapped in with os.replace, so workers that
+    memory-mapped the previous index are never handed a half-written file.
+    """
+    os.makedirs(save_path, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=save_path, prefix=".tmp-")
+    try:
+        db.save_local(tmp_dir)
+        write_sqlite_docstore(db, os.path.join(tmp_dir, DOCSTORE_NAME))
+        BM25Index.from_vector_db(db).save(os.path.join(tmp_dir, BM25_NAME))
+        for name in ("index.faiss", "index.pkl", DOCSTORE_NAME, BM25_NAME):
+            os.replace(os.path.join(tmp_dir, name), os.path.join(save_path, name))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
 
 
 def build_faiss_from_folder(folder: str, save_path: str):
-    texts = _load_docs_from_folder(folder)
-    if not texts:
+    files = _iter_source_files(folder)
+    if not files:
         raise ValueError(f"No PDF/TXT documents found in: {folder}")
 
-    splitter = RecursiveCharacterTextSplitter(chunk_size=600, chunk_overlap=100)
-    docs = splitter.create_documents(texts)
+    manifest: Dict[str, Dict] = {}
+    sources = [(file, file.relative_to(folder).as_posix(), _file_sha256(file)) for file in files]
+    db = _index_documents(_iter_file_chunks(sources, manifest))
+    if db is None:
+        raise ValueError(f"No text could be extracted from the documents in: {folder}")
 
-    db = FAISS.from_documents(docs, embeddings)
-    os.makedirs(save_path, exist_ok=True)
-    db.save_local(save_path)
+    _save_db(db, save_path)
+    _write_manifest(save_path, manifest)
+    return db
+
+
+def update_faiss_from_folder(folder: str, save_path: str):
+    """
+    Incremental ingest: only new or changed files are parsed and embedded, and
+    the vectors of changed or removed files are deleted from the index.
+    Falls back to a full rebuild when no manifest exists yet. Returns the
+    updated store, or None when nothing changed (the index is not even loaded).
+    """
+    old = _read_manifest(save_path)
+    if old is None or not (Path(save_path) / "index.faiss").exists():
+        logger.info("No manifest found in %s; running a full rebuild", save_path)
+        return build_faiss_from_folder(folder, save_path)
+
+    old_files: Dict[str, Dict] = old.get("files", {})
+    current = {f.relative_to(folder).as_posix(): f for f in _iter_source_files(folder)}
+    hashes = {rel: _file_sha256(f) for rel, f in current.items()}
+
+    removed = [rel for rel in old_files if rel not in current]
+    changed = [rel for rel in current if rel in old_files and old_files[rel]["sha256"] != hashes[rel]]
+    added = [rel for rel in current if rel not in old_files]
+
+    if not (removed or changed or added):
+        logger.info("Index in %s is up to date", save_path)
+        return None
+
+    db = FAISS.load_local(save_path, embeddings=embeddings, allow_dangerous_deserialization=True)
+
+    # 1. Drop the vectors of files that disappeared or changed
+    stale_ids = [cid for rel in removed + changed for cid in old_files[rel]["chunk_ids"]]
+    if not _updatable(db.index, deletes=bool(stale_ids)):
+        # The embedding cache keeps this rebuild free of API calls
+        logger.info("%s cannot be updated in place; running a full rebuild", type(db.index).__name__)
+        return build_faiss_from_folder(folder, save_path)
+    if stale_ids:
+        _delete_chunks(db, stale_ids)
+
+    # 2. Embed and add the chunks of new or changed files
+    manifest = {rel: entry for rel, entry in old_files.items() if rel not in removed and rel not in changed}
+    sources = [(current[rel], rel, hashes[rel]) for rel in changed + added]
+    _index_documents(_iter_file_chunks(sources, manifest), db)
+
+    logger.info("Incremental ingest: %d added, %d changed, %d removed", len(added), len(changed), len(removed))
+    _save_db(db, save_path)
+    _write_manifest(save_path, manifest)
     return db
 
 
-def build_temp_faiss(pdf_path: str) -> FAISS:
-    docs = PyPDFLoader(pdf_path).load()
+def export_sqlite_docstore(save_path: str) -> None:
+    """Add docstore.sqlite to an index that was saved before mmap loading existed."""
+    db = FAISS.load_local(save_path, embeddings=embeddings, allow_dangerous_deserialization=True)
+    write_sqlite_docstore(db, os.path.join(save_path, DOCSTORE_NAME))
+
+
+def export_bm25_index(save_path: str) -> None:
+    """Add bm25.npz (lexical / hybrid retrieval) to an index that was saved before it existed."""
+    db = FAISS.load_local(save_path, embeddings=embeddings, allow_dangerous_deserialization=True)
+    BM25Index.from_vector_db(db).save(os.path.join(save_path, BM25_NAME))
+
 
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=600,
-        chunk_overlap=100,
+def load_vector_db_mmap(path: str) -> FAISS:
+    """
+    Read-only load: index.faiss is memory-mapped instead of copied onto the heap
+    and chunks are fetched from docstore.sqlite on demand, so startup cost does
+    not grow with corpus size and workers share the page cache.
+    """
+    index_file = os.path.join(path, "index.faiss")
+    flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+    try:
+        index = faiss.read_index(index_file, flags)
+    except RuntimeError:
+        # IVF inverted lists only support the plain mmap flag
+        index = faiss.read_index(index_file, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+
+    docstore_file = os.path.join(path, DOCSTORE_NAME)
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=SQLiteDocstore(docstore_file),
+        index_to_docstore_id=SQLiteIndexMap(docstore_file),
     )
-    chunks = splitter.split_documents(docs)
 
-    return FAISS.from_documents(chunks, embeddings)
 
 def get_vector_db():
     global _VECTOR_DB
     if _VECTOR_DB is None:
-        _VECTOR_DB = FAISS.load_local(
-            "data/faiss_index", 
-            embeddings=embeddings, 
-            allow_dangerous_deserialization=True
-        )
-        
-        _VECTOR_DB.embedding_function = embeddings.embed_query
-        
-    return _VECTOR_DB
\ No newline at end of file
+        with _VECTOR_DB_LOCK:
+            if _VECTOR_DB is None:
+                if FAISS_LOAD_MODE == "mmap" and os.path.exists(os.path.join(FAISS_INDEX_PATH, DOCSTORE_NAME)):
+                    db = load_vector_db_mmap(FAISS_INDEX_PATH)
+                else:
+                    db = FAISS.load_local(
+                        FAISS_INDEX_PATH,
+                        embeddings=embeddings,
+                        allow_dangerous_deserialization=True
+                    )
+
+                db.embedding_function = embeddings.embed_query
+                configure_search(db.index)
+                _VECTOR_DB = db
+
+    return _VECTOR_DB
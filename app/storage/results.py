@@ -0,0 +1,282 @@
+'''
+Persistent store of interpretations and audit results.
+
+Everything lives in one local SQLite file (WAL mode, safe to share between
+the web workers and the job workers):
+    documents  one row per uploaded policy, keyed by the sha256 of the file,
+               with its interpretation and the interpreter version
+    clauses    the clause list of each document, in order, with a hash of the
+               normalised clause text
+    audits     the audit_log row of every audited clause, keyed by document
+               hash, clause hash and a fingerprint of everything that shapes
+               the result (chat model, graph mode, agent prompt versions,
+               evidence index, retrieval and reranker settings)
+
+A clause already audited under the same fingerprint, in this or any other
+document, is served from the store instead of going through retrieval and
+the agents. diff_documents() compares two policy versions clause by clause.
+
+    python -m app.storage.results --list
+    python -m app.storage.results --diff data/user_input/Input_...pdf data/user_input/Updated_...pdf
+'''
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from app.config import (
+    CHAT_MODEL, FAISS_INDEX_PATH, GRAPH_MODE, RERANK_BACKEND, RERANK_CANDIDATES, RERANK_MODEL, RESULTS_DB_PATH,
+    RETRIEVAL_CANDIDATES, RETRIEVAL_MODE, RRF_K,
+)
+from app.storage.sqlite import per_thread_connection
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def clause_hash(text: Optional[str]) -> str:
+    # Whitespace and case differences from PDF extraction do not make a clause "changed"
+    normalised = re.sub(r"\s+", " ", str(text or "")).strip().lower()
+    return hashlib.sha256(normalised.encode("utf-8")).hexdigest()
+
+
+def audit_versions(graph_mode: str = GRAPH_MODE) -> Dict[str, Any]:
+    """Everything that changes an audit row for the same clause text."""
+    from app.agents import fused_agent, gap_agent, risk_agent, router_agent
+
+    index_file = os.path.join(FAISS_INDEX_PATH, "index.faiss")
+    index_stat = os.stat(index_file) if os.path.exists(index_file) else None
+    return {
+        "model": CHAT_MODEL,
+        "graph_mode": graph_mode,
+        "prompts": {
+            "router": router_agent.PROMPT_VERSION,
+            "gap": gap_agent.PROMPT_VERSION,
+            "risk": risk_agent.PROMPT_VERSION,
+            "fused": fused_agent.PROMPT_VERSION,
+        },
+        "index": f"{index_stat.st_size}:{int(index_stat.st_mtime)}" if index_stat else None,
+        # Retrieval and reranking settings pick which evidence the agents see
+        "evidence": {
+            "retrieval_mode": RETRIEVAL_MODE,
+            "candidates": RETRIEVAL_CANDIDATES,
+            "rrf_k": RRF_K,
+            "rerank_candidates": RERANK_CANDIDATES,
+            "rerank_backend": RERANK_BACKEND,
+            "rerank_model": RERANK_MODEL if RERANK_BACKEND != "none" else None,
+        },
+    }
+
+
+def versions_key(versions: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(versions, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_hash            TEXT PRIMARY KEY,
+    filename            TEXT,
+    interpreter_version TEXT,
+    interpretation      TEXT,
+    created_at          REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS clauses (
+    doc_hash          TEXT NOT NULL,
+    position          INTEGER NOT NULL,
+    clause_hash       TEXT NOT NULL,
+    section_reference TEXT,
+    theme             TEXT,
+    exact_clause      TEXT,
+    PRIMARY KEY (doc_hash, position)
+);
+CREATE TABLE IF NOT EXISTS audits (
+    doc_hash     TEXT NOT NULL,
+    clause_hash  TEXT NOT NULL,
+    versions_key TEXT NOT NULL,
+    versions     TEXT NOT NULL,
+    row          TEXT NOT NULL,
+    created_at   REAL NOT NULL,
+    PRIMARY KEY (doc_hash, clause_hash, versions_key)
+);
+CREATE INDEX IF NOT EXISTS idx_audits_clause ON audits(clause_hash, versions_key, created_at);
+"""
+
+
+class ResultStore:
+    def __init__(self, path: str = RESULTS_DB_PATH):
+        self.path = path
+        self._connect = per_thread_connection(path, _SCHEMA)
+
+    # --- Documents and their interpretation ---
+
+    def get_interpretation(self, doc_hash: str, interpreter_version: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT interpretation FROM documents WHERE doc_hash = ? AND interpreter_version = ?",
+            (doc_hash, interpreter_version),
+        ).fetchone()
+        return json.loads(row["interpretation"]) if row and row["interpretation"] else None
+
+    def record_document(self, doc_hash: str, filename: str, interpreter_version: str,
+                        interpretation: Dict[str, Any]) -> None:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO documents (doc_hash, filename, interpreter_version, interpretation, created_at) "
+                "VALUES (?, ?, ?, ?, COALESCE((SELECT created_at FROM documents WHERE doc_hash = ?), ?))",
+                (doc_hash, filename, interpreter_version, json.dumps(interpretation), doc_hash, time.time()),
+            )
+            conn.execute("DELETE FROM clauses WHERE doc_hash = ?", (doc_hash,))
+            conn.executemany(
+                "INSERT INTO clauses VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (doc_hash, pos, clause_hash(item.get("exact_clause")), item.get("section_reference"),
+                     item.get("theme"), item.get("exact_clause"))
+                    for pos, item in enumerate(interpretation.get("analysis", []))
+                ],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def documents(self) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(
+            """
+            SELECT d.doc_hash, d.filename, d.created_at,
+                   (SELECT COUNT(*) FROM clauses c WHERE c.doc_hash = d.doc_hash) AS clauses,
+                   (SELECT COUNT(DISTINCT a.clause_hash) FROM audits a WHERE a.doc_hash = d.doc_hash) AS audited
+            FROM documents d ORDER BY d.created_at DESC
+            """
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    # --- Per-clause audit memoization ---
+
+    def lookup(self, clause_hashes: List[str], key: str) -> Dict[str, Dict[str, Any]]:
+        """Latest stored row per clause hash audited under `key`, from any document."""
+        found: Dict[str, Dict[str, Any]] = {}
+        conn = self._connect()
+        unique = list(dict.fromkeys(clause_hashes))
+        for start in range(0, len(unique), 500):
+            batch = unique[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT clause_hash, row FROM audits WHERE versions_key = ? AND clause_hash IN ({placeholders}) "
+                f"ORDER BY created_at",
+                (key, *batch),
+            ).fetchall()
+            for r in rows:
+                found[r["clause_hash"]] = json.loads(r["row"])
+        return found
+
+    def record_audit(self, doc_hash: str, clause_text: str, versions: Dict[str, Any], row: Dict[str, Any]) -> None:
+        self._connect().execute(
+            "INSERT OR REPLACE INTO audits VALUES (?, ?, ?, ?, ?, ?)",
+            (doc_hash, clause_hash(clause_text), versions_key(versions), json.dumps(versions, sort_keys=True),
+             json.dumps(row), time.time()),
+        )
+
+    def document_results(self, doc_hash: str) -> List[Dict[str, Any]]:
+        """Latest audit row for each clause of a document, in document order."""
+        rows = self._connect().execute(
+            """
+            SELECT c.position, c.section_reference, a.row, a.versions, a.created_at
+            FROM clauses c
+            JOIN audits a ON a.doc_hash = c.doc_hash AND a.clause_hash = c.clause_hash
+            WHERE c.doc_hash = ?
+              AND a.created_at = (SELECT MAX(created_at) FROM audits
+                                  WHERE doc_hash = c.doc_hash AND clause_hash = c.clause_hash)
+            ORDER BY c.position
+            """,
+            (doc_hash,),
+        ).fetchall()
+        return [
+            {**json.loads(r["row"]), "section_reference": r["section_reference"],
+             "versions": json.loads(r["versions"]), "audited_at": r["created_at"]}
+            for r in rows
+        ]
+
+    # --- Policy version diff ---
+
+    def _clauses(self, doc_hash: str) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(
+            "SELECT position, clause_hash, section_reference, theme, exact_clause FROM clauses "
+            "WHERE doc_hash = ? ORDER BY position",
+            (doc_hash,),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def diff_documents(self, old_hash: str, new_hash: str) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Clause-level diff of two interpreted policy versions. Clauses with the same
+        text are unchanged; the rest are paired by section reference into
+        "changed", or reported as "added" / "removed".
+        """
+        old, new = self._clauses(old_hash), self._clauses(new_hash)
+        old_hashes = {c["clause_hash"] for c in old}
+        new_hashes = {c["clause_hash"] for c in new}
+
+        unchanged = [c for c in new if c["clause_hash"] in old_hashes]
+        old_rest = {c["section_reference"]: c for c in old if c["clause_hash"] not in new_hashes}
+        changed, added = [], []
+        for c in new:
+            if c["clause_hash"] in old_hashes:
+                continue
+            before = old_rest.pop(c["section_reference"], None)
+            if before is not None:
+                changed.append({"section_reference": c["section_reference"],
+                                "old": before["exact_clause"], "new": c["exact_clause"]})
+            else:
+                added.append(c)
+        return {"unchanged": unchanged, "changed": changed, "added": added, "removed": list(old_rest.values())}
+
+
+_store: Optional[ResultStore] = None
+_store_lock = threading.Lock()
+
+
+def get_result_store() -> ResultStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ResultStore()
+    return _store
+
+
+def _resolve(ref: str) -> str:
+    # A file path is looked up by its content hash
+    return file_hash(ref) if os.path.isfile(ref) else ref
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect stored interpretations and audit results")
+    parser.add_argument("--list", action="store_true", help="list stored documents")
+    parser.add_argument("--diff", nargs=2, metavar=("OLD", "NEW"), help="diff two documents (file paths or hashes)")
+    args = parser.parse_args()
+
+    store = get_result_store()
+    if args.diff:
+        diff = store.diff_documents(_resolve(args.diff[0]), _resolve(args.diff[1]))
+        print(f"{len(diff['unchanged'])} unchanged (served from the store), {len(diff['changed'])} changed, "
+              f"{len(diff['added'])} added, {len(diff['removed'])} removed")
+        for c in diff["changed"]:
+            print(f"~ {c['section_reference']}\n    - {c['old']}\n    + {c['new']}")
+        for c in diff["added"]:
+            print(f"+ {c['section_reference']}: {c['exact_clause']}")
+        for c in diff["removed"]:
+            print(f"- {c['section_reference']}: {c['exact_clause']}")
+    else:
+        for d in store.documents():
+            print(f"{d['doc_hash'][:12]}  {d['audited']:>3}/{d['clauses']:<3} audited  {d['filename']}")
@@ -0,0 +1,69 @@
+'''
+Review sessions: the interpretation a reviewer is working on, keyed by a
+random review ID that travels in the review form.
+
+Stored in a local SQLite file (WAL mode), so the upload, the review submit
+and the result stream can each land on a different gunicorn worker without
+sticky sessions or re-running the interpreter. Sessions expire after
+REVIEW_TTL_SECONDS; expired rows are purged whenever a new review starts.
+'''
+
+import json
+import secrets
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.config import REVIEW_DB_PATH, REVIEW_TTL_SECONDS
+from app.storage.sqlite import per_thread_connection
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reviews (
+    review_id      TEXT PRIMARY KEY,
+    interpretation TEXT NOT NULL,
+    expires_at     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reviews_expires_at ON reviews(expires_at);
+"""
+
+
+class ReviewStore:
+    def __init__(self, path: str = REVIEW_DB_PATH, ttl_seconds: float = REVIEW_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._connect = per_thread_connection(path, _SCHEMA)
+
+    def create(self, interpretation: Dict[str, Any]) -> str:
+        review_id = secrets.token_urlsafe(16)
+        now = time.time()
+        conn = self._connect()
+        conn.execute("DELETE FROM reviews WHERE expires_at < ?", (now,))
+        conn.execute(
+            "INSERT INTO reviews (review_id, interpretation, expires_at) VALUES (?, ?, ?)",
+            (review_id, json.dumps(interpretation), now + self.ttl_seconds),
+        )
+        return review_id
+
+    def get(self, review_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """The interpretation behind `review_id`, or None if it is unknown or expired."""
+        if not review_id:
+            return None
+        row = self._connect().execute(
+            "SELECT interpretation FROM reviews WHERE review_id = ? AND expires_at >= ?",
+            (review_id, time.time()),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+_store: Optional[ReviewStore] = None
+_store_lock = threading.Lock()
+
+
+def get_review_store() -> ReviewStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ReviewStore()
+    return _store
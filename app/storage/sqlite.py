@@ -0,0 +1,32 @@
+'''
+Per-thread SQLite connections shared by the local stores (result store,
+review sessions, job queue).
+'''
+
+import os
+import sqlite3
+import threading
+from typing import Callable
+
+
+def per_thread_connection(path: str, schema: str) -> Callable[[], sqlite3.Connection]:
+    """
+    Connection factory for one SQLite file: one connection per thread, opened
+    lazily so importing a store never touches the disk, in autocommit + WAL
+    mode with `schema` (CREATE ... IF NOT EXISTS statements) applied on open.
+    """
+    local = threading.local()
+
+    def connect() -> sqlite3.Connection:
+        conn = getattr(local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            conn = sqlite3.connect(path, isolation_level=None, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(schema)
+            local.conn = conn
+        return conn
+
+    return connect
@@ -0,0 +1,198 @@
+'''
+In-process counters and histograms, rendered in the Prometheus text format.
+
+Values live in memory per process: every gunicorn worker and job worker
+exposes its own, so scrape each one (or sum them in Prometheus). Stats that
+are already kept elsewhere (response cache, embedding cache, pre-triage, job
+queue) are read when /metrics is scraped and rendered next to these as
+Gauge families.
+'''
+
+import math
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; spans from a BM25 lookup (~1 ms) up to a long interpreter call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def samples(self) -> Iterator[Sample]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for name, labels, value in self.samples():
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+            lines.append(f"{name}{{{label_text}}} {_format_value(value)}" if label_text
+                         else f"{name} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterator[Sample]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield self.name, dict(zip(self.labels, key)), value
+
+
+class Gauge(_Metric):
+    """Set at scrape time from stats kept elsewhere; `kind` may be "counter" for monotonic totals."""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), kind: str = "gauge"):
+        super().__init__(name, help_text, labels)
+        self.kind = kind
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def samples(self) -> Iterator[Sample]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield self.name, dict(zip(self.labels, key)), value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Per label set: [count per bucket (non-cumulative)..., sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        slot = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            counts = self._values.setdefault(key, [0.0] * (len(self.buckets) + 1))
+            counts[slot] += 1
+            counts[-1] += value
+
+    def samples(self) -> Iterator[Sample]:
+        with self._lock:
+            values = sorted((key, list(counts)) for key, counts in self._values.items())
+        for key, counts in values:
+            labels = dict(zip(self.labels, key))
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", labels, counts[-1]
+            yield f"{self.name}_count", labels, cumulative
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def render(self, extra: Iterable[_Metric] = ()) -> str:
+        """Prometheus text exposition of every registered metric plus `extra` scrape-time families."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in [*metrics, *extra]:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "policy_gap_stage_duration_seconds",
+    "Wall time of a pipeline stage or LangGraph node.",
+    ["stage"],
+)
+STAGE_ERRORS = REGISTRY.counter(
+    "policy_gap_stage_errors_total",
+    "Pipeline stages or graph nodes that raised.",
+    ["stage"],
+)
+OPENAI_REQUESTS = REGISTRY.counter(
+    "policy_gap_openai_requests_total",
+    "HTTP requests to the OpenAI API by endpoint and status code (SDK retries show up as 429/5xx).",
+    ["endpoint", "status"],
+)
+OPENAI_REQUEST_SECONDS = REGISTRY.histogram(
+    "policy_gap_openai_request_duration_seconds",
+    "Latency of successful OpenAI API requests.",
+    ["endpoint"],
+)
+OPENAI_TOKENS = REGISTRY.counter(
+    "policy_gap_openai_tokens_total",
+    "Tokens reported in the usage of OpenAI API responses, by the stage that made the call.",
+    ["endpoint", "stage", "kind"],
+)
+RETRIES = REGISTRY.counter(
+    "policy_gap_retries_total",
+    "Operations retried by the app's own retry loops.",
+    ["operation"],
+)
+CACHE_LOOKUPS = REGISTRY.counter(
+    "policy_gap_cache_lookups_total",
+    "Cache lookups by cache and outcome.",
+    ["cache", "outcome"],
+)
+
+
+def gauge(name: str, help_text: str, values: Dict[Optional[str], float], label: Optional[str] = None,
+          kind: str = "gauge") -> Gauge:
+    """Scrape-time family from a {label value: number} dict (key None when unlabelled)."""
+    family = Gauge(name, help_text, [label] if label else [], kind=kind)
+    for key, value in values.items():
+        if label:
+            family.set(value, **{label: key})
+        else:
+            family.set(value)
+    return family
@@ -0,0 +1,208 @@
+'''
+Spans around pipeline stages and LangGraph nodes.
+
+    with span("rerank", pairs=40): ...
+    @traced("graph.router_agent")
+
+A span times its block into policy_gap_stage_duration_seconds, counts the
+error if the block raises, and becomes the current stage, so the token usage
+the shared HTTP client sees (observe_openai_response, registered as an httpx
+response hook) is attributed to the stage that made the call.
+
+With TRACE_DIR set, trace("review") collects every span opened below it into
+one JSON file: name, parent, offset, duration, attributes, tokens and error of
+each span. Worker threads join the trace when their function is submitted
+through in_context(), which copies the caller's context into the thread.
+'''
+
+import contextvars
+import functools
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from app.config import METRICS_ENABLED, TRACE_DIR
+from app.telemetry.metrics import (
+    OPENAI_REQUEST_SECONDS, OPENAI_REQUESTS, OPENAI_TOKENS, STAGE_ERRORS, STAGE_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+_span_ids = itertools.count(1)
+
+
+class Span:
+    __slots__ = ("id", "name", "parent", "attrs", "tokens", "error", "start", "duration")
+
+    def __init__(self, name: str, parent: Optional["Span"], attrs: Dict[str, Any]):
+        self.id = next(_span_ids)
+        self.name = name
+        self.parent = parent
+        self.attrs = attrs
+        self.tokens: Dict[str, int] = {}
+        self.error: Optional[str] = None
+        self.start = time.perf_counter()
+        self.duration = 0.0
+
+
+class Trace:
+    def __init__(self, name: str, attrs: Dict[str, Any]):
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs = attrs
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        record = {
+            "id": span.id,
+            "parent": span.parent.id if span.parent else None,
+            "name": span.name,
+            "thread": threading.current_thread().name,
+            "offset_s": round(span.start - self.start, 6),
+            "duration_s": round(span.duration, 6),
+        }
+        if span.attrs:
+            record["attrs"] = span.attrs
+        if span.tokens:
+            record["tokens"] = span.tokens
+        if span.error:
+            record["error"] = span.error
+        with self._lock:
+            self.spans.append(record)
+
+    def write(self, directory: str) -> str:
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.localtime(self.started_at))
+        path = os.path.join(directory, f"{stamp}_{self.name}_{self.id}.json")
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["offset_s"])
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"trace_id": self.id, "name": self.name, "attrs": self.attrs,
+                       "started_at": self.started_at, "spans": spans}, f, indent=1, default=str)
+        return path
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("current_trace", default=None)
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Optional[Span]]:
+    trace_ = _current_trace.get()
+    if not METRICS_ENABLED and trace_ is None:
+        yield None
+        return
+
+    current = Span(name, _current_span.get(), attrs)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        if METRICS_ENABLED:
+            STAGE_ERRORS.inc(stage=name)
+        raise
+    finally:
+        current.duration = time.perf_counter() - current.start
+        _current_span.reset(token)
+        if METRICS_ENABLED:
+            STAGE_SECONDS.observe(current.duration, stage=name)
+        if trace_ is not None:
+            trace_.add(current)
+
+
+def traced(name: str) -> Callable[[Callable], Callable]:
+    """Decorator form of span(); used on graph nodes so each node is timed under its own name."""
+    def decorate(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def annotate(**attrs: Any) -> None:
+    """Add attributes (cache outcome, batch size, ...) to the current span, if any."""
+    current = _current_span.get()
+    if current is not None:
+        current.attrs.update(attrs)
+
+
+@contextmanager
+def trace(name: str, **attrs: Any) -> Iterator[Optional[Trace]]:
+    """Root span written to TRACE_DIR; nested trace() calls are plain spans of the outer trace."""
+    if not TRACE_DIR or _current_trace.get() is not None:
+        with span(name, **attrs):
+            yield _current_trace.get()
+        return
+
+    root = Trace(name, attrs)
+    token = _current_trace.set(root)
+    try:
+        with span(name, **attrs):
+            yield root
+    finally:
+        _current_trace.reset(token)
+        try:
+            root.write(TRACE_DIR)
+        except OSError:
+            logger.exception("Could not write trace %s to %s", root.id, TRACE_DIR)
+
+
+def in_context(fn: Callable) -> Callable:
+    """`fn` bound to a copy of the caller's context, for pool.submit(); one copy per submit."""
+    ctx = contextvars.copy_context()
+    return functools.partial(ctx.run, fn)
+
+
+def _usage(body: bytes) -> Optional[Dict[str, Any]]:
+    # The usage object closes the response; decode just that instead of the whole (embedding) payload
+    at = body.rfind(b'"usage"')
+    if at < 0:
+        return None
+    rest = body[at + len(b'"usage"'):].decode("utf-8", "replace").lstrip(" \t\r\n:")
+    try:
+        usage, _ = json.JSONDecoder().raw_decode(rest)
+    except ValueError:
+        return None
+    return usage if isinstance(usage, dict) else None
+
+
+def observe_openai_response(response) -> None:
+    """httpx response hook on the shared client: request counts, latency and token usage per stage."""
+    if not METRICS_ENABLED:
+        return
+    path = response.request.url.path
+    endpoint = "chat" if path.endswith("/chat/completions") else "embeddings" if path.endswith("/embeddings") else "other"
+    OPENAI_REQUESTS.inc(endpoint=endpoint, status=str(response.status_code))
+    if response.status_code != 200 or "json" not in response.headers.get("content-type", ""):
+        return
+
+    response.read()
+    try:
+        OPENAI_REQUEST_SECONDS.observe(response.elapsed.total_seconds(), endpoint=endpoint)
+    except RuntimeError:
+        pass  # elapsed is only known once the response is closed
+    usage = _usage(response.content)
+    if not usage:
+        return
+
+    current = _current_span.get()
+    stage = current.name if current else "other"
+    for kind in ("prompt_tokens", "completion_tokens"):
+        count = usage.get(kind)
+        if not count:
+            continue
+        OPENAI_TOKENS.inc(count, endpoint=endpoint, stage=stage, kind=kind.split("_")[0])
+        if current is not None:
+            current.tokens[kind] = current.tokens.get(kind, 0) + int(count)
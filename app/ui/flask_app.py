@@ -1,20 +1,16 @@
 import os
-from flask import Flask, render_template, request
+import uuid
+from typing import Optional
+from flask import Flask, abort, jsonify, render_template, request, url_for
 from werkzeug.utils import secure_filename
 
-from sentence_transformers import CrossEncoder
+from app.config import FAISS_INDEX_PATH, JOB_WORKERS_IN_WEB, LLM_RATE_LIMIT_ENABLED, WARMUP_ON_START
 
-from app.config import FAISS_INDEX_PATH, CHAT_MODEL
-from app.state import AppState
-from app.graph.flow import app as graph_app
-
-from app.rag.vectorstore_indexer import build_faiss_from_folder, build_temp_faiss, get_vector_db
-
-from app.agents.new_doc_interpreter import interpret_new_document
-
-from langchain_openai import ChatOpenAI
+# NOTE: LangChain/LangGraph, FAISS, the interpreter and the cross-encoder are imported
+# inside the routes that use them, so importing this module (and serving "/") stays fast.
 
 import logging
+import threading
 logging.basicConfig(level=logging.INFO)
 
 ALLOWED_EXTENSIONS = {"pdf", "txt"}
@@ -22,6 +18,8 @@ ALLOWED_EXTENSIONS = {"pdf", "txt"}
 flask_app = Flask(__name__)
 flask_app.config["MAX_CONTENT_LENGTH"] = 20 * 1024 * 1024  # 20MB
 
+SSE_HEARTBEAT_SECONDS = 15
+
 
 def allowed_file(filename: str) -> bool:
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -33,105 +31,401 @@ def index():
 
 
 
-@flask_app.post("/analyze")
-def analyze():
-    uploaded_file = request.files.get("file")   
-    filename = secure_filename(uploaded_file.filename)
-    
+def _save_upload(unique: bool = False):
+    """Save the uploaded policy under data/user_input; returns (path, filename) or None."""
+    uploaded_file = request.files.get("file")
     if not uploaded_file or uploaded_file.filename == "":
-        return "No file uploaded", 400
-    
+        return None
+    filename = secure_filename(uploaded_file.filename)
+
     os.makedirs("data/user_input", exist_ok=True)
 
-    uploaded_pdf_path = os.path.join("data/user_input", filename)
+    # Queued uploads get a unique name so concurrent jobs never overwrite each other's file
+    stored_name = f"{uuid.uuid4().hex[:12]}_{filename}" if unique else filename
+    uploaded_pdf_path = os.path.join("data/user_input", stored_name)
     uploaded_file.save(uploaded_pdf_path)
-    
-    # 1. Build Index (or just load documents for the prompt)
-    temp_faiss = build_temp_faiss(uploaded_pdf_path)
+    return uploaded_pdf_path, filename
 
-    # 2. Extract full text in order
-    policy_text = "\n".join([doc.page_content for doc in temp_faiss.docstore._dict.values()])
 
-    # 3. Call your updated prompt function
-    llm = ChatOpenAI(model_name=CHAT_MODEL, temperature=0)
-    interpreted_data = interpret_new_document(llm, policy_text)
+@flask_app.post("/analyze")
+def analyze():
+    from app.jobs.handlers import analyze_upload
+
+    saved = _save_upload()
+    if saved is None:
+        return "No file uploaded", 400
 
-    # 4. Save to config for later retrieval if needed
-    flask_app.config["LAST_INTERPRETED"] = interpreted_data
+    # 1. Extract the policy text and interpret it (served from the result store for a known file)
+    interpreted_data = analyze_upload({"path": saved[0], "filename": saved[1]})
 
-    # 5. Render with specific keys
+    # 2. Open a review session and render with specific keys
+    return _render_review(interpreted_data)
+
+
+def _render_review(interpreted_data: dict):
+    """
+    Keep the interpretation in the shared review store and render the review
+    form; the review ID in the form lets any worker pick the session up.
+    """
+    from app.storage.sessions import get_review_store
+
+    review_id = get_review_store().create(interpreted_data)
     return render_template(
         "interpreter_review.html",
+        review_id=review_id,
         metadata=interpreted_data.get("metadata", {}),
-        analysis=interpreted_data.get("analysis", [])
+        analysis=interpreted_data.get("analysis", []),
+        failed_parts=interpreted_data.get("failed_parts", [])
     )
 
-reranker_model = CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2')
+
+def _approved_items(review_id: Optional[str] = None, approved: Optional[list] = None):
+    """Interpretation behind the review ID and the clauses the reviewer left checked."""
+    from app.storage.sessions import get_review_store
+
+    review_id = review_id or request.form.get("review_id")
+    approved_texts = set(approved if approved is not None else request.form.getlist("approved_clauses"))
+    interpreted_data = get_review_store().get(review_id)
+    if interpreted_data is None:
+        abort(410, "This review has expired or is unknown; please upload the policy again.")
+    analysis_items = interpreted_data.get("analysis", [])
+    return interpreted_data, [item for item in analysis_items if item.get("exact_clause") in approved_texts]
+
 
 @flask_app.post("/review/submit")
 def submit_review():
-    # Load the Internal Policies Vector DB (FAISS)
-    db = get_vector_db()
+    from app.jobs.handlers import audit_review
 
-    # 1. Capture the list of clauses checked by the user
-    approved_texts = set(request.form.getlist("approved_clauses"))
+    # 1. Capture the clauses checked by the user
+    interpreted_data, approved_items = _approved_items()
 
-    # 2. Retrieve the full interpretation dictionary from config
-    interpreted_data = flask_app.config.get("LAST_INTERPRETED", {})
-    analysis_items = interpreted_data.get("analysis", [])
-     
-    results = []
-
-    # 3. Process only the approved clauses through the Graph
-    for item in analysis_items:
-        current_clause = item.get("exact_clause")
-        if current_clause not in approved_texts:
-            continue
-
-        # 4. RETRIEVER: Search the knowledge base for the top regulatory requirements    
-        initial_results = db.similarity_search(current_clause, k=5)
-
-        # 5. Reranking documents via Cross-Encoder
-        pairs = [[current_clause, doc.page_content] for doc in initial_results]
-        scores = reranker_model.predict(pairs)
-        scored_docs = sorted(zip(scores, initial_results), key=lambda x: x[0], reverse=True)
-        top_reranked_docs = [doc for score, doc in scored_docs[:2]]
-        dynamic_scope = "\n\n".join([doc.page_content for doc in top_reranked_docs])
-
-        # 5. Prepare the State for Graph-based Analysis
-        state = {
-            "requirement": current_clause,
-            "evidence": dynamic_scope
-        }
-        
-        # 6. Invoke the Graph App (LangChain Graph)
-        out = graph_app.invoke(state)
+    # 2. Process only the approved clauses through the Graph (concurrently, order preserved)
+    audited = audit_review({
+        "items": approved_items,
+        "metadata": interpreted_data.get("metadata", {}),
+        "doc_hash": interpreted_data.get("doc_hash"),
+    })
 
-        # Get the LAST entry added to the audit log by the finalized_and_log agent
-        # If the log is empty (e.g., dropped), we provide a fallback
-        audit_entries = out.get("audit_log", [])
-        final_finding = audit_entries[-1] if audit_entries else {}
-        
-        # Collect the audit findings (e.g., "Missing Verification")
-        results.append({
-        "theme": item.get("theme"),
-        "clause": current_clause,
-        "source_ref": out.get("source_ref", "Not Explicitly Stated"),             # Dynamic from Gap Agent
-        "status": out.get("gap_status", "Not Applicable"),      # Dynamic from Gap Agent
-        "gap_summary": out.get("gap_summary", "Not Applicable"), # Dynamic from Gap Agent
-        "risk_rating": out.get("rating", "Not Applicable"),               # Dynamic from Risk Agent
-        "risk_statement": out.get("risk_statement", "Not Applicable"),               # Dynamic from Risk Agent
-        "risk_recommendation": out.get("recommended_control", "Not Applicable")     # Dynamic from Risk Agent
-        })
-        
     return render_template(
         
         "result.html",
-        results=results,
+        results=audited["results"],
+        metadata=audited["metadata"]
+    )
+
+
+@flask_app.post("/review/live")
+def live_review():
+    """Results page that fills in each clause's row as /review/stream reports it."""
+    interpreted_data, approved_items = _approved_items()
+    return render_template(
+        "result_live.html",
+        review_id=request.form.get("review_id"),
+        items=approved_items,
         metadata=interpreted_data.get("metadata", {})
     )
 
+
+@flask_app.post("/review/stream")
+def stream_review():
+    """
+    Server-Sent Events: one `row` event per audited clause (in completion order),
+    comment heartbeats while the graph is busy, and a final `done` event.
+    """
+    import json
+    import queue
+    from contextlib import closing
+
+    from flask import Response, stream_with_context
+
+    from app.graph.runner import iter_audit_clauses
+    from app.rag.reranker import get_reranker
+    from app.rag.vectorstore_indexer import get_vector_db
+    from app.telemetry.tracing import trace
+
+    interpreted_data, approved_items = _approved_items()
+    doc_hash = interpreted_data.get("doc_hash")
+    total = len(approved_items)
+    events: "queue.Queue" = queue.Queue()
+    finished = object()
+    disconnected = threading.Event()
+
+    # 1. Run the audit on a background thread so heartbeats keep flowing between rows;
+    #    it stops (and cancels the clauses not started yet) once the browser goes away
+    def _produce():
+        try:
+            with trace("review_stream", clauses=total), closing(
+                iter_audit_clauses(approved_items, get_vector_db(), get_reranker(), doc_hash=doc_hash)
+            ) as rows:
+                for index, row in rows:
+                    if disconnected.is_set():
+                        logging.info("Review stream closed by the client; cancelling the remaining clauses")
+                        break
+                    events.put((index, row))
+        except Exception as e:
+            logging.exception("Streaming review failed")
+            events.put(e)
+        finally:
+            events.put(finished)
+
+    threading.Thread(target=_produce, name="review-stream", daemon=True).start()
+
+    # 2. Relay rows to the browser as rendered table rows
+    def _events():
+        done = 0
+        try:
+            while True:
+                try:
+                    event = events.get(timeout=SSE_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is finished:
+                    break
+                if isinstance(event, Exception):
+                    yield f"event: failed\ndata: {json.dumps({'error': str(event)})}\n\n"
+                    continue
+                index, row = event
+                done += 1
+                payload = {
+                    "index": index,
+                    "html": render_template("_result_row.html", item=row),
+                    "done": done,
+                    "total": total,
+                }
+                yield f"event: row\ndata: {json.dumps(payload)}\n\n"
+            yield f"event: done\ndata: {json.dumps({'done': done, 'total': total})}\n\n"
+        finally:
+            # Runs when the stream ends and when the client disconnects (GeneratorExit)
+            disconnected.set()
+
+    return Response(
+        stream_with_context(_events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _enqueue(kind: str, payload: dict):
+    from app.jobs.queue import get_job_queue
+
+    job_id = get_job_queue().enqueue(kind, payload)
+    if JOB_WORKERS_IN_WEB:
+        from app.jobs.worker import start_worker_pool
+        start_worker_pool().notify()
+    return jsonify({
+        "job_id": job_id,
+        "status_url": url_for("job_status", job_id=job_id),
+        "result_url": url_for("job_result", job_id=job_id),
+    }), 202
+
+
+@flask_app.post("/jobs/analyze")
+def enqueue_analyze():
+    """Queue interpretation of an uploaded policy; poll /jobs/<id> for progress."""
+    saved = _save_upload(unique=True)
+    if saved is None:
+        return jsonify({"error": "No file uploaded"}), 400
+    return _enqueue("analyze", {"path": saved[0], "filename": saved[1]})
+
+
+@flask_app.post("/jobs/review")
+def enqueue_review():
+    """
+    Queue the audit of the approved clauses: the review form, JSON
+    {"review_id": ..., "approved_clauses": [...]}, or JSON {"items": [...], "metadata": {...}}.
+    """
+    body = request.get_json() if request.is_json else None
+    if body is not None and "review_id" not in body:
+        payload = {"items": body.get("items", []), "metadata": body.get("metadata", {}),
+                   "doc_hash": body.get("doc_hash")}
+    else:
+        if body is not None:
+            interpreted_data, approved_items = _approved_items(body["review_id"], body.get("approved_clauses", []))
+        else:
+            interpreted_data, approved_items = _approved_items()
+        payload = {"items": approved_items, "metadata": interpreted_data.get("metadata", {}),
+                   "doc_hash": interpreted_data.get("doc_hash")}
+    return _enqueue("review", payload)
+
+
+@flask_app.get("/jobs")
+def list_jobs():
+    from app.jobs.queue import get_job_queue
+
+    queue = get_job_queue()
+    return jsonify({"counts": queue.counts(), "jobs": queue.recent()})
+
+
+@flask_app.get("/jobs/<job_id>")
+def job_status(job_id: str):
+    from app.jobs.queue import get_job_queue
+
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    job.pop("payload")
+    job.pop("result")
+    return jsonify(job)
+
+
+@flask_app.get("/jobs/<job_id>/result")
+def job_result(job_id: str):
+    """Rendered page for a finished job (or its raw JSON with ?format=json)."""
+    from app.jobs.queue import DONE, FAILED, get_job_queue
+
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    if job["status"] == FAILED:
+        return jsonify({"status": FAILED, "error": job["error"]}), 500
+    if job["status"] != DONE:
+        return jsonify({"status": job["status"], "done": job["progress_done"], "total": job["progress_total"]}), 202
+
+    result = job["result"]
+    if request.args.get("format") == "json":
+        return jsonify(result)
+    if job["kind"] == "analyze":
+        return _render_review(result)
+    return render_template("result.html", results=result["results"], metadata=result["metadata"])
+
+
+@flask_app.get("/documents")
+def list_documents():
+    """Policies seen so far, with how many of their clauses have stored audit rows."""
+    from app.storage.results import get_result_store
+
+    return jsonify(get_result_store().documents())
+
+
+@flask_app.get("/documents/<doc_hash>/results")
+def document_results(doc_hash: str):
+    """Latest stored audit row for each clause of a policy (rendered, or JSON with ?format=json)."""
+    from app.storage.results import get_result_store
+
+    rows = get_result_store().document_results(doc_hash)
+    if request.args.get("format") == "json":
+        return jsonify(rows)
+    return render_template("result.html", results=rows, metadata={})
+
+
+@flask_app.get("/documents/<old_hash>/diff/<new_hash>")
+def diff_documents(old_hash: str, new_hash: str):
+    """Clause-level diff between two interpreted policy versions."""
+    from app.storage.results import get_result_store
+
+    return jsonify(get_result_store().diff_documents(old_hash, new_hash))
+
+
+@flask_app.get("/cache/stats")
+def cache_stats():
+    """Hit rates of the agent response cache and the embedding cache."""
+    from app.llm.openai_client import embeddings
+    from app.llm.response_cache import get_response_cache
+
+    response_cache = get_response_cache()
+    return jsonify({
+        "llm_responses": response_cache.stats() if response_cache else None,
+        "embeddings": embeddings.cache.stats() if embeddings.cache else None,
+    })
+
+
+@flask_app.get("/triage/stats")
+def triage_stats():
+    """Clauses the rule-based pre-triage sent straight to Out of Scope, and the calls that saved."""
+    from app.graph.pretriage import triage_stats as stats
+
+    return jsonify(stats())
+
+
+@flask_app.get("/metrics")
+def metrics():
+    """
+    Prometheus text format: stage and graph-node timings, OpenAI requests and
+    tokens, retries, the rate limiter's state, plus the cache, pre-triage and
+    job queue stats above.
+    Counters are per process; scrape every worker.
+    """
+    from flask import Response
+
+    from app.graph.pretriage import triage_stats as stats
+    from app.jobs.queue import get_job_queue
+    from app.llm.openai_client import embeddings
+    from app.llm.response_cache import get_response_cache
+    from app.telemetry.metrics import REGISTRY, gauge
+
+    families = []
+    response_cache = get_response_cache()
+    if response_cache is not None:
+        agents = response_cache.stats()["agents"]
+        for outcome in ("exact_hits", "semantic_hits", "misses"):
+            families.append(gauge(
+                f"policy_gap_llm_cache_{outcome}_total", f"Agent response cache {outcome.replace('_', ' ')}.",
+                {agent: c[outcome] for agent, c in agents.items()}, label="agent", kind="counter",
+            ))
+    if embeddings.cache is not None:
+        embed_stats = embeddings.cache.stats()
+        families.append(gauge("policy_gap_embedding_cache_hits_total", "Embedding cache hits.",
+                              {None: embed_stats["hits"]}, kind="counter"))
+        families.append(gauge("policy_gap_embedding_cache_misses_total", "Embedding cache misses.",
+                              {None: embed_stats["misses"]}, kind="counter"))
+
+    triage = stats()
+    families.append(gauge("policy_gap_pretriage_clauses_seen_total", "Clauses seen by the rule-based pre-triage.",
+                          {None: triage["clauses_seen"]}, kind="counter"))
+    families.append(gauge("policy_gap_pretriage_short_circuited_total",
+                          "Clauses pre-triage sent straight to Out of Scope, by rule.",
+                          triage["by_rule"], label="rule", kind="counter"))
+
+    try:
+        job_counts = get_job_queue().counts()
+    except Exception:
+        logging.exception("Could not read job counts for /metrics")
+        job_counts = {}
+    families.append(gauge("policy_gap_jobs", "Background jobs by status.", job_counts, label="status"))
+
+    if LLM_RATE_LIMIT_ENABLED:
+        from app.llm.rate_limiter import get_rate_limiter
+
+        limiter = get_rate_limiter().stats()
+        families.append(gauge("policy_gap_openai_concurrency_limit", "Current AIMD concurrency limit for OpenAI calls.",
+                              {None: limiter["concurrency_limit"]}))
+        families.append(gauge("policy_gap_openai_in_flight", "OpenAI requests in flight.",
+                              {None: limiter["in_flight"]}))
+        families.append(gauge("policy_gap_openai_queued", "OpenAI requests waiting for a permit, by priority.",
+                              limiter["queued"], label="priority"))
+        families.append(gauge("policy_gap_openai_budget_per_minute", "Requests / tokens per minute budget (0 = none).",
+                              {"requests": limiter["rpm_limit"], "tokens": limiter["tpm_limit"]}, label="kind"))
+
+    return Response(REGISTRY.render(families), mimetype="text/plain; version=0.0.4")
+
+
+def warm_up():
+    """
+    Optional warm-up hook: load the vector DB, the reranker model and the graph
+    ahead of the first review. Call it from a gunicorn `post_worker_init` hook,
+    or set WARMUP_ON_START=1 to run it in the background when the dev server starts.
+    """
+    from app.graph import runner  # noqa: F401  (builds the LangGraph app)
+    from app.rag.reranker import get_reranker
+    from app.rag.vectorstore_indexer import get_vector_db
+
+    get_vector_db()
+    reranker = get_reranker()
+    if reranker.backend != "none":
+        reranker.model
+
+
 def run():
+    # debug=True runs this twice: in the reloader's file watcher and in the child that
+    # serves (WERKZEUG_RUN_MAIN=true); background work belongs in the child only
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        if WARMUP_ON_START:
+            threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+        if JOB_WORKERS_IN_WEB:
+            # Pick up jobs queued before a restart without waiting for a new upload
+            from app.jobs.worker import start_worker_pool
+            start_worker_pool()
     flask_app.run(host="127.0.0.1", port=5000, debug=True)
 
 
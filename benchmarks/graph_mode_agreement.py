@@ -0,0 +1,170 @@
+'''
+Agreement and cost of the fast (single fused call) audit graph versus the
+full router -> gap auditor -> risk expert graph.
+
+Evidence for every clause of a fixed fixture is retrieved and reranked once,
+then each clause goes through both graphs with the response cache disabled.
+Reported: route / status / rating agreement, per-clause latency, LLM calls
+and estimated prompt tokens per mode. Clauses both graphs route
+NO_GAP_HIGH_RISK skip the gap audit in both, so their status and source_ref
+must match exactly.
+
+Ran manually from the repo root (needs OPENAI_API_KEY and data/faiss_index):
+    python benchmarks/graph_mode_agreement.py
+    python benchmarks/graph_mode_agreement.py --fixture my_clauses.json --json report.json
+'''
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+# Every call must reach the model, otherwise the second mode would be measured against cached answers
+os.environ["LLM_CACHE_ENABLED"] = "0"
+os.environ["PRETRIAGE_ENABLED"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "audit_clauses.json")
+RATING_LEVELS = {"Low": 0, "Medium": 1, "High": 2, "Critical": 3}
+
+
+class _Counter:
+    """Counts structured LLM calls and their estimated prompt tokens."""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+
+    def wrap(self, runnable):
+        from app.llm.openai_client import estimate_tokens
+
+        counter = self
+
+        class _Counted:
+            def invoke(self, prompt, *args, **kwargs):
+                counter.calls += 1
+                counter.prompt_tokens += estimate_tokens(prompt)
+                return runnable.invoke(prompt, *args, **kwargs)
+
+        return _Counted()
+
+
+def _status_category(status: str) -> str:
+    s = (status or "").lower()
+    for category in ("out of scope", "does not meet", "partially meets", "fully meets", "risky", "error"):
+        if category in s:
+            return category
+    return s or "unknown"
+
+
+def run(fixture: str) -> Dict[str, Any]:
+    from app.graph import runner
+    from app.llm import registry
+    from app.rag.reranker import get_reranker
+    from app.rag.vectorstore_indexer import get_vector_db
+
+    with open(fixture, encoding="utf-8") as f:
+        items: List[Dict[str, Any]] = json.load(f)
+
+    # 1. Same evidence for both modes
+    db = get_vector_db()
+    candidates = runner._retrieve_many(items, db)
+    evidence = runner._rerank(items, candidates, get_reranker())
+
+    # 2. Each clause through each graph, counting calls and prompt tokens
+    original = registry.get_structured_llm
+    rows: Dict[str, List[Dict[str, Any]]] = {}
+    cost: Dict[str, Dict[str, Any]] = {}
+    for mode in ("full", "fast"):
+        counter = _Counter()
+        registry.get_structured_llm = lambda *a, **kw: counter.wrap(original(*a, **kw))
+        latencies = []
+        mode_rows = []
+        try:
+            for item, docs in zip(items, evidence):
+                start = time.perf_counter()
+                try:
+                    mode_rows.append(runner._run_graph(item, docs, mode))
+                except Exception as e:
+                    mode_rows.append(runner._error_row(item, e))
+                latencies.append(time.perf_counter() - start)
+        finally:
+            registry.get_structured_llm = original
+        rows[mode] = mode_rows
+        cost[mode] = {
+            "llm_calls": counter.calls,
+            "prompt_tokens_est": counter.prompt_tokens,
+            "latency_mean_s": round(statistics.mean(latencies), 3),
+            "latency_p95_s": round(sorted(latencies)[max(0, int(len(latencies) * 0.95) - 1)], 3),
+            "latency_total_s": round(sum(latencies), 3),
+        }
+
+    # 3. Agreement between the modes
+    full, fast = rows["full"], rows["fast"]
+    n = len(items)
+    status_agree = sum(_status_category(a["status"]) == _status_category(b["status"]) for a, b in zip(full, fast))
+    scope_agree = sum(
+        (_status_category(a["status"]) == "out of scope") == (_status_category(b["status"]) == "out of scope")
+        for a, b in zip(full, fast)
+    )
+    rated = [(a["risk_rating"], b["risk_rating"]) for a, b in zip(full, fast)
+             if a["risk_rating"] in RATING_LEVELS and b["risk_rating"] in RATING_LEVELS]
+    rating_exact = sum(a == b for a, b in rated)
+    high_risk = [(a, b) for a, b in zip(full, fast)
+                 if _status_category(a["status"]) == _status_category(b["status"]) == "risky"]
+    high_risk_same = sum(a["status"] == b["status"] and a["source_ref"] == b["source_ref"] for a, b in high_risk)
+    rating_within_one = sum(abs(RATING_LEVELS[a] - RATING_LEVELS[b]) <= 1 for a, b in rated)
+
+    return {
+        "clauses": n,
+        "agreement": {
+            "in_scope_vs_out_of_scope": round(scope_agree / n, 3) if n else None,
+            "status": round(status_agree / n, 3) if n else None,
+            "risk_rating_exact": round(rating_exact / len(rated), 3) if rated else None,
+            "risk_rating_within_one_level": round(rating_within_one / len(rated), 3) if rated else None,
+            "rated_in_both": len(rated),
+            "high_risk_gap_fields": round(high_risk_same / len(high_risk), 3) if high_risk else None,
+            "high_risk_in_both": len(high_risk),
+        },
+        "cost": cost,
+        "per_clause": [
+            {"clause": item.get("section_reference"), "full": [a["status"], a["risk_rating"]],
+             "fast": [b["status"], b["risk_rating"]]}
+            for item, a, b in zip(items, full, fast)
+        ],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare the fast and full audit graphs")
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE, help="JSON list of interpreted clauses")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    report = run(args.fixture)
+
+    print(f"{'':<22}{'full':>12}{'fast':>12}")
+    for key in ("llm_calls", "prompt_tokens_est", "latency_mean_s", "latency_p95_s", "latency_total_s"):
+        print(f"{key:<22}{report['cost']['full'][key]:>12}{report['cost']['fast'][key]:>12}")
+    print()
+    for key, value in report["agreement"].items():
+        print(f"{key:<32}{value}")
+    print()
+    for row in report["per_clause"]:
+        marker = " " if _status_category(row["full"][0]) == _status_category(row["fast"][0]) else "*"
+        print(f"{marker} {row['clause']:<26} full={row['full']}  fast={row['fast']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if report["agreement"]["high_risk_gap_fields"] not in (None, 1.0):
+        print("FAIL: NO_GAP_HIGH_RISK rows differ in status / source_ref between the graphs")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
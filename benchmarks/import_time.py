@@ -0,0 +1,67 @@
+'''
+Import-time budget check.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter and
+fails when the cumulative import time exceeds the budget, or when a module
+that should be loaded lazily (torch, the cross-encoder, LangChain, FAISS)
+is pulled in at import time.
+
+Ran manually from the repo root:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --module app.ui.flask_app --budget-ms 800
+'''
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict
+
+# Heavy dependencies that must only load when a route actually needs them
+LAZY_MODULES = ["torch", "sentence_transformers", "langchain_openai", "langgraph", "faiss"]
+
+
+def measure(module: str) -> Dict[str, int]:
+    """Cumulative import time in microseconds for every module imported by `module`."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    timings: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time:  self [us] | cumulative | imported package"
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = int(cumulative_us)
+    return timings
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Fail if importing the web app gets slow")
+    parser.add_argument("--module", default="app.ui.flask_app")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "800")))
+    args = parser.parse_args()
+
+    timings = measure(args.module)
+    total_ms = timings.get(args.module, 0) / 1000
+
+    print(f"import {args.module}: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    print("slowest imports:")
+    for name, us in sorted(timings.items(), key=lambda kv: kv[1], reverse=True)[:10]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    eager = [m for m in LAZY_MODULES if m in timings]
+    if eager:
+        print(f"FAIL: imported eagerly: {', '.join(eager)}")
+        return 1
+    if total_ms > args.budget_ms:
+        print("FAIL: import budget exceeded")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
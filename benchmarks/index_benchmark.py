@@ -0,0 +1,116 @@
+'''
+Recall-vs-latency report for the FAISS index backends.
+
+Every approximate index type (IVF-Flat, HNSW, IVF-PQ) is built over the same
+vectors as an exact flat baseline and queried across a sweep of nprobe /
+efSearch values. Recall@k is measured against the flat results, so no
+embedding API calls are needed.
+
+Ran manually from the repo root:
+    python benchmarks/index_benchmark.py                       # vectors of data/faiss_index
+    python benchmarks/index_benchmark.py --synthetic 1000000   # clustered random vectors
+'''
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import FAISS_INDEX_PATH, FAISS_TRAIN_SIZE
+from app.rag.vectorstore_indexer import configure_search, make_index
+
+
+def _load_index_vectors(path: str) -> np.ndarray:
+    index = faiss.read_index(f"{path}/index.faiss")
+    if isinstance(index, faiss.IndexIDMap2):
+        # Labels can have gaps after deletes; the wrapped flat index is dense
+        index = faiss.downcast_index(index.index)
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def _synthetic_vectors(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    # Clustered data behaves much more like real embeddings than uniform noise
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, n // 1000), dim)).astype(np.float32)
+    labels = rng.integers(0, len(centers), n)
+    return centers[labels] + 0.3 * rng.standard_normal((n, dim)).astype(np.float32)
+
+
+def _recall(truth: np.ndarray, found: np.ndarray) -> float:
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / truth.size
+
+
+def _timed_search(index: faiss.Index, queries: np.ndarray, k: int):
+    start = time.perf_counter()
+    _, ids = index.search(queries, k)
+    elapsed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    return ids, elapsed_ms
+
+
+def run_report(vectors: np.ndarray, n_queries: int = 200, k: int = 5) -> List[Dict]:
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(n, size=min(n_queries, n), replace=False)]
+    queries = queries + 0.01 * rng.standard_normal(queries.shape).astype(np.float32)
+
+    # Exact baseline
+    labels = np.arange(n, dtype=np.int64)
+    flat = make_index(dim, n, "flat")
+    flat.add_with_ids(vectors, labels)
+    truth, flat_ms = _timed_search(flat, queries, k)
+    rows = [{"index": "flat", "param": "-", "recall": 1.0, "ms_per_query": flat_ms,
+             "build_s": 0.0, "bytes": faiss.serialize_index(flat).nbytes}]
+
+    sweeps = {
+        "ivf_flat": ("nprobe", [1, 4, 8, 16, 64]),
+        "hnsw": ("efSearch", [16, 32, 64, 128, 256]),
+        "ivf_pq": ("nprobe", [1, 4, 8, 16, 64]),
+    }
+    for index_type, (param, values) in sweeps.items():
+        start = time.perf_counter()
+        index = make_index(dim, n, index_type)
+        if not index.is_trained:
+            index.train(vectors[:FAISS_TRAIN_SIZE])
+        index.add_with_ids(vectors, labels)
+        build_s = time.perf_counter() - start
+        size = faiss.serialize_index(index).nbytes
+
+        for value in values:
+            if param == "nprobe":
+                configure_search(index, nprobe=value)
+            else:
+                configure_search(index, ef_search=value)
+            ids, ms = _timed_search(index, queries, k)
+            rows.append({"index": index_type, "param": f"{param}={value}", "recall": _recall(truth, ids),
+                         "ms_per_query": ms, "build_s": build_s, "bytes": size})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare FAISS index types against the flat baseline")
+    parser.add_argument("--index-path", default=FAISS_INDEX_PATH)
+    parser.add_argument("--synthetic", type=int, default=0, help="benchmark N synthetic vectors instead")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    vectors = (_synthetic_vectors(args.synthetic, args.dim) if args.synthetic
+               else _load_index_vectors(args.index_path))
+    print(f"{len(vectors)} vectors, dim={vectors.shape[1]}, recall@{args.k}\n")
+    print(f"{'index':<10}{'param':<14}{'recall':>8}{'ms/query':>11}{'build s':>10}{'size MB':>10}")
+    for row in run_report(vectors, n_queries=args.queries, k=args.k):
+        print(f"{row['index']:<10}{row['param']:<14}{row['recall']:>8.3f}{row['ms_per_query']:>11.3f}"
+              f"{row['build_s']:>10.2f}{row['bytes'] / 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+'''
+End-to-end pipeline benchmark against a local OpenAI-compatible stub.
+
+Runs the whole path offline and at no cost:
+    ingest          build a FAISS + BM25 index from data/internal_policies
+    /analyze        N concurrent users upload the policies in data/user_input
+    /review/submit  each user approves every interpreted clause
+with chat completions and embeddings answered by benchmarks/stub_openai.py
+(fixed latency, deterministic structured outputs). All indexes, stores and
+uploads live in a temp dir, so the repo's data/ is never touched.
+
+Reported: latency percentiles per request and per pipeline stage (extract,
+interpret, retrieve, rerank, graph), throughput, peak RSS and the API calls
+the stub served. The run is compared with a stored baseline and exits 1 on a
+regression: latencies and peak memory beyond --tolerance, lower throughput,
+more 429s (with --stub-rpm), or any endpoint called more often than before.
+Baselines are only comparable on the same machine with the same settings;
+the settings are stored with the baseline and a mismatch is reported instead
+of compared.
+
+Response, embedding and result caches are off unless --with-caches, and the
+reranker keeps retrieval order (RERANK_BACKEND=none), so the numbers measure
+the pipeline rather than the cross-encoder download.
+
+Ran from the repo root:
+    python benchmarks/pipeline_benchmark.py --users 4
+    python benchmarks/pipeline_benchmark.py --users 4 --save-baseline
+    python benchmarks/pipeline_benchmark.py --users 8 --latency-ms 300 --baseline none --json report.json
+'''
+
+import argparse
+import glob
+import html
+import json
+import logging
+import os
+import re
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Any, Callable, Dict, List
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_BASELINE = os.path.join(REPO_DIR, "benchmarks", "baselines", "pipeline.json")
+POLICIES_DIR = os.path.join(REPO_DIR, "data", "internal_policies")
+UPLOADS = sorted(glob.glob(os.path.join(REPO_DIR, "data", "user_input", "*.pdf")))
+
+_REVIEW_ID = re.compile(r'name="review_id" value="([^"]*)"')
+_APPROVED = re.compile(r'name="approved_clauses" value="([^"]*)"')
+# Absolute slack on latency comparisons, so millisecond-scale stages do not fail on scheduler noise
+LATENCY_FLOOR_S = 0.05
+
+
+def _configure_env(tmp: str, stub_url: str, args: argparse.Namespace) -> None:
+    """Point the app at the stub and the temp dir; must run before anything under app/ is imported."""
+    caches = "1" if args.with_caches else "0"
+    os.environ.update({
+        "OPENAI_BASE_URL": stub_url,
+        "OPENAI_API_KEY": "stub",
+        "FAISS_INDEX_PATH": os.path.join(tmp, "faiss_index"),
+        "EMBED_CACHE_PATH": os.path.join(tmp, "cache", "embeddings.sqlite"),
+        "LLM_CACHE_PATH": os.path.join(tmp, "cache", "llm_responses.sqlite"),
+        "RESULTS_DB_PATH": os.path.join(tmp, "results", "results.sqlite"),
+        "REVIEW_DB_PATH": os.path.join(tmp, "results", "reviews.sqlite"),
+        "JOBS_DB_PATH": os.path.join(tmp, "jobs", "jobs.sqlite"),
+        "EMBED_CACHE_ENABLED": caches,
+        "LLM_CACHE_ENABLED": caches,
+        "RESULTS_MEMO_ENABLED": caches,
+        "RERANK_BACKEND": "none",
+        "JOB_WORKERS_IN_WEB": "0",
+        "GRAPH_MODE": args.graph_mode,
+    })
+
+
+class _Timings:
+    """Wall-clock samples per stage, shared by all user threads."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+    def wrap(self, stage: str, fn: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return timed
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    # Nearest-rank percentile; small sample counts make interpolation meaningless anyway
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _summary(values: List[float]) -> Dict[str, Any]:
+    return {
+        "count": len(values),
+        "p50_s": round(_percentile(values, 50), 4),
+        "p95_s": round(_percentile(values, 95), 4),
+        "p99_s": round(_percentile(values, 99), 4),
+        "max_s": round(max(values), 4),
+    }
+
+
+def _instrument(timings: _Timings) -> None:
+    """Time the stages the routes go through; the routes import these by module attribute."""
+    from app.agents import new_doc_interpreter
+    from app.graph import runner
+    from app.rag import pdf_stream
+
+    pdf_stream.extract_text = timings.wrap("extract", pdf_stream.extract_text)
+    new_doc_interpreter.interpret_new_document = timings.wrap("interpret", new_doc_interpreter.interpret_new_document)
+    runner._retrieve_many = timings.wrap("retrieve", runner._retrieve_many)
+    runner._rerank = timings.wrap("rerank", runner._rerank)
+    runner._run_graph = timings.wrap("graph", runner._run_graph)
+
+
+def _user_session(client, user: int, upload: str, timings: _Timings) -> int:
+    """One reviewer: upload a policy, approve every clause, submit. Returns the number of clauses audited."""
+    with open(upload, "rb") as f:
+        data = f.read()
+
+    # 1. Upload (a per-user file name, so concurrent users never overwrite each other's upload)
+    start = time.perf_counter()
+    resp = client.post(
+        "/analyze",
+        data={"file": (BytesIO(data), f"user{user}_{os.path.basename(upload)}")},
+        content_type="multipart/form-data",
+    )
+    timings.add("analyze_request", time.perf_counter() - start)
+    if resp.status_code != 200:
+        raise RuntimeError(f"/analyze returned {resp.status_code}")
+
+    page = resp.get_data(as_text=True)
+    review_id = _REVIEW_ID.search(page)
+    approved = [html.unescape(v) for v in _APPROVED.findall(page)]
+    if review_id is None:
+        raise RuntimeError("/analyze did not render a review form")
+
+    # 2. Approve everything and run the audit
+    start = time.perf_counter()
+    resp = client.post("/review/submit", data={"review_id": html.unescape(review_id.group(1)),
+                                               "approved_clauses": approved})
+    timings.add("review_request", time.perf_counter() - start)
+    if resp.status_code != 200:
+        raise RuntimeError(f"/review/submit returned {resp.status_code}")
+    return len(approved)
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    from stub_openai import base_url, start_stub_server
+
+    if not UPLOADS:
+        raise SystemExit("No PDFs in data/user_input to upload")
+
+    server, stub = start_stub_server(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, rpm=args.stub_rpm)
+    tmp = tempfile.mkdtemp(prefix="pipeline-bench-")
+    cwd = os.getcwd()
+    try:
+        _configure_env(tmp, base_url(server), args)
+        # Uploads are saved under ./data/user_input, which must be the temp dir
+        os.chdir(tmp)
+        timings = _Timings()
+
+        # 1. Ingest the internal policies
+        from app.rag.vectorstore_indexer import build_faiss_from_folder
+
+        start = time.perf_counter()
+        build_faiss_from_folder(POLICIES_DIR, os.environ["FAISS_INDEX_PATH"])
+        ingest_s = time.perf_counter() - start
+        ingest_calls = stub.stats()
+        stub.reset()
+
+        # 2. Concurrent reviewers through the Flask routes
+        from app.ui.flask_app import flask_app
+
+        _instrument(timings)
+        sessions = [(u, UPLOADS[(u + r) % len(UPLOADS)]) for r in range(args.rounds) for u in range(args.users)]
+        errors: List[str] = []
+
+        def _worker(user: int) -> int:
+            client = flask_app.test_client()
+            audited = 0
+            for u, upload in sessions:
+                if u != user:
+                    continue
+                try:
+                    audited += _user_session(client, u, upload, timings)
+                except Exception as e:
+                    errors.append(f"user {u}: {e}")
+            return audited
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.users, thread_name_prefix="bench-user") as pool:
+            clauses = sum(pool.map(_worker, range(args.users)))
+        wall_s = time.perf_counter() - start
+
+        # ru_maxrss is KiB on Linux, bytes on macOS; the stub runs in-process and is included
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_rss_mb = maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+        return {
+            "settings": {
+                "users": args.users,
+                "rounds": args.rounds,
+                "stub_latency_ms": args.latency_ms,
+                "stub_jitter_ms": args.jitter_ms,
+                "stub_rpm": args.stub_rpm,
+                "graph_mode": args.graph_mode,
+                "caches": bool(args.with_caches),
+                "uploads": [os.path.basename(p) for p in UPLOADS],
+            },
+            "ingest": {"seconds": round(ingest_s, 3), "api": ingest_calls},
+            "stages": {stage: _summary(values) for stage, values in sorted(timings.samples.items())},
+            "throughput": {
+                "sessions": len(sessions),
+                "clauses_audited": clauses,
+                "wall_s": round(wall_s, 3),
+                "sessions_per_min": round(60 * len(sessions) / wall_s, 2) if wall_s else None,
+                "clauses_per_s": round(clauses / wall_s, 3) if wall_s else None,
+            },
+            "peak_rss_mb": round(peak_rss_mb, 1),
+            "api": stub.stats(),
+            "errors": errors,
+        }
+    finally:
+        os.chdir(cwd)
+        server.shutdown()
+        if args.keep_tmp:
+            print(f"Temp dir kept: {tmp}")
+        else:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions of `report` against `baseline`; empty when the run is at least as good."""
+    regressions: List[str] = []
+
+    for stage, base in baseline["stages"].items():
+        now = report["stages"].get(stage)
+        if now is None:
+            continue
+        for key in ("p50_s", "p95_s"):
+            limit = base[key] * (1 + tolerance) + LATENCY_FLOOR_S
+            if now[key] > limit:
+                regressions.append(f"{stage} {key}: {now[key]}s > {base[key]}s (+{tolerance:.0%})")
+
+    base_tp, now_tp = baseline["throughput"]["clauses_per_s"], report["throughput"]["clauses_per_s"]
+    if base_tp and now_tp is not None and now_tp < base_tp * (1 - tolerance):
+        regressions.append(f"throughput: {now_tp} clauses/s < {base_tp} (-{tolerance:.0%})")
+
+    if report["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+        regressions.append(f"peak RSS: {report['peak_rss_mb']} MB > {baseline['peak_rss_mb']} MB (+{tolerance:.0%})")
+
+    if report["api"]["throttled"] > baseline["api"].get("throttled", 0):
+        regressions.append(f"429 responses: {report['api']['throttled']} > {baseline['api'].get('throttled', 0)}")
+
+    # The stub is deterministic, so any extra call is a real change in behaviour
+    for section in ("ingest", None):
+        base_calls = (baseline[section]["api"] if section else baseline["api"])["calls"]
+        now_calls = (report[section]["api"] if section else report["api"])["calls"]
+        for endpoint, count in sorted(now_calls.items()):
+            if count > base_calls.get(endpoint, 0):
+                where = f"{section} " if section else ""
+                regressions.append(f"{where}API calls {endpoint}: {count} > {base_calls.get(endpoint, 0)}")
+    return regressions
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    s = report["settings"]
+    print(f"{s['users']} users x {s['rounds']} rounds, stub latency {s['stub_latency_ms']} ms, "
+          f"graph {s['graph_mode']}, caches {'on' if s['caches'] else 'off'}")
+    print(f"ingest: {report['ingest']['seconds']}s, {report['ingest']['api']['total_calls']} API calls\n")
+
+    print(f"{'stage':<18}{'count':>7}{'p50 s':>10}{'p95 s':>10}{'p99 s':>10}{'max s':>10}")
+    for stage, v in report["stages"].items():
+        print(f"{stage:<18}{v['count']:>7}{v['p50_s']:>10}{v['p95_s']:>10}{v['p99_s']:>10}{v['max_s']:>10}")
+
+    t = report["throughput"]
+    print(f"\n{t['sessions']} sessions, {t['clauses_audited']} clauses in {t['wall_s']}s: "
+          f"{t['sessions_per_min']} sessions/min, {t['clauses_per_s']} clauses/s")
+    print(f"peak RSS: {report['peak_rss_mb']} MB")
+    api = report["api"]
+    print(f"API calls: {api['total_calls']} {api['calls']}, {api['embedding_inputs']} embedded texts, "
+          f"~{api['prompt_tokens']} prompt / ~{api['completion_tokens']} completion tokens, "
+          f"{api['throttled']} answered 429")
+    for error in report["errors"]:
+        print(f"ERROR {error}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline end-to-end pipeline benchmark")
+    parser.add_argument("--users", type=int, default=4, help="concurrent reviewers")
+    parser.add_argument("--rounds", type=int, default=1, help="upload/review sessions per user")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="stub latency per API call")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="deterministic +/- jitter per API call")
+    parser.add_argument("--stub-rpm", type=int, default=0, help="stub answers 429 past this many requests/min")
+    parser.add_argument("--graph-mode", default="full", choices=("full", "fast"))
+    parser.add_argument("--with-caches", action="store_true", help="keep response/embedding/result caches on")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON, or 'none' to skip the check")
+    parser.add_argument("--save-baseline", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown / memory growth")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--keep-tmp", action="store_true", help="keep the temp dir with indexes and stores")
+    args = parser.parse_args()
+
+    # One INFO line per stub request would drown the report
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    report = run(args)
+    _print_report(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if report["errors"]:
+        return 1
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if args.baseline == "none" or not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline["settings"] != report["settings"]:
+        print(f"\nBaseline settings differ ({baseline['settings']}); not compared")
+        return 0
+
+    regressions = compare(report, baseline, args.tolerance)
+    print()
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    print("OK: no regression against the baseline" if not regressions else f"{len(regressions)} regression(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,330 @@
+'''
+Local OpenAI-compatible stub server for offline benchmarks.
+
+Serves the two endpoints the app uses:
+    POST /v1/embeddings        deterministic feature-hashed vectors (similar
+                               texts get similar vectors, so retrieval is
+                               meaningful)
+    POST /v1/chat/completions  a canned tool call for structured-output
+                               requests (RouterDecision, GapFinding, RiskEntry,
+                               FusedAssessment, or any other schema), and the
+                               interpreter's JSON for plain prompts, built from
+                               the numbered headings of the policy text
+Answers depend only on the request, so runs are repeatable. Every response
+waits a configurable latency, and GET /stats reports call and token counts
+(POST /stats/reset clears them). With --rpm the stub enforces a sliding
+one-minute request limit like the real API: x-ratelimit-* headers on every
+response and 429 with retry-after-ms past the limit.
+
+Ran standalone from the repo root:
+    python benchmarks/stub_openai.py --port 8765 --latency-ms 300
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub python -m app.ui.flask_app
+'''
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+EMBED_DIM = 1536
+_TOKEN = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+_HEADING = re.compile(r"^\s*(\d+(?:\.\d+)*)[.)]?\s+([A-Z][^\n]{0,80})$", re.MULTILINE)
+
+
+def _seed(text: str) -> int:
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+
+
+def _tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def embed(text: str, dim: int = EMBED_DIM) -> List[float]:
+    """Feature hashing of word tokens into `dim` buckets, L2-normalised."""
+    vector = np.zeros(dim, dtype=np.float32)
+    for token in _TOKEN.findall(text.lower()):
+        h = _seed(token)
+        vector[h % dim] += 1.0 if (h >> 16) & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    if not norm:
+        vector[_seed(text) % dim] = 1.0
+        norm = 1.0
+    return (vector / norm).tolist()
+
+
+def _pick(options: List[Any], key: str) -> Any:
+    return options[_seed(key) % len(options)]
+
+
+def _canned_arguments(name: str, schema: Dict[str, Any], prompt: str) -> Dict[str, Any]:
+    """Deterministic answer for a structured-output tool call, keyed on the prompt."""
+    route = _pick(["KEEP_GAP", "KEEP_GAP", "KEEP_GAP", "NO_GAP_HIGH_RISK", "DROP_GAP"], prompt)
+    level = _pick(["Low", "Medium", "High"], prompt[::-1])
+    risk = {
+        "risk_statement": "If the control is not enforced, then data may be exposed.",
+        "impact": level,
+        "likelihood": _pick(["Low", "Medium", "High"], prompt[::2]),
+        "rating": {"Low": "Low", "Medium": "Medium", "High": "High"}[level],
+        "recommended_control": "Define the retention period. Automate secure disposal.",
+    }
+    gap = {
+        "gap_summary": "Retention period is not defined. Disposal method is not specified.",
+        "gap_status": _pick(["Partially Meets", "Does Not Meet", "Fully Meets"], prompt[1::2]),
+        "recommendation": "Specify retention periods. Document the disposal process.",
+        "source_ref": _pick(["ISO 27001 Annex A.8.10", "PRIV-RET-01", "Not Explicitly Stated"], prompt[2:]),
+    }
+    triage = {"route": route, "confidence": 0.85, "reason": "Canned stub decision."}
+
+    canned = {
+        "RouterDecision": triage,
+        "GapFinding": gap,
+        "RiskEntry": risk,
+        "FusedAssessment": {**triage, **gap, **risk},
+    }
+    if name in canned:
+        return canned[name]
+
+    # Unknown schema: first enum value / a placeholder of the right type for every required field
+    args: Dict[str, Any] = {}
+    for field, spec in schema.get("properties", {}).items():
+        if "enum" in spec:
+            args[field] = spec["enum"][0]
+        elif spec.get("type") in ("number", "integer"):
+            args[field] = 1
+        elif spec.get("type") == "boolean":
+            args[field] = True
+        elif spec.get("type") == "array":
+            args[field] = []
+        else:
+            args[field] = "stub"
+    return args
+
+
+def _interpretation(prompt: str) -> Dict[str, Any]:
+    """Interpreter JSON built from the numbered headings of the policy part in the prompt."""
+    policy = prompt.split("POLICY DOCUMENT:", 1)[-1]
+    matches = list(_HEADING.finditer(policy))
+    analysis = []
+    for i, m in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(policy)
+        body = " ".join(policy[m.end():end].split())
+        if not body:
+            continue
+        heading = f"{m.group(1)}. {m.group(2).strip()}"
+        analysis.append({
+            "section_reference": heading,
+            "exact_clause": body[:600],
+            "theme": m.group(2).split()[0],
+            "evaluation": "Complete",
+            "confidence_score": round(0.5 + (_seed(body) % 50) / 100, 2),
+        })
+    title = next((line.strip() for line in policy.splitlines() if line.strip() and line.strip() != '"'), "Policy")
+    return {
+        "metadata": {"title": title[:120], "owner": "Compliance Team", "effective_date": "01 Jan 2025",
+                     "applies_to": "All employees"},
+        "analysis": analysis,
+    }
+
+
+class StubState:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, per_1k_tokens_ms: float = 0.0,
+                 rpm: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.per_1k_tokens_ms = per_1k_tokens_ms
+        self.rpm = rpm
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.window: List[float] = []
+            self.throttled = 0
+            self.counts: Dict[str, int] = {}
+            self.embedding_inputs = 0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+
+    def record(self, key: str, prompt_tokens: int, completion_tokens: int = 0, inputs: int = 0) -> None:
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.embedding_inputs += inputs
+
+    def admit(self) -> Optional[float]:
+        """None if the request fits the one-minute window, else the seconds until a slot frees up."""
+        if not self.rpm:
+            return None
+        now = time.monotonic()
+        with self.lock:
+            while self.window and self.window[0] <= now - 60:
+                self.window.pop(0)
+            if len(self.window) >= self.rpm:
+                self.throttled += 1
+                return self.window[0] + 60 - now
+            self.window.append(now)
+            return None
+
+    def remaining(self) -> int:
+        """Requests left in the current one-minute window (for the x-ratelimit headers)."""
+        with self.lock:
+            return max(0, self.rpm - len(self.window))
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "calls": dict(self.counts),
+                "total_calls": sum(self.counts.values()),
+                "throttled": self.throttled,
+                "embedding_inputs": self.embedding_inputs,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+            }
+
+    def wait(self, tokens: int, key: str) -> None:
+        jitter = random.Random(_seed(key)).uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        delay = max(0.0, self.latency_ms + jitter + self.per_1k_tokens_ms * tokens / 1000)
+        if delay:
+            time.sleep(delay / 1000)
+
+
+def _make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):  # keep benchmark output clean
+            pass
+
+        def _send(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            if state.rpm:
+                self.send_header("x-ratelimit-limit-requests", str(state.rpm))
+                self.send_header("x-ratelimit-remaining-requests", str(state.remaining()))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/stats"):
+                return self._send(200, state.stats())
+            self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            path = self.path.rstrip("/")
+
+            if path.endswith("/stats/reset"):
+                state.reset()
+                return self._send(200, {"ok": True})
+            retry_after = state.admit()
+            if retry_after is not None:
+                return self._send(429, {"error": {"message": "Rate limit reached for requests", "type": "requests",
+                                                  "code": "rate_limit_exceeded"}},
+                                  {"retry-after-ms": str(int(retry_after * 1000))})
+            if path.endswith("/embeddings"):
+                return self._embeddings(body)
+            if path.endswith("/chat/completions"):
+                return self._chat(body)
+            self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+        def _embeddings(self, body: Dict[str, Any]) -> None:
+            inputs = body.get("input", [])
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            dim = int(body.get("dimensions") or EMBED_DIM)
+            tokens = sum(_tokens(str(t)) for t in inputs)
+            state.wait(tokens, f"emb:{len(inputs)}")
+            state.record("embeddings", tokens, inputs=len(inputs))
+            self._send(200, {
+                "object": "list",
+                "model": body.get("model", "stub-embedding"),
+                "data": [{"object": "embedding", "index": i, "embedding": embed(str(t), dim)}
+                         for i, t in enumerate(inputs)],
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+            })
+
+        def _chat(self, body: Dict[str, Any]) -> None:
+            prompt = "\n".join(str(m.get("content") or "") for m in body.get("messages", []))
+            tokens = _tokens(prompt)
+            tools = body.get("tools") or []
+            message: Dict[str, Any] = {"role": "assistant", "content": None}
+            finish = "stop"
+
+            if tools:
+                function = tools[0]["function"]
+                choice = body.get("tool_choice")
+                if isinstance(choice, dict):
+                    name = choice["function"]["name"]
+                    function = next((t["function"] for t in tools if t["function"]["name"] == name), function)
+                args = json.dumps(_canned_arguments(function["name"], function.get("parameters", {}), prompt))
+                message["tool_calls"] = [{
+                    "id": f"call_{_seed(prompt):08x}",
+                    "type": "function",
+                    "function": {"name": function["name"], "arguments": args},
+                }]
+                finish = "tool_calls"
+                key = f"chat:{function['name']}"
+                completion = _tokens(args)
+            else:
+                message["content"] = json.dumps(_interpretation(prompt))
+                key = "chat:text"
+                completion = _tokens(message["content"])
+
+            state.wait(tokens + completion, prompt)
+            state.record(key, tokens, completion)
+            self._send(200, {
+                "id": f"chatcmpl-{_seed(prompt):08x}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "stub-chat"),
+                "choices": [{"index": 0, "message": message, "finish_reason": finish, "logprobs": None}],
+                "usage": {"prompt_tokens": tokens, "completion_tokens": completion,
+                          "total_tokens": tokens + completion},
+            })
+
+    return Handler
+
+
+def start_stub_server(port: int = 0, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                      per_1k_tokens_ms: float = 0.0, rpm: int = 0, host: str = "127.0.0.1"):
+    """Start the stub on a background thread; returns (server, state). Port 0 picks a free port."""
+    state = StubState(latency_ms, jitter_ms, per_1k_tokens_ms, rpm)
+    server = ThreadingHTTPServer((host, port), _make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="openai-stub", daemon=True).start()
+    return server, state
+
+
+def base_url(server) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/v1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server for offline benchmarks")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="base latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="deterministic +/- jitter per request")
+    parser.add_argument("--per-1k-tokens-ms", type=float, default=0.0, help="extra latency per 1k tokens")
+    parser.add_argument("--rpm", type=int, default=0, help="requests per minute before answering 429 (0 = no limit)")
+    args = parser.parse_args()
+
+    server, _ = start_stub_server(args.port, args.latency_ms, args.jitter_ms, args.per_1k_tokens_ms, args.rpm)
+    print(f"OpenAI stub listening on {base_url(server)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
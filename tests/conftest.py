@@ -0,0 +1,58 @@
+'''
+Unit tests for the pure parts of the pipeline: no OpenAI calls, no network.
+
+    pip install pytest
+    python -m pytest -q
+
+Settings are read from the environment when app.config is first imported, so
+they are pinned here, before any test module imports the app.
+'''
+
+import hashlib
+import os
+import sys
+import tempfile
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_TMP = tempfile.mkdtemp(prefix="policy-gap-tests-")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ["TRACE_DIR"] = ""
+for name, filename in (("RESULTS_DB_PATH", "results.sqlite"), ("REVIEW_DB_PATH", "reviews.sqlite"),
+                       ("JOBS_DB_PATH", "jobs.sqlite"), ("EMBED_CACHE_PATH", "embeddings.sqlite"),
+                       ("LLM_CACHE_PATH", "llm_responses.sqlite")):
+    os.environ[name] = os.path.join(_TMP, filename)
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic 16-d vectors from the text's hash; records every text it embeds."""
+
+    def __init__(self):
+        self.embedded = []
+
+    def _vector(self, text):
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [b / 255.0 for b in digest[:16]]
+
+    def iter_embeddings(self, texts):
+        texts = list(texts)
+        self.embedded.extend(texts)
+        yield list(range(len(texts))), [self._vector(t) for t in texts]
+
+    def embed_documents(self, texts):
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+@pytest.fixture
+def fake_embeddings(monkeypatch):
+    """Offline stand-in for the OpenAI embeddings used by index builds and vector search."""
+    fake = FakeEmbeddings()
+    monkeypatch.setattr("app.llm.openai_client.embeddings", fake)
+    monkeypatch.setattr("app.rag.vectorstore_indexer.embeddings", fake)
+    return fake
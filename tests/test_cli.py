@@ -0,0 +1,113 @@
+import csv
+import json
+
+import pytest
+
+from app import cli
+from app.jobs import handlers
+
+
+@pytest.fixture
+def policies(tmp_path):
+    folder = tmp_path / "policies"
+    (folder / "nested").mkdir(parents=True)
+    (folder / "a.txt").write_text("1. Access\nAccess must be reviewed.\n", encoding="utf-8")
+    (folder / "nested" / "b.txt").write_text("1. Backups\nBackups must be encrypted.\n", encoding="utf-8")
+    (folder / "low.txt").write_text("LOW\n1. Purpose\nThis policy describes things.\n", encoding="utf-8")
+    (folder / "notes.md").write_text("not a policy", encoding="utf-8")
+    return folder
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Offline stand-ins for the interpreter and the audit, recording which documents reached them."""
+    seen = {"interpret": [], "audit": []}
+    broken = set()
+
+    def analyze_upload(payload, progress=None):
+        seen["interpret"].append(payload["filename"])
+        if payload["filename"] in broken:
+            raise RuntimeError("interpreter unavailable")
+        score = 0.2 if payload["text"].startswith("LOW") else 0.9
+        return {"metadata": {}, "analysis": [
+            {"section_reference": "1", "exact_clause": payload["text"].strip(), "theme": "T",
+             "confidence_score": score},
+        ]}
+
+    def audit_review(payload, progress=None):
+        seen["audit"].append(payload["doc_hash"])
+        return {"results": [{"clause": item["exact_clause"], "status": "Meets"} for item in payload["items"]]}
+
+    monkeypatch.setattr(handlers, "analyze_upload", analyze_upload)
+    monkeypatch.setattr(handlers, "audit_review", audit_review)
+    seen["broken"] = broken
+    return seen
+
+
+def _jsonl(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_discover_walks_directories_and_globs_without_duplicates(policies):
+    found = cli.discover([str(policies), str(policies / "*.txt")])
+
+    assert sorted(p.rsplit("/", 1)[-1] for p in found) == ["a.txt", "b.txt", "low.txt"]
+
+
+def test_batch_writes_jsonl_and_csv(policies, calls, tmp_path):
+    out_jsonl, out_csv = tmp_path / "out.jsonl", tmp_path / "out.csv"
+
+    summary = cli.run_batch(cli.discover([str(policies)]), [str(out_jsonl), str(out_csv)], min_confidence=0.8,
+                            docs_in_flight=2, parse_workers=2)
+
+    assert (summary["audited"], summary["failed"], summary["rows"]) == (3, 0, 3)
+    rows = _jsonl(out_jsonl)
+    assert sorted(r["status"] for r in rows) == ["Meets", "Meets", "No approved clauses"]
+    with open(out_csv, newline="", encoding="utf-8") as f:
+        assert [r["status"] for r in csv.DictReader(f)] == [r["status"] for r in rows]
+    # Only documents with approved clauses reach the audit
+    assert len(calls["audit"]) == 2
+
+
+def test_resume_skips_finished_documents_and_retries_failed_ones(policies, calls, tmp_path):
+    out = tmp_path / "out.jsonl"
+    files = cli.discover([str(policies)])
+    calls["broken"].add("b.txt")
+
+    first = cli.run_batch(files, [str(out)], min_confidence=0.8)
+    assert (first["audited"], first["failed"]) == (2, 1)
+
+    calls["broken"].clear()
+    calls["interpret"].clear()
+    second = cli.run_batch(files, [str(out)], min_confidence=0.8)
+
+    # The document without approved clauses counts as done too
+    assert (second["audited"], second["skipped"], second["failed"]) == (1, 2, 0)
+    assert calls["interpret"] == ["b.txt"]
+    assert len(_jsonl(out)) == 3
+
+
+def test_a_half_written_line_is_dropped_before_resuming(policies, calls, tmp_path):
+    out = tmp_path / "out.jsonl"
+    files = cli.discover([str(policies)])
+    cli.run_batch(files, [str(out)], min_confidence=0.8)
+    with open(out, "a", encoding="utf-8") as f:
+        f.write('{"document": "cut off mid-wri')
+
+    summary = cli.run_batch(files, [str(out)], min_confidence=0.8)
+
+    assert summary["skipped"] == 3
+    assert len(_jsonl(out)) == 3
+
+
+def test_approval_uses_the_pretriage_confidence_parsing(policies, calls, tmp_path, monkeypatch):
+    monkeypatch.setattr(handlers, "analyze_upload", lambda payload, progress=None: {"analysis": [
+        {"exact_clause": "a", "confidence_score": "0.85"},
+        {"exact_clause": "b", "confidence_score": "high"},
+        {"exact_clause": "c"},
+    ]})
+    out = tmp_path / "out.jsonl"
+
+    cli.run_batch([str(policies / "a.txt")], [str(out)], min_confidence=0.8)
+
+    assert [r["clause"] for r in _jsonl(out)] == ["a"]
@@ -0,0 +1,46 @@
+import itertools
+
+from app.llm import embedding_cache
+from app.llm.embedding_cache import EmbeddingCache
+
+
+def _cache(tmp_path, monkeypatch, max_entries=1000):
+    # A strictly increasing clock, so last_used never ties
+    clock = itertools.count(1)
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: float(next(clock)))
+    return EmbeddingCache(str(tmp_path / "embeddings.sqlite"), max_entries=max_entries)
+
+
+def test_get_many_mixes_hits_and_misses_in_input_order(tmp_path, monkeypatch):
+    cache = _cache(tmp_path, monkeypatch)
+    cache.put_many("m", ["a", "b"], [[1.0, 0.0], [0.0, 1.0]])
+
+    assert cache.get_many("m", ["b", "x", "a", "b"]) == [[0.0, 1.0], None, [1.0, 0.0], [0.0, 1.0]]
+    assert cache.stats() == {"hits": 3, "misses": 1, "entries": 2}
+
+
+def test_vectors_are_keyed_by_model(tmp_path, monkeypatch):
+    cache = _cache(tmp_path, monkeypatch)
+    cache.put_many("small", ["a"], [[1.0]])
+
+    assert cache.get_many("large", ["a"]) == [None]
+    assert cache.get_many("small", ["a"]) == [[1.0]]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_eviction_drops_the_least_recently_used_entries(tmp_path, monkeypatch):
+    cache = _cache(tmp_path, monkeypatch, max_entries=2)
+    cache.put_many("m", ["a"], [[1.0]])
+    cache.put_many("m", ["b"], [[2.0]])
+    cache.get_many("m", ["a"])            # a is now more recent than b
+    cache.put_many("m", ["c"], [[3.0]])
+
+    assert cache.get_many("m", ["a", "b", "c"]) == [[1.0], None, [3.0]]
+    assert cache.stats()["entries"] == 2
+
+
+def test_eviction_never_drops_entries_written_by_the_same_call(tmp_path, monkeypatch):
+    cache = _cache(tmp_path, monkeypatch, max_entries=1)
+    cache.put_many("m", ["a", "b", "c"], [[1.0], [2.0], [3.0]])
+
+    assert cache.get_many("m", ["a", "b", "c"]) == [[1.0], [2.0], [3.0]]
@@ -0,0 +1,54 @@
+import threading
+
+from app.llm import openai_client
+from app.llm.embedding_cache import EmbeddingCache
+from app.llm.openai_client import OpenAIEmbeddings, _token_batches, estimate_tokens
+
+
+def test_token_batches_respect_the_token_and_input_budgets():
+    texts = ["x" * 396] * 5          # 100 estimated tokens each
+
+    assert estimate_tokens(texts[0]) == 100
+    assert list(_token_batches(texts, max_tokens=250, max_inputs=10)) == [[0, 1], [2, 3], [4]]
+    assert list(_token_batches(texts, max_tokens=10_000, max_inputs=3)) == [[0, 1, 2], [3, 4]]
+
+
+def test_a_text_over_the_token_budget_gets_a_batch_of_its_own():
+    texts = ["short", "y" * 4000, "short too"]
+
+    assert list(_token_batches(texts, max_tokens=100, max_inputs=10)) == [[0], [1], [2]]
+
+
+class _CountingEmbeddings(OpenAIEmbeddings):
+    def __init__(self, cache=None):
+        super().__init__(cache)
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def _embed_api(self, texts):
+        with self._lock:
+            self.requests.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+
+def test_iter_embeddings_batches_deduplicates_and_keeps_every_index(monkeypatch):
+    monkeypatch.setattr(openai_client, "EMBED_BATCH_MAX_TOKENS", 3)
+    monkeypatch.setattr(openai_client, "EMBED_BATCH_MAX_INPUTS", 100)
+    emb = _CountingEmbeddings()
+    texts = ["aaaa", "bb", "aaaa", "c", "dddddddd"]
+
+    assert emb.embed_documents(texts) == [[4.0], [2.0], [4.0], [1.0], [8.0]]
+    # "aaaa" is sent once; every request stays within 3 estimated tokens unless a single text exceeds it
+    sent = [t for request in emb.requests for t in request]
+    assert sorted(sent) == ["aaaa", "bb", "c", "dddddddd"]
+    for request in emb.requests:
+        assert len(request) == 1 or sum(estimate_tokens(t) for t in request) <= 3
+
+
+def test_iter_embeddings_serves_cache_hits_without_a_request(tmp_path):
+    emb = _CountingEmbeddings(cache=EmbeddingCache(str(tmp_path / "embeddings.sqlite")))
+    emb.embed_documents(["one", "two"])
+    emb.requests.clear()
+
+    assert emb.embed_documents(["two", "three", "one"]) == [[3.0], [5.0], [3.0]]
+    assert emb.requests == [["three"]]
@@ -0,0 +1,66 @@
+import threading
+import time
+
+import pytest
+
+from app.ui import flask_app as web
+
+
+@pytest.fixture
+def started(monkeypatch):
+    """Stub the dev server and the background work run() may start; records what was started."""
+    calls = []
+    warmed = threading.Event()
+    monkeypatch.setattr(web.flask_app, "run", lambda **kwargs: calls.append("serve"))
+    monkeypatch.setattr(web, "warm_up", lambda: (calls.append("warm-up"), warmed.set()))
+    monkeypatch.setattr(web, "WARMUP_ON_START", True)
+    monkeypatch.setattr(web, "JOB_WORKERS_IN_WEB", True)
+    monkeypatch.setattr("app.jobs.worker.start_worker_pool", lambda: calls.append("workers"))
+    return calls, warmed
+
+
+def test_the_reloader_watcher_starts_no_background_work(started, monkeypatch):
+    calls, _ = started
+    monkeypatch.delenv("WERKZEUG_RUN_MAIN", raising=False)
+
+    web.run()
+
+    assert calls == ["serve"]
+
+
+def test_the_serving_process_warms_up_and_starts_the_workers(started, monkeypatch):
+    calls, warmed = started
+    monkeypatch.setenv("WERKZEUG_RUN_MAIN", "true")
+
+    web.run()
+
+    assert warmed.wait(5)
+    assert sorted(calls) == ["serve", "warm-up", "workers"]
+
+
+def test_closing_the_review_stream_stops_the_producer(monkeypatch):
+    produced, stopped = [], threading.Event()
+
+    def _slow_audit(items, db, reranker, doc_hash=None):
+        try:
+            for i, item in enumerate(items):
+                time.sleep(0.02)
+                produced.append(i)
+                yield i, {"clause": item["exact_clause"]}
+        finally:
+            stopped.set()
+
+    items = [{"exact_clause": f"clause {i}"} for i in range(200)]
+    monkeypatch.setattr(web, "_approved_items", lambda: ({"doc_hash": None}, items))
+    monkeypatch.setattr(web, "render_template", lambda name, **context: "<tr></tr>")
+    monkeypatch.setattr("app.graph.runner.iter_audit_clauses", _slow_audit)
+    monkeypatch.setattr("app.rag.vectorstore_indexer.get_vector_db", lambda: None)
+    monkeypatch.setattr("app.rag.reranker.get_reranker", lambda: None)
+
+    response = web.flask_app.test_client().post("/review/stream", buffered=False)
+    first = next(iter(response.response))
+    response.close()
+
+    assert first.startswith(b"event: row")
+    assert stopped.wait(5)
+    assert len(produced) < len(items)
@@ -0,0 +1,39 @@
+import pytest
+
+from app.agents import fused_agent
+from app.agents.fused_agent import FusedAssessment
+from app.graph.flow import finalize_and_log
+from app.state import AppState
+
+
+def _assessment(route):
+    return FusedAssessment(
+        route=route, confidence=0.9, reason="r", gap_summary="Payroll exports are not logged.",
+        gap_status="Fully Meets", recommendation="Log exports.", source_ref="A.8.10",
+        risk_statement="If exports leak, then data is exposed.", impact="High", likelihood="Medium", rating="High",
+        recommended_control="Monitor transfers.",
+    )
+
+
+def _row(monkeypatch, route):
+    monkeypatch.setattr(fused_agent, "invoke_structured", lambda *args, **kwargs: _assessment(route))
+    state = fused_agent.fused_agent(AppState(requirement="Admins delete records manually.", evidence="..."))
+    return finalize_and_log(state).audit_log[-1]
+
+
+def test_high_risk_clauses_get_the_rows_of_the_three_agent_graph(monkeypatch):
+    # The full graph never runs the gap auditor for NO_GAP_HIGH_RISK
+    row = _row(monkeypatch, "NO_GAP_HIGH_RISK")
+
+    assert row["status"] == "Compliant but Risky"
+    assert row["source_ref"] == "Not Explicitly Stated"
+    assert row["gap_summary"] == "Not Applicable"
+    assert row["risk_rating"] == "High"
+
+
+@pytest.mark.parametrize("route, status, rating", [("KEEP_GAP", "Fully Meets", "High"),
+                                                    ("DROP_GAP", "Out of Scope", "Out of Scope")])
+def test_other_routes_keep_their_fields(monkeypatch, route, status, rating):
+    row = _row(monkeypatch, route)
+
+    assert (row["status"], row["risk_rating"]) == (status, rating)
@@ -0,0 +1,53 @@
+from langchain_core.documents import Document
+
+from app.rag.bm25_index import BM25Index, tokenize
+from app.rag.hybrid_retriever import reciprocal_rank_fusion
+
+
+def _doc(chunk_id):
+    return Document(page_content=f"text of {chunk_id}", metadata={"chunk_id": chunk_id})
+
+
+def _ids(docs):
+    return [d.metadata["chunk_id"] for d in docs]
+
+
+def test_rrf_ranks_chunks_found_by_both_retrievers_first():
+    vector = [_doc("a"), _doc("b"), _doc("c")]
+    lexical = [_doc("c"), _doc("d"), _doc("a")]
+
+    # a: 1/61 + 1/63, c: 1/63 + 1/61 (tie, first seen wins), then b (1/62) and d (1/62)
+    assert _ids(reciprocal_rank_fusion([vector, lexical], k=4, rrf_k=60)) == ["a", "c", "b", "d"]
+
+
+def test_rrf_deduplicates_and_cuts_at_k():
+    fused = reciprocal_rank_fusion([[_doc("a"), _doc("b")], [_doc("b"), _doc("a")], [_doc("b")]], k=1)
+
+    assert _ids(fused) == ["b"]
+
+
+def test_rrf_with_one_empty_ranking_keeps_the_other_order():
+    assert _ids(reciprocal_rank_fusion([[], [_doc("x"), _doc("y")]], k=5)) == ["x", "y"]
+
+
+def test_tokenizer_keeps_control_ids_whole_and_indexes_their_parts():
+    tokens = tokenize("See Annex A.8.10 and PRIV_RET-01 for the rules")
+
+    assert "a.8.10" in tokens and "10" in tokens
+    assert "priv-ret-01" in tokens and "priv" in tokens
+    assert "the" not in tokens and "for" not in tokens
+
+
+def test_bm25_finds_exact_control_ids_and_survives_a_round_trip(tmp_path):
+    index = BM25Index.build([
+        ("d1", "Clause: Annex A.8.10 Information deletion when no longer required"),
+        ("d2", "Control ID: PRIV-RET-01 records retention of personal data"),
+        ("d3", "Access control policy for all employees"),
+    ])
+    path = str(tmp_path / "bm25.npz")
+    index.save(path)
+    loaded = BM25Index.load(path)
+
+    assert [doc_id for doc_id, _ in loaded.search("PRIV_RET_01", k=3)] == ["d2"]
+    assert loaded.search("A.8.10 deletion", k=1)[0][0] == "d1"
+    assert loaded.search("unrelated words", k=3) == []
@@ -0,0 +1,123 @@
+import json
+
+import faiss
+import pytest
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from app.rag.vectorstore_indexer import (
+    MANIFEST_NAME, _delete_chunks, _index_documents, _save_db, _updatable, build_faiss_from_folder,
+    configure_search, load_vector_db_mmap, make_index, update_faiss_from_folder,
+)
+
+
+def _write(folder, name, text):
+    (folder / name).write_text(text, encoding="utf-8")
+
+
+def _stored(save_path, fake):
+    db = FAISS.load_local(str(save_path), embeddings=fake, allow_dangerous_deserialization=True)
+    docs = [db.docstore.search(doc_id) for doc_id in db.index_to_docstore_id.values()]
+    return db, {d.metadata["source"]: d.page_content for d in docs}
+
+
+def test_incremental_ingest_adds_changes_and_removes_files(tmp_path, fake_embeddings):
+    folder, save_path = tmp_path / "policies", tmp_path / "index"
+    folder.mkdir()
+    _write(folder, "a.txt", "Passwords are rotated every ninety days.")
+    _write(folder, "b.txt", "Backups are tested once a year.")
+    _write(folder, "c.txt", "Visitors sign in at reception.")
+    build_faiss_from_folder(str(folder), str(save_path))
+
+    _write(folder, "b.txt", "Backups are tested every quarter.")
+    (folder / "c.txt").unlink()
+    _write(folder, "d.txt", "Laptops use full-disk encryption.")
+    fake_embeddings.embedded.clear()
+    update_faiss_from_folder(str(folder), str(save_path))
+
+    # Only the changed and the new file were embedded again
+    assert sorted(fake_embeddings.embedded) == ["Backups are tested every quarter.",
+                                                 "Laptops use full-disk encryption."]
+
+    db, stored = _stored(save_path, fake_embeddings)
+    assert stored == {
+        "a.txt": "Passwords are rotated every ninety days.",
+        "b.txt": "Backups are tested every quarter.",
+        "d.txt": "Laptops use full-disk encryption.",
+    }
+    manifest = json.loads((save_path / MANIFEST_NAME).read_text(encoding="utf-8"))["files"]
+    assert sorted(manifest) == ["a.txt", "b.txt", "d.txt"]
+    chunk_ids = {cid for entry in manifest.values() for cid in entry["chunk_ids"]}
+    assert set(db.index_to_docstore_id.values()) == chunk_ids
+    assert db.index.ntotal == len(chunk_ids)
+
+    # The nearest neighbour of a stored chunk is that chunk
+    hit = db.similarity_search_by_vector(fake_embeddings.embed_query("Backups are tested every quarter."), k=1)
+    assert hit[0].metadata["source"] == "b.txt"
+
+
+def test_incremental_ingest_without_changes_does_not_load_the_index(tmp_path, fake_embeddings, monkeypatch):
+    folder, save_path = tmp_path / "policies", tmp_path / "index"
+    folder.mkdir()
+    _write(folder, "a.txt", "Passwords are rotated every ninety days.")
+    build_faiss_from_folder(str(folder), str(save_path))
+
+    def _no_load(*args, **kwargs):
+        raise AssertionError("an up-to-date index must not be loaded")
+
+    monkeypatch.setattr(FAISS, "load_local", _no_load)
+    fake_embeddings.embedded.clear()
+
+    assert update_faiss_from_folder(str(folder), str(save_path)) is None
+    assert fake_embeddings.embedded == []
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat"])
+def test_deletes_go_through_vector_ids_and_leave_other_chunks_findable(fake_embeddings, index_type):
+    docs = [Document(page_content=f"policy statement number {i}", metadata={"chunk_id": f"c{i}"})
+            for i in range(80)]
+    db = _index_documents(iter(docs), index_type=index_type)
+    configure_search(db.index, nprobe=64, ef_search=128)
+
+    _delete_chunks(db, [f"c{i}" for i in range(0, 80, 2)])
+    _index_documents(iter([Document(page_content="a new statement", metadata={"chunk_id": "new"})]), db)
+
+    assert db.index.ntotal == 41
+    assert len(set(db.index_to_docstore_id)) == 41
+    for text, chunk_id in [("policy statement number 7", "c7"), ("policy statement number 79", "c79"),
+                           ("a new statement", "new")]:
+        hit = db.similarity_search_by_vector(fake_embeddings.embed_query(text), k=1)[0]
+        assert hit.metadata["chunk_id"] == chunk_id
+    assert db.docstore.search("c8") == "ID c8 not found."
+
+
+def test_only_id_mapped_indexes_are_updated_in_place():
+    assert _updatable(make_index(16, 100, "flat"), deletes=True)
+    assert _updatable(make_index(16, 4000, "ivf_flat"), deletes=True)
+    assert _updatable(make_index(16, 100, "hnsw"), deletes=False)
+    # HNSW cannot drop nodes, and indexes saved by older versions map positions instead of IDs
+    assert not _updatable(make_index(16, 100, "hnsw"), deletes=True)
+    assert not _updatable(faiss.IndexFlatL2(16), deletes=False)
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat"])
+def test_mmap_load_returns_what_load_local_returns(tmp_path, fake_embeddings, index_type):
+    texts = [f"Policy {i}: records of type {i} are kept for {i} months." for i in range(60)]
+    db = _index_documents(iter([Document(page_content=t, metadata={"chunk_id": f"c{i}"})
+                                for i, t in enumerate(texts)]), index_type=index_type)
+    _delete_chunks(db, ["c3"])      # leaves a gap in the vector IDs
+    _save_db(db, str(tmp_path))
+
+    pickled = FAISS.load_local(str(tmp_path), embeddings=fake_embeddings, allow_dangerous_deserialization=True)
+    mapped = load_vector_db_mmap(str(tmp_path))
+    for loaded in (pickled, mapped):
+        configure_search(loaded.index, nprobe=64)
+
+    assert dict(mapped.index_to_docstore_id) == pickled.index_to_docstore_id
+    for i in (0, 4, 59):
+        query = fake_embeddings.embed_query(texts[i])
+        expected = pickled.similarity_search_with_score_by_vector(query, k=3)
+        actual = mapped.similarity_search_with_score_by_vector(query, k=3)
+        assert [(d.page_content, d.metadata, s) for d, s in actual] == \
+            [(d.page_content, d.metadata, s) for d, s in expected]
+        assert actual[0][0].page_content == texts[i]
@@ -0,0 +1,85 @@
+import pytest
+
+from app.jobs.queue import DONE, FAILED, QUEUED, RUNNING, JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite"))
+
+
+def _go_stale(queue, job_id):
+    queue._connect().execute("UPDATE jobs SET heartbeat_at = 0 WHERE id = ?", (job_id,))
+
+
+def test_jobs_are_claimed_oldest_first_and_only_once(queue):
+    first = queue.enqueue("analyze", {"n": 1})
+    second = queue.enqueue("analyze", {"n": 2})
+
+    claimed = queue.claim("w1")
+    assert claimed["id"] == first and claimed["payload"] == {"n": 1}
+    assert claimed["status"] == RUNNING and claimed["attempts"] == 1
+    assert queue.claim("w2")["id"] == second
+    assert queue.claim("w3") is None
+
+
+def test_complete_and_fail_by_the_owning_worker(queue):
+    ok, bad = queue.enqueue("analyze", {}), queue.enqueue("analyze", {})
+    queue.claim("w1")
+    queue.claim("w2")
+
+    assert queue.complete(ok, "w1", {"rows": 3})
+    assert queue.fail(bad, "w2", "ValueError: boom")
+    assert queue.get(ok)["status"] == DONE and queue.get(ok)["result"] == {"rows": 3}
+    assert queue.get(bad)["status"] == FAILED and queue.get(bad)["error"] == "ValueError: boom"
+    assert queue.counts() == {DONE: 1, FAILED: 1}
+
+
+def test_a_worker_that_lost_its_lease_cannot_overwrite_the_new_owner(queue):
+    job_id = queue.enqueue("audit", {})
+    queue.claim("slow")
+    _go_stale(queue, job_id)
+    assert queue.requeue_stale(stale_after=1) == 1
+    assert queue.get(job_id)["status"] == QUEUED
+
+    queue.claim("fresh")
+    assert not queue.complete(job_id, "slow", {"from": "slow"})
+    assert not queue.fail(job_id, "slow", "late failure")
+    assert queue.complete(job_id, "fresh", {"from": "fresh"})
+
+    job = queue.get(job_id)
+    assert job["status"] == DONE and job["result"] == {"from": "fresh"} and job["attempts"] == 2
+    assert not queue.fail(job_id, "fresh", "after done")
+
+
+def test_heartbeats_keep_running_jobs_alive(queue):
+    job_id = queue.enqueue("audit", {})
+    queue.claim("w1")
+    _go_stale(queue, job_id)
+
+    queue.heartbeat([job_id])
+
+    assert queue.requeue_stale(stale_after=60) == 0
+    assert queue.get(job_id)["status"] == RUNNING
+
+
+def test_jobs_that_keep_dying_are_failed_after_max_attempts(queue):
+    job_id = queue.enqueue("audit", {})
+    for attempt in range(2):
+        queue.claim(f"w{attempt}")
+        _go_stale(queue, job_id)
+        queue.requeue_stale(stale_after=1, max_attempts=2)
+
+    job = queue.get(job_id)
+    assert job["status"] == FAILED and job["error"] == "worker stopped responding"
+
+
+def test_progress_is_recorded(queue):
+    job_id = queue.enqueue("analyze", {})
+    queue.claim("w1")
+
+    queue.set_progress(job_id, 2, 5)
+
+    job = queue.get(job_id)
+    assert (job["progress_done"], job["progress_total"]) == (2, 5)
+    assert queue.recent()[0]["id"] == job_id
@@ -0,0 +1,54 @@
+import re
+
+from app.telemetry.metrics import Registry, gauge
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*"'
+                    r'(?:,[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*")*\})? (-?[0-9.e+-]+|[+-]Inf|NaN)$')
+
+
+def _check_exposition(text):
+    """Every sample is well formed and belongs to the family announced by the HELP/TYPE lines above it."""
+    assert text.endswith("\n")
+    family = None
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            family = line.split()[2]
+        elif line.startswith("# TYPE "):
+            assert line.split()[2] == family
+            assert line.split()[3] in ("counter", "gauge", "histogram", "untyped")
+        else:
+            match = SAMPLE.match(line)
+            assert match, line
+            assert match.group(1) in (family, f"{family}_bucket", f"{family}_sum", f"{family}_count"), line
+
+
+def test_counters_histograms_and_gauges_render_in_the_text_format():
+    registry = Registry()
+    registry.counter("t_requests_total", "Requests.", ["endpoint"]).inc(endpoint='chat "v1"\n')
+    histogram = registry.histogram("t_seconds", "Latency.", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, stage="retrieve")
+
+    text = registry.render([gauge("t_queue", "Queued.", {"bulk": 2, "interactive": 0}, label="priority")])
+
+    _check_exposition(text)
+    assert 't_requests_total{endpoint="chat \\"v1\\"\\n"} 1' in text
+    assert 't_seconds_bucket{stage="retrieve",le="0.1"} 1' in text
+    assert 't_seconds_bucket{stage="retrieve",le="1"} 2' in text
+    assert 't_seconds_bucket{stage="retrieve",le="+Inf"} 3' in text
+    assert 't_seconds_sum{stage="retrieve"} 5.55' in text
+    assert 't_seconds_count{stage="retrieve"} 3' in text
+    assert 't_queue{priority="bulk"} 2' in text
+
+
+def test_the_metrics_endpoint_serves_valid_exposition():
+    from app.ui.flask_app import flask_app
+
+    response = flask_app.test_client().get("/metrics")
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+    _check_exposition(text)
+    assert "# TYPE policy_gap_stage_duration_seconds histogram" in text
+    assert "# TYPE policy_gap_pretriage_clauses_seen_total counter" in text
@@ -0,0 +1,131 @@
+import json
+import re
+import threading
+
+import pytest
+
+from app.agents.new_doc_interpreter import interpret_new_document, merge_parts, split_into_parts
+from app.config import INTERPRET_PART_CHARS
+
+
+def _squash(text):
+    return re.sub(r"\s+", "", text)
+
+
+POLICY = (
+    "1. Purpose\nThis policy sets the rules for data handling.\n"
+    "2. Retention\n" + "Records must be kept for seven years. " * 40 + "\n\n"
+    + "Backups shall be encrypted at rest. " * 40 + "\n"
+    "3. Access\nAccess must be reviewed quarterly.\n"
+)
+
+
+@pytest.mark.parametrize("max_chars", [80, 300, 1000, 5000])
+def test_parts_never_exceed_the_limit_and_keep_all_text(max_chars):
+    parts = split_into_parts(POLICY, max_chars)
+
+    assert parts
+    assert all(len(part) <= max_chars for part in parts)
+    assert _squash("".join(parts)) == _squash(POLICY)
+
+
+def test_small_sections_are_grouped_into_one_part():
+    assert split_into_parts("1. Purpose\nShort.\n2. Scope\nAlso short.\n", 1000) == [
+        "1. Purpose\nShort.\n2. Scope\nAlso short."
+    ]
+
+
+def test_oversized_section_is_cut_at_paragraphs_before_sentences():
+    section = "1. Retention\n" + "A" * 50 + ".\n\n" + "B" * 50 + "."
+    parts = split_into_parts(section, 70)
+
+    assert [part[-1] for part in parts] == [".", "."]
+    assert parts[1] == "B" * 50 + "."
+
+
+def test_text_without_headings_or_boundaries_is_hard_cut():
+    parts = split_into_parts("x" * 250, 100)
+
+    assert [len(part) for part in parts] == [100, 100, 50]
+
+
+class _FakeLLM:
+    """Answers each part with one clause per numbered heading it contains."""
+
+    def __init__(self, fail_on=None):
+        self.prompts = []
+        self.fail_on = fail_on
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt):
+        with self._lock:
+            self.prompts.append(prompt)
+        text = prompt.split("POLICY DOCUMENT:", 1)[1]
+        if self.fail_on and self.fail_on in text:
+            raise RuntimeError("model unavailable")
+        headings = re.findall(r"^\s*(\d+\. \w+)", text, flags=re.MULTILINE)
+        body = {
+            "metadata": {"title": "Data Policy" if "1. Purpose" in text else "", "owner": "", "effective_date": "",
+                         "applies_to": ""},
+            "analysis": [{"section_reference": h, "exact_clause": h, "theme": "T", "confidence_score": 0.9}
+                         for h in headings],
+        }
+        return type("Message", (), {"content": json.dumps(body)})()
+
+
+SECTIONS = ["Purpose", "Retention", "Access", "Backups", "Logging", "Vendors"]
+LONG_POLICY = "".join(f"{n}. {title}\n" + "Staff must follow this rule. " * (INTERPRET_PART_CHARS // 100) + "\n"
+                      for n, title in enumerate(SECTIONS, start=1))
+
+
+def test_interpretation_maps_each_part_once_and_merges_in_order():
+    sections, policy = SECTIONS, LONG_POLICY
+    llm = _FakeLLM()
+    progress = []
+
+    result = interpret_new_document(llm, policy, progress=lambda done, total: progress.append((done, total)))
+
+    total = len(split_into_parts(policy))
+    assert total > 1
+    assert len(llm.prompts) == total
+    assert progress[-1] == (total, total)
+    assert result["metadata"]["title"] == "Data Policy"
+    assert [c["section_reference"] for c in result["analysis"]] == [
+        f"{n}. {title}" for n, title in enumerate(sections, start=1)
+    ]
+    assert result["failed_parts"] == []
+
+
+def test_a_part_that_fails_every_retry_is_reported_and_the_rest_is_kept():
+    result = interpret_new_document(_FakeLLM(fail_on="3. Access"), LONG_POLICY)
+
+    failed_part = next(i for i, part in enumerate(split_into_parts(LONG_POLICY)) if "3. Access" in part)
+    assert result["failed_parts"] == [failed_part]
+    assert "3. Access" not in [c["section_reference"] for c in result["analysis"]]
+    assert "6. Vendors" in [c["section_reference"] for c in result["analysis"]]
+
+
+def test_merge_skips_failed_parts_and_duplicate_clauses():
+    clause = {"exact_clause": "Access must be reviewed.", "section_reference": "3"}
+    merged = merge_parts([
+        None,
+        {"metadata": {"title": "N/A", "owner": "Security"}, "analysis": [clause]},
+        {"metadata": {"title": "Access Policy", "owner": "Other"}, "analysis": [clause]},
+    ])
+
+    assert merged["metadata"]["title"] == "Access Policy"
+    assert merged["metadata"]["owner"] == "Security"
+    assert merged["analysis"] == [clause]
+    assert merged["failed_parts"] == [0]
+
+
+def test_merge_ignores_malformed_clauses_and_counts_non_object_parts_as_failed():
+    clause = {"exact_clause": "Logs are kept for a year.", "section_reference": "5"}
+    merged = merge_parts([
+        {"metadata": ["not", "a", "dict"], "analysis": ["a bare string", None, 3, clause]},
+        ["a list instead of an object"],
+    ])
+
+    assert merged["analysis"] == [clause]
+    assert merged["metadata"]["title"] == "N/A"
+    assert merged["failed_parts"] == [1]
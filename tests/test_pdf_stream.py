@@ -0,0 +1,64 @@
+import glob
+import os
+
+import pypdf
+import pytest
+
+from app.rag import pdf_stream
+from app.rag.pdf_stream import extract_text, iter_chunks, page_count, split_sections
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_PDF = sorted(glob.glob(os.path.join(REPO_DIR, "data", "internal_policies", "*.pdf")))[0]
+
+
+def test_numbered_headings_start_sections_and_labels_name_them():
+    text = (
+        "Preamble line\n"
+        "Clause: Annex A.8.10\n"
+        "Information must be deleted when no longer required.\n"
+        "3. Data Retention\n"
+        "Control ID: PRIV-RET-01\n"
+        "Records must be kept for seven years.\n"
+    )
+
+    assert split_sections(text) == [
+        ("Annex A.8.10", "Preamble line\nClause: Annex A.8.10\nInformation must be deleted when no longer required."),
+        ("3. Data Retention", "3. Data Retention\nControl ID: PRIV-RET-01\nRecords must be kept for seven years."),
+    ]
+
+
+def test_text_before_any_heading_has_no_title():
+    assert split_sections("just prose\n\n") == [(None, "just prose")]
+
+
+@pytest.fixture
+def multi_page_pdf(tmp_path):
+    writer = pypdf.PdfWriter()
+    for _ in range(5):
+        writer.append(SAMPLE_PDF)
+    path = tmp_path / "five_pages.pdf"
+    writer.write(str(path))
+    return path
+
+
+def test_each_pdf_is_parsed_once_not_once_per_page(multi_page_pdf, monkeypatch):
+    opened = []
+    real_reader = pypdf.PdfReader
+    monkeypatch.setattr(pypdf, "PdfReader", lambda *a, **kw: opened.append(a) or real_reader(*a, **kw))
+
+    chunks = list(iter_chunks([(multi_page_pdf, "five_pages.pdf")], workers=1))
+
+    assert len(opened) == 1
+    assert sorted({c.metadata["page"] for c in chunks}) == [1, 2, 3, 4, 5]
+    assert [c.metadata["chunk_index"] for c in chunks] == list(range(len(chunks)))
+    assert pdf_stream._cached_reader.cache_info().currsize == 0
+
+
+def test_page_count_and_text_files(multi_page_pdf, tmp_path):
+    note = tmp_path / "note.txt"
+    note.write_text("1. Purpose\nKeep data safe.\n", encoding="utf-8")
+
+    assert page_count(multi_page_pdf) == 5
+    assert page_count(note) == 1
+    assert extract_text(str(note)) == "1. Purpose\nKeep data safe.\n"
+    assert [c.metadata["section"] for c in iter_chunks([(note, "note.txt")], workers=1)] == ["1. Purpose"]
@@ -0,0 +1,48 @@
+import pytest
+
+from app.graph import pretriage
+from app.graph.pretriage import pre_triage, record, triage_stats
+
+
+@pytest.mark.parametrize("item", [
+    {"section_reference": "4.2 Encryption", "exact_clause": "All Laptops Encrypted With AES-256", "theme": "Crypto"},
+    {"section_reference": "2.1", "exact_clause": "Access reviews quarterly by owners.", "theme": "Scope"},
+    {"section_reference": "3", "exact_clause": "Backups Tested Annually", "theme": "Definitions"},
+    {"section_reference": "5.1 Passwords", "exact_clause": "Passwords must be at least 14 characters.",
+     "theme": "Access", "confidence_score": "0.9"},
+    {"section_reference": "6", "exact_clause": "MFA for all remote access", "confidence_score": None},
+])
+def test_real_controls_are_never_short_circuited(item):
+    assert pre_triage(item) is None
+
+
+@pytest.mark.parametrize("item, reason", [
+    ({"section_reference": "1. Purpose", "exact_clause": "This policy sets out how data is handled."}, "heading"),
+    ({"section_reference": "Section 2: Scope", "exact_clause": "Applies to all staff."}, "heading"),
+    ({"section_reference": "7", "exact_clause": "Revision History"}, "header_text"),
+    ({"section_reference": "8", "exact_clause": "Staff may be consulted.", "confidence_score": 0.2},
+     "low_confidence"),
+])
+def test_administrative_text_is_short_circuited(item, reason):
+    assert pre_triage(item) == reason
+
+
+def test_clauses_without_obligation_wording_are_dropped_only_when_opted_in(monkeypatch):
+    terse = {"section_reference": "4.2", "exact_clause": "All Laptops Encrypted With AES-256"}
+    assert pre_triage(terse) is None
+
+    monkeypatch.setattr(pretriage, "PRETRIAGE_REQUIRE_MODAL", True)
+    assert pre_triage(terse) == "no_modal_verb"
+    assert pre_triage({**terse, "exact_clause": "All laptops must be encrypted."}) is None
+
+
+def test_triage_stats_count_the_configured_rerank_candidates(monkeypatch):
+    monkeypatch.setattr(pretriage, "RERANK_CANDIDATES", 8)
+    before = triage_stats()
+
+    record(10, {"heading": 2, "low_confidence": 1})
+    after = triage_stats()
+
+    assert after["clauses_seen"] - before["clauses_seen"] == 10
+    assert after["short_circuited"] - before["short_circuited"] == 3
+    assert after["rerank_pairs_avoided"] == after["short_circuited"] * 8
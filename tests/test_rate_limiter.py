@@ -0,0 +1,202 @@
+import json
+import threading
+import time
+
+import httpx
+import pytest
+
+from app.config import LLM_EST_COMPLETION_TOKENS, LLM_RATE_HEADROOM
+from app.llm.rate_limiter import (
+    BULK, INTERACTIVE, RateLimiter, ThrottledTransport, _Bucket, _retry_after, estimate_request_tokens, llm_priority,
+    current_priority,
+)
+
+
+# --- Token bucket ---
+
+def test_bucket_refills_at_its_per_minute_rate_up_to_the_limit():
+    bucket = _Bucket(600)   # 10 per second
+    bucket.take(600)
+    bucket.updated = 100.0
+
+    bucket.refill(101.5)
+    assert bucket.level == pytest.approx(15)
+    assert bucket.wait_for(25) == pytest.approx(1.0)
+
+    bucket.refill(1000.0)
+    assert bucket.level == 600
+
+
+def test_bucket_cost_above_the_limit_waits_for_a_full_bucket_only():
+    bucket = _Bucket(60)
+    bucket.take(1000)
+
+    assert bucket.level == 0
+    assert bucket.wait_for(1000) == pytest.approx(60.0)
+
+
+def test_unlimited_bucket_never_waits():
+    bucket = _Bucket(0)
+    bucket.take(10 ** 9)
+
+    assert bucket.wait_for(10 ** 9) == 0.0
+
+
+# --- AIMD concurrency ---
+
+def _limiter(**kwargs):
+    options = dict(rpm=10 ** 6, tpm=10 ** 9, min_concurrency=1, max_concurrency=64, initial_concurrency=8)
+    options.update(kwargs)
+    return RateLimiter(**options)
+
+
+def _complete(limiter, status, latency=0.01, headers=None, endpoint="completions"):
+    dispatched = limiter.acquire(10)
+    limiter.release(dispatched - latency, status, headers, endpoint)
+
+
+def test_fast_successes_raise_the_limit_additively():
+    limiter = _limiter()
+    for _ in range(8):
+        _complete(limiter, 200)
+
+    # +1/limit per success: eight successes at limit 8 add about one slot
+    assert 8.9 < limiter.limit < 9.0
+
+
+def test_a_burst_of_429s_halves_the_limit_once():
+    limiter = _limiter()
+    for _ in range(5):
+        _complete(limiter, 429)
+
+    assert limiter.limit == 4
+    assert limiter.stats()["throttled"] == 5
+
+    limiter._last_decrease -= 1.0
+    _complete(limiter, 429)
+    assert limiter.limit == 2
+
+
+def test_limit_stays_within_bounds():
+    limiter = _limiter(min_concurrency=2, max_concurrency=3, initial_concurrency=3)
+    for _ in range(50):
+        _complete(limiter, 200)
+    assert limiter.limit == 3
+
+    for _ in range(5):
+        limiter._last_decrease = 0.0
+        _complete(limiter, 429)
+    assert limiter.limit == 2
+
+
+def test_slow_responses_hold_the_limit():
+    limiter = _limiter()
+    _complete(limiter, 200, latency=0.1)
+    before = limiter.limit
+
+    _complete(limiter, 200, latency=10.0)
+
+    assert limiter.limit == before
+    # The baseline only drifts 1% of the way toward a slow sample
+    assert 0.1 < limiter.baseline_latency["completions"] < 0.25
+
+
+def test_retry_after_pauses_dispatch():
+    limiter = _limiter()
+    _complete(limiter, 429, headers=httpx.Headers({"retry-after-ms": "150"}))
+
+    started = time.monotonic()
+    limiter.acquire(1)
+    assert time.monotonic() - started >= 0.1
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"retry-after-ms": "250"}, 0.25),
+    ({"retry-after": "2"}, 2.0),
+    ({"retry-after": "3600"}, 60.0),
+    ({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"}, 0.0),
+    ({}, 0.0),
+])
+def test_retry_after_parsing(headers, expected):
+    assert _retry_after(httpx.Headers(headers)) == expected
+
+
+def test_limits_are_learned_from_rate_limit_headers():
+    limiter = _limiter(rpm=0, tpm=0)
+
+    limiter.release(limiter.acquire(1), 200, httpx.Headers({
+        "x-ratelimit-limit-requests": "100", "x-ratelimit-remaining-requests": "50",
+        "x-ratelimit-limit-tokens": "10000", "x-ratelimit-remaining-tokens": "10000",
+    }))
+
+    assert limiter.requests.limit == pytest.approx(100 * LLM_RATE_HEADROOM)
+    assert limiter.tokens.limit == pytest.approx(10000 * LLM_RATE_HEADROOM)
+    # The account has only 50 requests left; keep the headroom reserve out of them
+    assert limiter.requests.level == pytest.approx(50 - 100 * (1 - LLM_RATE_HEADROOM))
+
+
+# --- Priority ---
+
+def test_interactive_calls_overtake_queued_bulk_calls():
+    limiter = _limiter(max_concurrency=1, initial_concurrency=1)
+    held = limiter.acquire(1)
+    order = []
+
+    def _call(priority):
+        dispatched = limiter.acquire(1, priority)
+        order.append(priority)
+        limiter.release(dispatched, 200, endpoint="completions")
+
+    def _wait_queued(priority):
+        deadline = time.monotonic() + 5
+        while limiter.stats()["queued"][priority] == 0 and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    bulk = threading.Thread(target=_call, args=(BULK,))
+    bulk.start()
+    _wait_queued(BULK)
+    interactive = threading.Thread(target=_call, args=(INTERACTIVE,))
+    interactive.start()
+    _wait_queued(INTERACTIVE)
+
+    limiter.release(held, 200, endpoint="completions")
+    bulk.join(5)
+    interactive.join(5)
+
+    assert order == [INTERACTIVE, BULK]
+
+
+def test_priority_follows_the_context():
+    assert current_priority() == INTERACTIVE
+    with llm_priority(BULK):
+        assert current_priority() == BULK
+    assert current_priority() == INTERACTIVE
+
+
+# --- Request cost and transport ---
+
+def test_request_cost_estimates():
+    chat = httpx.Request("POST", "https://api.test/v1/chat/completions",
+                         content=json.dumps({"messages": [{"role": "user", "content": "x" * 400}]}))
+    capped = httpx.Request("POST", "https://api.test/v1/chat/completions",
+                           content=json.dumps({"messages": [{"content": "x" * 40}], "max_tokens": 5}))
+    embed = httpx.Request("POST", "https://api.test/v1/embeddings", content=json.dumps({"input": ["a" * 40, "b"]}))
+
+    assert estimate_request_tokens(chat) == 101 + LLM_EST_COMPLETION_TOKENS
+    assert estimate_request_tokens(capped) == 11 + 5
+    assert estimate_request_tokens(embed) == 11 + 1
+
+
+def test_transport_releases_the_slot_and_reports_throttling():
+    limiter = _limiter()
+    statuses = iter([429, 200])
+    inner = httpx.MockTransport(lambda request: httpx.Response(next(statuses), json={}))
+
+    with httpx.Client(transport=ThrottledTransport(limiter, inner)) as client:
+        assert client.post("https://api.test/v1/chat/completions", json={}).status_code == 429
+        assert client.post("https://api.test/v1/chat/completions", json={}).status_code == 200
+
+    stats = limiter.stats()
+    assert stats["in_flight"] == 0
+    assert stats["dispatched"] == 2 and stats["throttled"] == 1
+    assert stats["concurrency_limit"] == 4
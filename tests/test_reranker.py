@@ -0,0 +1,65 @@
+import pytest
+from langchain_core.documents import Document
+
+from app.rag.reranker import Reranker
+
+
+class _FakeCrossEncoder:
+    """Scores a pair by how many words of the clause appear in the chunk; records every predict() call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, pairs, batch_size):
+        self.calls.append([tuple(p) for p in pairs])
+        return [len(set(clause.split()) & set(text.split())) for clause, text in pairs]
+
+
+@pytest.fixture
+def make_reranker(monkeypatch):
+    monkeypatch.setattr(Reranker, "_load_model", lambda self: _FakeCrossEncoder())
+    return lambda cache_size=100: Reranker(model_name="fake", backend="torch", batch_size=8, cache_size=cache_size)
+
+
+def _doc(chunk_id, text):
+    return Document(page_content=text, metadata={"chunk_id": chunk_id})
+
+
+def test_rerank_many_scores_every_clause_in_one_batch_and_keeps_groups_apart(make_reranker):
+    reranker = make_reranker()
+    clauses = ["encrypt laptops", "review access quarterly"]
+    candidates = [
+        [_doc("a", "visitors sign in"), _doc("b", "encrypt all laptops"), _doc("c", "laptops are tagged")],
+        [_doc("b", "encrypt all laptops"), _doc("d", "review access every quarterly cycle")],
+    ]
+
+    reranked = reranker.rerank_many(clauses, candidates, top_n=2)
+
+    assert [[d.metadata["chunk_id"] for d in docs] for docs in reranked] == [["b", "c"], ["d", "b"]]
+    assert len(reranker._model.calls) == 1 and len(reranker._model.calls[0]) == 5
+
+
+def test_cached_pairs_never_reach_the_model_again(make_reranker):
+    reranker = make_reranker()
+    docs = [_doc("a", "encrypt all laptops"), _doc("b", "visitors sign in")]
+    first = reranker.score([("encrypt laptops", d) for d in docs])
+
+    second = reranker.score([("encrypt laptops", docs[1]), ("sign in visitors", docs[1])])
+
+    assert first == [2.0, 0.0]
+    assert second == [0.0, 3.0]
+    # Only the new (clause, chunk) pair was predicted
+    assert reranker._model.calls[1] == [("sign in visitors", "visitors sign in")]
+
+
+def test_the_score_cache_evicts_the_least_recently_used_pair(make_reranker):
+    reranker = make_reranker(cache_size=2)
+    a, b, c = _doc("a", "x"), _doc("b", "y"), _doc("c", "z")
+    reranker.score([("q", a), ("q", b)])
+    reranker.score([("q", a)])           # a is now more recent than b
+    reranker.score([("q", c)])
+
+    reranker._model.calls.clear()
+    reranker.score([("q", a), ("q", b), ("q", c)])
+
+    assert reranker._model.calls == [[("q", "y")]]
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+from pydantic import BaseModel
+
+from app.llm import response_cache
+from app.llm.response_cache import ResponseCache
+
+NS = ("gap", "gpt-4.1-mini@0.0", "1")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    return now
+
+
+def _cache(tmp_path, **kwargs):
+    return ResponseCache(str(tmp_path / "llm_responses.sqlite"), **kwargs)
+
+
+def _unit(*values):
+    v = np.asarray(values, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    cache = _cache(tmp_path, ttl_seconds=60)
+    cache.put(NS, "clause", {"status": "Meets"})
+
+    clock[0] += 59
+    assert cache.get(NS, "clause") == {"status": "Meets"}
+    clock[0] += 2
+    assert cache.get(NS, "clause") is None
+
+
+def test_the_least_recently_used_entry_is_evicted(tmp_path, clock):
+    cache = _cache(tmp_path, max_entries=2)
+    for key in ("a", "b"):
+        clock[0] += 1
+        cache.put(NS, key, {"key": key})
+    clock[0] += 1
+    cache.get(NS, "a")                    # a is now more recent than b
+    clock[0] += 1
+    cache.put(NS, "c", {"key": "c"})
+
+    assert [cache.get(NS, key) for key in ("a", "b", "c")] == [{"key": "a"}, None, {"key": "c"}]
+
+
+def test_entries_are_separated_by_agent_model_and_prompt_version(tmp_path, clock):
+    cache = _cache(tmp_path)
+    cache.put(NS, "clause", {"status": "Meets"})
+
+    assert cache.get(("gap", "gpt-4.1-mini@0.0", "2"), "clause") is None
+    assert cache.get(("gap", "gpt-4.1@0.0", "1"), "clause") is None
+    assert cache.get(("risk", "gpt-4.1-mini@0.0", "1"), "clause") is None
+    assert cache.get(NS, "clause") == {"status": "Meets"}
+
+
+def test_semantic_lookup_accepts_only_neighbours_above_the_threshold(tmp_path, clock):
+    cache = _cache(tmp_path, semantic_threshold=0.95)
+    cache.put(NS, "Backups must be encrypted.", {"status": "Meets"}, _unit(1.0, 0.0, 0.0))
+
+    near = cache.get(NS, "Backups shall be encrypted.", _unit(1.0, 0.1, 0.0))     # cosine ~0.995
+    far = cache.get(NS, "Visitors must sign in.", _unit(1.0, 1.0, 0.0))           # cosine ~0.71
+    other_version = cache.get(("gap", "gpt-4.1-mini@0.0", "2"), "Backups shall be encrypted.",
+                              _unit(1.0, 0.1, 0.0))
+
+    assert near == {"status": "Meets"}
+    assert far is None and other_version is None
+    assert cache.stats()["agents"]["gap"] == {"exact_hits": 0, "semantic_hits": 1, "misses": 2, "hit_rate": 0.3333}
+
+
+class _Finding(BaseModel):
+    status: str
+
+
+def test_invoke_structured_calls_the_model_once_per_key(tmp_path, clock, monkeypatch):
+    calls = []
+
+    class _Model:
+        def invoke(self, prompt):
+            calls.append(prompt)
+            return _Finding(status="Meets")
+
+    monkeypatch.setattr(response_cache, "get_response_cache", lambda: _cache(tmp_path))
+    monkeypatch.setattr("app.llm.registry.get_structured_llm", lambda schema, model, temperature: _Model())
+
+    first = response_cache.invoke_structured("gap", _Finding, "prompt", "clause", "1", "m")
+    second = response_cache.invoke_structured("gap", _Finding, "prompt", "clause", "1", "m")
+    response_cache.invoke_structured("gap", _Finding, "prompt", "clause", "2", "m")
+
+    assert first == second == _Finding(status="Meets")
+    assert len(calls) == 2
@@ -0,0 +1,126 @@
+import sqlite3
+
+import pytest
+
+from app.graph import runner
+from app.storage import results
+from app.storage.results import ResultStore, audit_versions, clause_hash, versions_key
+
+CLAUSE = "Personal data must be deleted within 30 days of account closure."
+ITEM = {"section_reference": "4. Retention", "exact_clause": CLAUSE, "theme": "Retention", "confidence_score": 0.9}
+ROW = {"theme": "Retention", "clause": CLAUSE, "source_ref": "PRIV-RET-01", "status": "Meets",
+       "gap_summary": "None", "risk_rating": "Low", "risk_statement": "-", "risk_recommendation": "-"}
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = ResultStore(str(tmp_path / "results.sqlite"))
+    monkeypatch.setattr(results, "get_result_store", lambda: store)
+    return store
+
+
+def test_clause_hash_ignores_whitespace_and_case():
+    assert clause_hash("Data  MUST be\nencrypted.") == clause_hash("data must be encrypted.")
+    assert clause_hash("Data must be encrypted.") != clause_hash("Data should be encrypted.")
+
+
+def test_versions_key_is_stable_and_order_insensitive():
+    assert versions_key({"model": "m", "graph_mode": "full"}) == versions_key({"graph_mode": "full", "model": "m"})
+    assert versions_key({"model": "m"}) != versions_key({"model": "n"})
+
+
+@pytest.mark.parametrize("setting, value", [
+    ("RETRIEVAL_MODE", "vector"), ("RETRIEVAL_CANDIDATES", 7), ("RRF_K", 10),
+    ("RERANK_BACKEND", "onnx"), ("RERANK_MODEL", "another/cross-encoder"), ("RERANK_CANDIDATES", 9),
+])
+def test_evidence_settings_change_the_fingerprint(monkeypatch, setting, value):
+    before = versions_key(audit_versions("full"))
+    monkeypatch.setattr(results, setting, value)
+
+    assert versions_key(audit_versions("full")) != before
+
+
+def test_graph_mode_changes_the_fingerprint():
+    assert versions_key(audit_versions("full")) != versions_key(audit_versions("fast"))
+
+
+def test_rows_are_served_across_documents_for_the_same_versions(store):
+    versions = audit_versions("full")
+    store.record_audit("doc-a", CLAUSE, versions, ROW)
+
+    assert store.lookup([clause_hash(CLAUSE)], versions_key(versions)) == {clause_hash(CLAUSE): ROW}
+    assert store.lookup([clause_hash(CLAUSE)], versions_key(audit_versions("fast"))) == {}
+
+
+def test_document_results_and_diff(store):
+    old = {"analysis": [ITEM, {"section_reference": "5. Access", "exact_clause": "Access is reviewed yearly."}]}
+    new = {"analysis": [ITEM, {"section_reference": "5. Access", "exact_clause": "Access is reviewed quarterly."},
+                        {"section_reference": "6. Logging", "exact_clause": "Logs must be kept."}]}
+    store.record_document("old", "old.pdf", "v1", old)
+    store.record_document("new", "new.pdf", "v1", new)
+    store.record_audit("new", CLAUSE, audit_versions("full"), ROW)
+
+    assert [r["status"] for r in store.document_results("new")] == ["Meets"]
+    diff = store.diff_documents("old", "new")
+    assert [c["exact_clause"] for c in diff["unchanged"]] == [CLAUSE]
+    assert [c["section_reference"] for c in diff["changed"]] == ["5. Access"]
+    assert [c["section_reference"] for c in diff["added"]] == ["6. Logging"]
+    assert diff["removed"] == []
+
+
+def test_memo_hit_skips_retrieval_and_records_under_the_new_document(store):
+    store.record_audit("doc-a", CLAUSE, audit_versions("full"), ROW)
+
+    # db and reranker are never touched on a full memo hit
+    rows = list(runner.iter_audit_clauses([ITEM], db=None, reranker=None, mode="full", doc_hash="doc-b"))
+
+    assert rows == [(0, {**ROW, "theme": "Retention"})]
+    assert store._connect().execute("SELECT COUNT(*) FROM audits WHERE doc_hash = 'doc-b'").fetchone()[0] == 1
+
+
+def test_memo_hit_survives_a_failing_store_write(store, monkeypatch):
+    store.record_audit("doc-a", CLAUSE, audit_versions("full"), ROW)
+
+    def locked(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(store, "record_audit", locked)
+    rows = list(runner.iter_audit_clauses([ITEM], db=None, reranker=None, mode="full", doc_hash="doc-b"))
+
+    assert rows == [(0, {**ROW, "theme": "Retention"})]
+
+
+def test_reviews_without_a_document_hash_are_not_recorded(store, monkeypatch):
+    monkeypatch.setattr(runner, "_retrieve_many", lambda items, db: [[] for _ in items])
+    monkeypatch.setattr(runner, "_rerank", lambda items, candidates, reranker: candidates)
+    monkeypatch.setattr(runner, "_run_graph", lambda item, evidence, mode: dict(ROW))
+
+    rows = list(runner.iter_audit_clauses([ITEM], db=None, reranker=None, mode="full", doc_hash=None))
+
+    assert rows == [(0, ROW)]
+    assert store._connect().execute("SELECT COUNT(*) FROM audits").fetchone()[0] == 0
+
+
+def test_a_partial_interpretation_is_returned_but_not_memoized(store, tmp_path, monkeypatch):
+    from app.jobs import handlers
+
+    policy = tmp_path / "policy.txt"
+    policy.write_text("4. Retention\n" + CLAUSE, encoding="utf-8")
+    outcomes = [
+        {"metadata": {}, "analysis": [ITEM], "failed_parts": [1]},
+        {"metadata": {}, "analysis": [ITEM], "failed_parts": []},
+    ]
+    calls = []
+
+    def interpret(llm, text, progress=None):
+        calls.append(text)
+        return outcomes[len(calls) - 1]
+
+    monkeypatch.setattr("app.agents.new_doc_interpreter.interpret_new_document", interpret)
+    monkeypatch.setattr("app.llm.registry.get_chat_model", lambda *args, **kwargs: None)
+    payload = {"path": str(policy), "filename": "policy.txt"}
+
+    assert handlers.analyze_upload(payload)["failed_parts"] == [1]
+    assert handlers.analyze_upload(payload)["failed_parts"] == []     # the failed part is retried
+    assert handlers.analyze_upload(payload)["analysis"] == [ITEM]     # now served from the store
+    assert len(calls) == 2
@@ -0,0 +1,44 @@
+import pytest
+from langchain_core.documents import Document
+
+from app.rag import hybrid_retriever
+from app.rag.bm25_index import BM25Index
+from app.rag.hybrid_retriever import retrieve, retrieve_many
+from app.rag.vectorstore_indexer import _index_documents
+
+TEXTS = [
+    "Personal data is deleted within 30 days of account closure.",
+    "Access rights are reviewed quarterly by asset owners.",
+    "Backups are encrypted and tested every quarter.",
+    "Visitors sign in at reception and wear a badge.",
+    "Security incidents are reported to the CISO within 24 hours.",
+    "Laptops use full-disk encryption with AES-256.",
+    "Passwords are at least 14 characters long.",
+    "Vendors sign a data processing agreement before access.",
+]
+QUERIES = ["delete personal data after closure", "quarterly access review", "encryption of laptops",
+           "report incidents quickly"]
+
+
+@pytest.fixture
+def db(fake_embeddings, monkeypatch):
+    db = _index_documents(iter([Document(page_content=t, metadata={"chunk_id": f"c{i}"})
+                                for i, t in enumerate(TEXTS)]), index_type="flat")
+    monkeypatch.setattr(hybrid_retriever, "get_bm25_index", lambda: BM25Index.from_vector_db(db))
+    return db
+
+
+def _ids(docs):
+    return [d.metadata["chunk_id"] for d in docs]
+
+
+@pytest.mark.parametrize("mode", ["vector", "lexical", "hybrid"])
+def test_batched_retrieval_matches_one_query_at_a_time(db, mode):
+    batched = retrieve_many(db, QUERIES, k=3, mode=mode)
+
+    assert [_ids(docs) for docs in batched] == [_ids(retrieve(db, q, k=3, mode=mode)) for q in QUERIES]
+    assert all(batched)
+
+
+def test_no_queries_means_no_search(db):
+    assert retrieve_many(db, [], k=3) == []
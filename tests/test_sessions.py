@@ -0,0 +1,44 @@
+import pytest
+
+from app.storage import sessions
+from app.storage.sessions import ReviewStore
+
+INTERPRETATION = {"metadata": {"title": "Data Policy"}, "doc_hash": "abc",
+                  "analysis": [{"section_reference": "4", "exact_clause": "Backups must be encrypted."}]}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(sessions.time, "time", lambda: now[0])
+    return now
+
+
+def test_a_review_started_on_one_worker_is_served_by_another(tmp_path):
+    path = str(tmp_path / "reviews.sqlite")
+    review_id = ReviewStore(path).create(INTERPRETATION)
+
+    assert ReviewStore(path).get(review_id) == INTERPRETATION
+    assert ReviewStore(path).get("unknown") is None
+    assert ReviewStore(path).get(None) is None
+
+
+def test_sessions_expire_and_are_purged_by_the_next_review(tmp_path, clock):
+    store = ReviewStore(str(tmp_path / "reviews.sqlite"), ttl_seconds=60)
+    old = store.create(INTERPRETATION)
+
+    clock[0] += 61
+    assert store.get(old) is None
+
+    store.create(INTERPRETATION)
+    assert store._connect().execute("SELECT COUNT(*) FROM reviews").fetchone()[0] == 1
+
+
+def test_an_unknown_review_id_asks_for_a_new_upload(tmp_path, monkeypatch):
+    from app.ui.flask_app import flask_app
+
+    monkeypatch.setattr(sessions, "get_review_store", lambda: ReviewStore(str(tmp_path / "reviews.sqlite")))
+    response = flask_app.test_client().post("/review/submit", data={"review_id": "expired",
+                                                                     "approved_clauses": ["x"]})
+
+    assert response.status_code == 410